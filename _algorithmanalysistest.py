@@ -0,0 +1,35 @@
+# _algorithmanalysistest.py
+
+import unittest
+import numpy as np
+from rubikscube import RubiksCube
+from algorithmanalysis import analyse_algorithm
+
+class TestAlgorithmAnalysis(unittest.TestCase):
+
+    def test_order_matches_repeated_application(self):
+        """The LCM of the cycle lengths is the number of repeats that returns a cube to solved."""
+        for alg in ["R U R' U'", "R U2", "F R U R' U' F'", "x R"]:
+            with self.subTest(alg=alg):
+                cube, repeats = RubiksCube(), 0
+                while True:
+                    cube.move(alg)
+                    repeats += 1
+                    if np.array_equal(cube.state, RubiksCube().state): break
+                self.assertEqual(analyse_algorithm(alg)['order'], repeats)
+
+    def test_piece_effect(self):
+        """The T-perm swaps two corners and two edges without twisting or flipping anything."""
+        analysis = analyse_algorithm("R U R' U' R' F R2 U' R' U' R U R' F'")
+        self.assertEqual(analysis['corners']['cycles'], [['URF', 'UBR']])
+        self.assertEqual(analysis['edges']['cycles'], [['UR', 'UL']])
+        self.assertEqual(analysis['corners']['parity'], 1)
+        self.assertEqual(analysis['corners']['orientation'], {})
+        self.assertEqual(analysis['edges']['orientation'], {})
+        sune = analyse_algorithm("R U R' U R U2 R'")
+        self.assertEqual(sune['corners']['total_orientation'], 0)
+        self.assertEqual(len(sune['corners']['orientation']), 3)
+        self.assertFalse(sune['centres_moved'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
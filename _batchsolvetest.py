@@ -0,0 +1,54 @@
+# _batchsolvetest.py
+
+import json
+import unittest
+import numpy as np
+from rubikscube import RubiksCube
+from kociembasolver import cube_to_facelets
+from batchsolve import cube_from_input, parse_line, solve_item
+
+class TestBatchSolve(unittest.TestCase):
+
+    def test_plain_and_json_lines(self):
+        """Plain lines are passed through; JSON objects echo their id and prefer 'facelets'."""
+        self.assertEqual(parse_line(1, "R U R'\n"), {'line': 1, 'input': "R U R'"})
+        item = parse_line(2, json.dumps({'id': 'a', 'scramble': "R U", 'facelets': "U" * 54}))
+        self.assertEqual(item, {'line': 2, 'id': 'a', 'input': "U" * 54})
+
+    def test_malformed_json_lines(self):
+        """Non-object JSON, non-string fields and missing or empty fields raise ValueError."""
+        for line in ('[1, 2]', '{"scramble": 5}', '{"facelets": null}', '{"id": 3}', '{"id": 3, "scramble": "  "}', '{"id": 3'):
+            with self.subTest(line=line):
+                with self.assertRaises(ValueError):
+                    parse_line(1, line)
+
+    def test_spaced_54_move_scramble(self):
+        """54 spaced face turns drawn from URFDLB are a scramble, not a facelet string."""
+        scramble = " ".join("RUFDLB"[i % 6] for i in range(54))
+        expected = RubiksCube()
+        expected.move(scramble)
+        self.assertTrue(np.array_equal(cube_from_input(scramble).state, expected.state))
+
+    def test_facelets_round_trip(self):
+        """A facelet string builds the cube it was taken from."""
+        cube = RubiksCube()
+        cube.move("R U F' L2")
+        self.assertTrue(np.array_equal(cube_from_input(cube_to_facelets(cube)).state, cube.state))
+
+    def test_solve_item(self):
+        """A scramble is solved; a bad scramble becomes an error row instead of raising."""
+        scramble = "R U F' L2 D B'"
+        result = solve_item({'line': 1, 'input': scramble})
+        self.assertIsNone(result['error'])
+        cube = RubiksCube()
+        cube.move(scramble)
+        cube.move(result['solution'])
+        self.assertTrue(cube.is_solved())
+        self.assertEqual(result['moves'], len(result['solution'].split()))
+
+        result = solve_item({'line': 2, 'input': "R Q"})
+        self.assertIsNone(result['solution'])
+        self.assertTrue(result['error'].startswith("Error: invalid input."))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
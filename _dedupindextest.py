@@ -0,0 +1,60 @@
+# _dedupindextest.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import uuid
+import cv2
+import numpy as np
+from stickerstore import ShardReader, ShardWriter, convert_folder_dataset, shard_root, unconverted_folders
+from synthstickers import render_stickers
+from dedupindex import duplicate_mask, leak_mask, prune, update_index
+
+class TestDedupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.train, self.test = os.path.join(self.tmp.name, 'dataset'), os.path.join(self.tmp.name, 'test_dataset')
+        rng = np.random.default_rng(0)
+        labels = rng.integers(0, 6, 500)
+        images = render_stickers(labels, rng)
+        copies = np.clip(images[:50].astype(int) + rng.integers(-2, 3, images[:50].shape), 0, 255).astype(np.uint8)
+        writer = ShardWriter(shard_root(self.train), shard_size=256)
+        writer.add_batch(np.concatenate([images, copies]), np.concatenate([labels, labels[:50]]))
+        writer.close()
+        writer = ShardWriter(shard_root(self.test))
+        writer.add_batch(images[100:120], labels[100:120]) # Leaked straight from the training set
+        writer.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_finds_and_prunes_duplicates(self):
+        """The noisy copies are found as duplicates, and pruning removes them and leaves the index consistent."""
+        remove = duplicate_mask(self.train)
+        self.assertTrue(remove[500:].all())
+        remove |= leak_mask(self.train, self.test)[0]
+        self.assertTrue(remove[100:120].all())
+        removed = prune(self.train, remove)
+        self.assertEqual(len(ShardReader(shard_root(self.train))), 550 - removed)
+        self.assertEqual(len(update_index(self.train)[0]), 550 - removed)
+        self.assertFalse(duplicate_mask(self.train).any())
+        self.assertEqual(len(leak_mask(self.train, self.test)[1]), 0)
+
+    def test_prune_keeps_converted_files_converted(self):
+        """Pruning a converted duplicate does not make its PNG look unconverted, so converting again adds nothing."""
+        data_dir = os.path.join(self.tmp.name, 'pngs')
+        os.makedirs(os.path.join(data_dir, 'red'))
+        for value in (0, 60, 120, 120):
+            cv2.imwrite(os.path.join(data_dir, 'red', f"red_{uuid.uuid4()}.png"), np.full((32, 32, 3), value, dtype=np.uint8))
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_folder_dataset(data_dir)
+            self.assertEqual(prune(data_dir, duplicate_mask(data_dir)), 1)
+            self.assertFalse(unconverted_folders(data_dir))
+            convert_folder_dataset(data_dir)
+        self.assertEqual(len(ShardReader(shard_root(data_dir))), 3)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+# _distancetablestest.py
+
+import contextlib
+import io
+import tempfile
+import unittest
+from rubikscube import RubiksCube
+from distancetables import PRESETS, DistanceTable, build_distance_table
+
+class TestDistanceTables(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tables_dir = tempfile.TemporaryDirectory()
+        cls.meta = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in ('ll-corners', 'ru-corners'):
+                preset = PRESETS[name]
+                cls.meta[name] = build_distance_table(name, preset['corners'], preset['edges'], preset['moves'], cls.tables_dir.name, workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tables_dir.cleanup()
+
+    def test_reached_states(self):
+        """All 8*7*6*5 * 3^4 last-layer corner states are reached; <R,U> reaches 29,160 corner states."""
+        self.assertEqual(self.meta['ll-corners']['reached'], 136080)
+        self.assertEqual(self.meta['ll-corners']['size'], 136080)
+        self.assertEqual(self.meta['ru-corners']['reached'], 29160)
+
+    def test_lookup(self):
+        """Distances match the scramble length for short scrambles; states outside <R,U> are unreachable."""
+        table = DistanceTable('ru-corners', self.tables_dir.name)
+        self.assertEqual(table.distance(RubiksCube()), 0)
+        cube = RubiksCube()
+        cube.move("R U")
+        self.assertEqual(table.distance(cube), 2)
+        cube = RubiksCube()
+        cube.move("F")
+        self.assertIsNone(table.distance(cube))
+
+    def test_loaded_distribution_matches_build(self):
+        """The distribution read back from disk has the same int keys the builder returned."""
+        table = DistanceTable('ll-corners', self.tables_dir.name)
+        self.assertEqual(table.meta['distribution'], self.meta['ll-corners']['distribution'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
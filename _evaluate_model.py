@@ -1,86 +1,305 @@
 # _evaluate_model.py
 
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-import numpy as np
+import argparse
+import glob
+import hashlib
+import json
 import os
-from sklearn.metrics import classification_report, confusion_matrix
-import seaborn as sns
-import matplotlib.pyplot as plt
+import subprocess
+import sys
+import time
+import numpy as np
+from stickerstore import load_sticker_arrays
 
 MODEL_PATH = os.path.join('models', 'best_model.keras')
+MODELS_DIR = 'models'
+MODEL_EXTENSIONS = ('.keras', '.h5', '.tflite')
 TEST_DATA_DIR = 'test_dataset'
-IMG_SIZE = (32, 32)
+EVAL_CACHE_DIR = os.path.join(MODELS_DIR, 'eval_cache')
 BATCH_SIZE = 32
 
-print("Model evaluation on test dataset\n")
-
-# Load the trained model
-print(f"Loading model from {MODEL_PATH}...")
-try:
-    model = load_model(MODEL_PATH)
-    print("Model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    exit(1)
-
-# Create a data generator for the test set
-print(f"\nLoading test data from {TEST_DATA_DIR}...")
-test_datagen = ImageDataGenerator(rescale=1./255)
-
-test_generator = test_datagen.flow_from_directory(
-    TEST_DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=False  # Crucial for classification report
-)
-
-print(f"Found {test_generator.samples} test images across {test_generator.num_classes} classes.")
-print(f"Class labels: {list(test_generator.class_indices.keys())}")
-
-print("\nEvaluating model on the test set")
-loss, accuracy = model.evaluate(test_generator, verbose=1)
-print(f"\nTest results:")
-print(f"Test accuracy: {accuracy * 100:.2f}%")
-print(f"Test loss: {loss:.4f}")
-
-print("\nGenerating classification report")
-test_generator.reset()
-print("Making predictions...")
-predictions = model.predict(test_generator, steps=int(np.ceil(test_generator.samples/test_generator.batch_size)), verbose=1)
-predicted_classes = np.argmax(predictions, axis=1)
-
-true_classes = test_generator.classes
-class_labels = list(test_generator.class_indices.keys())
-
-print("\nClassification report")
-print(classification_report(true_classes, predicted_classes, target_names=class_labels))
-
-print("\nGenerating confusion matrix")
-cm = confusion_matrix(true_classes, predicted_classes)
-
-plt.figure(figsize=(10, 8))
-sns.heatmap(cm, annot=True, fmt='d', xticklabels=class_labels, yticklabels=class_labels, cmap='Blues')
-plt.title(f'Confusion Matrix - Test Accuracy: {accuracy * 100:.2f}%')
-plt.ylabel('True Label')
-plt.xlabel('Predicted Label')
-plt.tight_layout()
-plt.show()
-
-print("\nPer-class image counts")
-for i, class_name in enumerate(class_labels):
-    count = np.sum(true_classes == i)
-    correct = np.sum((true_classes == i) & (predicted_classes == i))
-    print(f"{class_name}: {correct}/{count} correct ({correct/count*100:.1f}%)")
-
-print(f"\nSummary")
-print(f"Overall test accuracy: {accuracy * 100:.2f}%")
-if accuracy < 0.8:
-    print("Low accuracy (domain shift?). Model needs more diverse training data")
-elif accuracy < 0.9:
-    print("Moderate accuracy")
-else:
-    print("Good accuracy")
+BENCH_BATCH_SIZES = [1, 9, 32, 128] # 1 = one sticker, 9 = one face as the scanner sees it
+BENCH_THREADS = [(1, 1), (2, 1), (os.cpu_count() or 1, 2)] # (intra-op, inter-op)
+BENCH_WARMUP = 10
+BENCH_ITERATIONS = 200
+
+def load_test_set():
+    """Test set (sharded store if present, else the PNG folders), already scaled to 0-1."""
+    test_images, true_classes, class_labels = load_sticker_arrays(TEST_DATA_DIR)
+    return (test_images / 255.0).astype(np.float32), true_classes.astype(int), class_labels
+
+def load_inference_fn(model_path, num_threads=None):
+    """A `predict(images) -> probabilities` callable for a .keras/.h5 model or an exported .tflite model."""
+    import tensorflow as tf
+    if model_path.endswith('.tflite'):
+        interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+        current_shape = [None]
+
+        def predict(images):
+            if current_shape[0] != images.shape:
+                interpreter.resize_tensor_input(input_index, images.shape)
+                interpreter.allocate_tensors()
+                current_shape[0] = images.shape
+            interpreter.set_tensor(input_index, images.astype(np.float32))
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index)
+        return predict
+
+    model = tf.keras.models.load_model(model_path)
+    h, w, c = model.input_shape[1:]
+    # One traced graph for every batch size, instead of model.predict's per-call setup
+    graph = tf.function(lambda x: model(x, training=False), input_signature=[tf.TensorSpec([None, h, w, c], tf.float32)])
+    return lambda images: graph(tf.convert_to_tensor(images, dtype=tf.float32)).numpy()
+
+def predict_in_batches(predict, images, batch_size=BATCH_SIZE):
+    return np.concatenate([predict(images[i:i + batch_size]) for i in range(0, len(images), batch_size)])
+
+def image_hashes(images):
+    """64-bit content hash of each uint8 image, as a uint64 array."""
+    return np.array([int.from_bytes(hashlib.blake2b(image.tobytes(), digest_size=8).digest(), 'little') for image in images], dtype=np.uint64)
+
+def model_weights_hash(model_path, cache_dir=EVAL_CACHE_DIR):
+    """
+    Hash of a model's weight arrays (of the file itself for .tflite). It is remembered against the
+    file's size and modification time, so an unchanged model is never loaded just to hash it.
+    """
+    memo_path = os.path.join(cache_dir, 'fingerprints.json')
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path) as f:
+            memo = json.load(f)
+    stat = os.stat(model_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = memo.get(os.path.abspath(model_path))
+    if entry and entry['stamp'] == stamp:
+        return entry['weights_hash']
+
+    digest = hashlib.sha256()
+    if model_path.endswith('.tflite'):
+        with open(model_path, 'rb') as f:
+            digest.update(f.read())
+    else:
+        import tensorflow as tf
+        for weights in tf.keras.models.load_model(model_path, compile=False).get_weights():
+            digest.update(str(weights.shape).encode())
+            digest.update(np.ascontiguousarray(weights).tobytes())
+    memo[os.path.abspath(model_path)] = {'stamp': stamp, 'weights_hash': digest.hexdigest()[:32]}
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(memo_path, 'w') as f:
+        json.dump(memo, f, indent=2)
+    return memo[os.path.abspath(model_path)]['weights_hash']
+
+def cached_predictions(model_path, images, cache_dir=EVAL_CACHE_DIR):
+    """
+    Class probabilities for (n, 32, 32, 3) uint8 images. Predictions are kept per model-weights hash
+    and image hash, so only images this model has not seen are run through it (and the model is
+    not even loaded when there are none). Returns (probabilities, number of images predicted).
+    """
+    if len(images) == 0: return np.zeros((0, 0), dtype=np.float32), 0
+    keys = image_hashes(images)
+    cache_path = os.path.join(cache_dir, f"{model_weights_hash(model_path, cache_dir)}.npz")
+    cached_keys, cached_probs = np.zeros(0, dtype=np.uint64), None
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cache:
+            cached_keys, cached_probs = cache['image_hashes'], cache['probabilities']
+
+    slots = np.minimum(np.searchsorted(cached_keys, keys), max(len(cached_keys) - 1, 0))
+    missing = np.flatnonzero(cached_keys[slots] != keys) if len(cached_keys) else np.arange(len(keys))
+    new_keys, first = np.unique(keys[missing], return_index=True)
+    if len(new_keys):
+        predict = load_inference_fn(model_path)
+        new_probs = predict_in_batches(predict, images[missing[first]].astype(np.float32) / 255.0)
+        all_keys = np.concatenate([cached_keys, new_keys])
+        all_probs = new_probs if cached_probs is None else np.concatenate([cached_probs, new_probs])
+        order = np.argsort(all_keys)
+        cached_keys, cached_probs = all_keys[order], all_probs[order].astype(np.float32)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, image_hashes=cached_keys, probabilities=cached_probs)
+        slots = np.searchsorted(cached_keys, keys)
+    return cached_probs[slots], len(new_keys)
+
+def measure_latency(predict, sample_images, batch_size, warmup=BENCH_WARMUP, iterations=BENCH_ITERATIONS):
+    reps = int(np.ceil(batch_size / len(sample_images)))
+    batch_pool = np.concatenate([sample_images] * reps) if reps > 1 else sample_images
+    rng = np.random.default_rng(0)
+    timings = []
+    for i in range(warmup + iterations):
+        start = rng.integers(0, len(batch_pool) - batch_size + 1)
+        batch = batch_pool[start:start + batch_size]
+        t0 = time.perf_counter()
+        predict(batch)
+        if i >= warmup:
+            timings.append(time.perf_counter() - t0)
+    timings_ms = np.array(timings) * 1000.0
+    p50, p95, p99 = np.percentile(timings_ms, [50, 95, 99])
+    return {'batch_size': batch_size, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+            'throughput': batch_size / (np.mean(timings_ms) / 1000.0)}
+
+def _benchmark_worker(model_path, intra, inter, batch_sizes, iterations):
+    """Runs in its own process: TensorFlow's thread pools can only be sized before first use."""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+    predict = load_inference_fn(model_path, num_threads=intra)
+    try:
+        sample_images = load_test_set()[0][:512]
+    except (FileNotFoundError, ValueError):
+        sample_images = np.zeros((0, 32, 32, 3), dtype=np.float32)
+    if len(sample_images) == 0: # No test set; timing does not depend on pixel values
+        sample_images = np.random.default_rng(0).random((512, 32, 32, 3), dtype=np.float32)
+    for batch_size in batch_sizes:
+        result = measure_latency(predict, sample_images, batch_size, iterations=iterations)
+        print(json.dumps({'model': model_path, 'intra': intra, 'inter': inter, **result}), flush=True)
+
+def find_models(models_dir=MODELS_DIR):
+    return sorted(p for p in glob.glob(os.path.join(models_dir, '*')) if p.endswith(MODEL_EXTENSIONS))
+
+def model_accuracy(model_path, test_images, true_classes):
+    """Accuracy on uint8 test images, through the prediction cache."""
+    predicted_classes = np.argmax(cached_predictions(model_path, test_images)[0], axis=1)
+    return float(np.mean(predicted_classes == true_classes))
+
+def benchmark(model_paths, batch_sizes=BENCH_BATCH_SIZES, thread_configs=BENCH_THREADS, iterations=BENCH_ITERATIONS, csv_path=None):
+    """Accuracy plus latency/throughput for every model, batch size and thread configuration, as one table."""
+    test_images, true_classes, _ = load_sticker_arrays(TEST_DATA_DIR)
+    true_classes = true_classes.astype(int)
+    accuracies = {}
+    for model_path in model_paths:
+        accuracies[model_path] = model_accuracy(model_path, test_images, true_classes) if len(true_classes) else float('nan')
+        print(f"{model_path}: accuracy {accuracies[model_path] * 100:.2f}% on {len(true_classes)} test images")
+
+    rows = []
+    for model_path in model_paths:
+        for intra, inter in thread_configs:
+            print(f"Timing {model_path} with {intra} intra-op / {inter} inter-op threads...")
+            cmd = [sys.executable, os.path.abspath(__file__), '--benchmark-worker', model_path,
+                   '--intra', str(intra), '--inter', str(inter), '--iterations', str(iterations),
+                   '--batch-sizes', *map(str, batch_sizes)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"  Failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+                continue
+            for line in proc.stdout.splitlines():
+                if line.startswith('{'):
+                    row = json.loads(line)
+                    row['accuracy'] = accuracies[model_path]
+                    row['size_kb'] = os.path.getsize(model_path) / 1024
+                    rows.append(row)
+
+    header = f"{'model':<34} {'acc %':>6} {'KB':>7} {'intra':>5} {'inter':>5} {'batch':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'stickers/s':>11}"
+    print("\nBenchmark results")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{os.path.basename(r['model']):<34} {r['accuracy'] * 100:>6.2f} {r['size_kb']:>7.0f} {r['intra']:>5} {r['inter']:>5} {r['batch_size']:>5} "
+              f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['throughput']:>11.0f}")
+
+    # The scanner classifies one face (nine stickers) per frame, so that is the latency that matters
+    print("\nBest nine-sticker latency per model")
+    for model_path in model_paths:
+        face_rows = [r for r in rows if r['model'] == model_path and r['batch_size'] == 9]
+        if face_rows:
+            best = min(face_rows, key=lambda r: r['p95_ms'])
+            print(f"{os.path.basename(model_path):<34} acc {best['accuracy'] * 100:6.2f}%  p95 {best['p95_ms']:.3f} ms  ({best['intra']}/{best['inter']} threads)")
+
+    if csv_path:
+        import csv
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ['model'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nWrote {len(rows)} rows to {csv_path}")
+    return rows
+
+def evaluate(model_path=MODEL_PATH, headless=False, use_cache=True):
+    from sklearn.metrics import classification_report, confusion_matrix
+    import matplotlib
+    if headless: matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    print("Model evaluation on test dataset\n")
+
+    print(f"Loading test data from {TEST_DATA_DIR}...")
+    test_images, true_classes, class_labels = load_sticker_arrays(TEST_DATA_DIR)
+    true_classes = true_classes.astype(int)
+
+    print(f"Found {len(true_classes)} test images across {len(class_labels)} classes.")
+    print(f"Class labels: {class_labels}")
+
+    # The model is only loaded if some images have no cached prediction for its weights
+    print(f"\nEvaluating {model_path} on the test set")
+    try:
+        if use_cache:
+            predictions, predicted = cached_predictions(model_path, test_images)
+        else:
+            predictions = predict_in_batches(load_inference_fn(model_path), test_images.astype(np.float32) / 255.0)
+            predicted = len(test_images)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        exit(1)
+    print(f"Ran the model on {predicted} images; {len(test_images) - predicted} predictions came from the cache.")
+    predicted_classes = np.argmax(predictions, axis=1)
+    accuracy = float(np.mean(predicted_classes == true_classes))
+    loss = float(-np.mean(np.log(np.clip(predictions[np.arange(len(true_classes)), true_classes], 1e-7, 1.0))))
+    print(f"\nTest results:")
+    print(f"Test accuracy: {accuracy * 100:.2f}%")
+    print(f"Test loss: {loss:.4f}")
+
+    print("\nClassification report")
+    print(classification_report(true_classes, predicted_classes, target_names=class_labels))
+
+    print("\nGenerating confusion matrix")
+    cm = confusion_matrix(true_classes, predicted_classes)
+
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', xticklabels=class_labels, yticklabels=class_labels, cmap='Blues')
+    plt.title(f'Confusion Matrix - Test Accuracy: {accuracy * 100:.2f}%')
+    plt.ylabel('True Label')
+    plt.xlabel('Predicted Label')
+    plt.tight_layout()
+    if headless:
+        plt.savefig('confusion_matrix.png')
+        print("Saved confusion matrix to confusion_matrix.png")
+    else:
+        plt.show()
+
+    print("\nPer-class image counts")
+    for i, class_name in enumerate(class_labels):
+        count = np.sum(true_classes == i)
+        correct = np.sum((true_classes == i) & (predicted_classes == i))
+        print(f"{class_name}: {correct}/{count} correct ({correct/count*100:.1f}%)")
+
+    print(f"\nSummary")
+    print(f"Overall test accuracy: {accuracy * 100:.2f}%")
+    if accuracy < 0.8:
+        print("Low accuracy (domain shift?). Model needs more diverse training data")
+    elif accuracy < 0.9:
+        print("Moderate accuracy")
+    else:
+        print("Good accuracy")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the colour classifier, or benchmark inference latency.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--headless', action='store_true', help="Save the confusion matrix instead of showing it.")
+    parser.add_argument('--no-cache', action='store_true', help=f"Predict every image again, ignoring {EVAL_CACHE_DIR}/.")
+    parser.add_argument('--benchmark', nargs='*', metavar='MODEL', help=f"Benchmark these models (default: everything in {MODELS_DIR}/).")
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=BENCH_BATCH_SIZES)
+    parser.add_argument('--threads', nargs='+', default=[f"{a}:{b}" for a, b in BENCH_THREADS], help="intra:inter pairs, e.g. 1:1 4:2")
+    parser.add_argument('--iterations', type=int, default=BENCH_ITERATIONS)
+    parser.add_argument('--csv', help="Also write the benchmark table to this CSV file.")
+    parser.add_argument('--benchmark-worker', help=argparse.SUPPRESS)
+    parser.add_argument('--intra', type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument('--inter', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
 
+    if args.benchmark_worker:
+        _benchmark_worker(args.benchmark_worker, args.intra, args.inter, args.batch_sizes, args.iterations)
+    elif args.benchmark is not None:
+        thread_configs = [tuple(int(n) for n in t.split(':')) for t in args.threads]
+        benchmark(args.benchmark or find_models(), args.batch_sizes, thread_configs, args.iterations, args.csv)
+    else:
+        evaluate(args.model, args.headless, not args.no_cache)
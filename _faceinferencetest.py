@@ -0,0 +1,56 @@
+# _faceinferencetest.py
+
+import random
+import unittest
+import kociemba
+import numpy as np
+from rubikscube import CORNER_STICKERS, RubiksCube
+from kociembasolver import cube_to_facelets
+from faceinference import ambiguous_stickers, last_face_candidates
+
+class TestLastFaceInference(unittest.TestCase):
+
+    def assertCubeValid(self, cube):
+        """Kociemba only solves real cubes; its solution must actually solve this one."""
+        completed = RubiksCube(state=cube.state)
+        completed.move(kociemba.solve(cube_to_facelets(cube)))
+        self.assertTrue(completed.is_solved())
+
+    def test_true_face_always_a_candidate(self):
+        """Over random cubes, every candidate completes a solvable cube, and a unique candidate is the true face."""
+        for seed in range(60):
+            random.seed(seed) # shuffle() uses the standard library's generator
+            cube = RubiksCube()
+            cube.shuffle(30)
+            missing_face = seed % 6
+            faces = {f: cube.state[f].copy() for f in range(6) if f != missing_face}
+            missing, candidates = last_face_candidates(faces)
+            self.assertEqual(missing, missing_face)
+            self.assertTrue(any(np.array_equal(c, cube.state[missing]) for c in candidates))
+            for candidate in candidates:
+                completed = cube.state.copy()
+                completed[missing] = candidate
+                self.assertCubeValid(RubiksCube(state=completed))
+            if len(candidates) == 1:
+                self.assertTrue(np.array_equal(candidates[0], cube.state[missing]))
+            else:
+                self.assertLess(ambiguous_stickers(candidates).sum(), 9)
+
+    def test_misread_sticker_is_inconsistent(self):
+        """A corner read with two stickers of the same colour leaves no valid cube."""
+        cube = RubiksCube()
+        cube.move("R U F")
+        state = cube.state.copy()
+        flat = state.ravel()
+        first, second, _ = CORNER_STICKERS[0]
+        flat[first] = flat[second]
+        unscanned = next(f for f in range(6) if f not in (first // 9, second // 9)) # Keep both bad stickers in view
+        faces = {f: state[f] for f in range(6) if f != unscanned}
+        self.assertEqual(last_face_candidates(faces)[1], [])
+
+    def test_needs_five_faces(self):
+        with self.assertRaises(ValueError):
+            last_face_candidates({0: RubiksCube().state[0]})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
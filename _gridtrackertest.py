@@ -0,0 +1,65 @@
+# _gridtrackertest.py
+
+import unittest
+import cv2
+import numpy as np
+from gridtracker import GridTracker, brightness, detect_face_quad, warp_stickers
+
+COLOURS = [(255, 255, 255), (0, 255, 255), (255, 0, 0), (0, 160, 0), (0, 0, 220), (0, 120, 255)] # BGR
+STICKER, GAP = 46, 8
+
+def synthetic_frame(colours, centre=(320, 240), angle=0.0, tilt=0.0, seed=0):
+    """A 640x480 BGR frame of one cube face on a blurred noise background. Returns (frame, true quad)."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(60, 200, (480, 640, 3)).astype(np.uint8), (15, 15), 0)
+    size = 3 * STICKER + 4 * GAP
+    face = np.full((size, size, 3), 20, dtype=np.uint8)
+    for i, c in enumerate(colours):
+        x, y = GAP + (i % 3) * (STICKER + GAP), GAP + (i // 3) * (STICKER + GAP)
+        face[y:y + STICKER, x:x + STICKER] = COLOURS[c]
+    square = np.float32([[0, 0], [size, 0], [size, size], [0, size]])
+    a = np.deg2rad(angle)
+    corners = (square - size / 2) @ np.float32([[np.cos(a), np.sin(a)], [-np.sin(a), np.cos(a)]]) + centre
+    corners[:2] += [[tilt, tilt], [-tilt, tilt]] # Top edge further away
+    warp = cv2.getPerspectiveTransform(square, np.float32(corners))
+    mask = cv2.warpPerspective(np.full((size, size), 255, np.uint8), warp, (640, 480)) > 0
+    frame[mask] = cv2.warpPerspective(face, warp, (640, 480))[mask]
+    # The face edge is half a gap outside the outer stickers
+    inner = np.float32([[GAP / 2, GAP / 2], [size - GAP / 2, GAP / 2], [size - GAP / 2, size - GAP / 2], [GAP / 2, size - GAP / 2]])
+    return frame, cv2.perspectiveTransform(inner[None], warp)[0]
+
+def sticker_colours(stickers):
+    return [int(np.argmin([np.abs(s.reshape(-1, 3).mean(axis=0) - c).sum() for c in COLOURS])) for s in stickers]
+
+class TestGridTracker(unittest.TestCase):
+
+    def test_detects_rotated_and_tilted_faces(self):
+        """The quad lands within a few pixels of the face and the warped stickers come out in row order."""
+        for seed in range(10):
+            colours = list(np.random.default_rng(seed).integers(0, 6, 9))
+            frame, truth = synthetic_frame(colours, angle=seed * 6 - 30, tilt=(seed % 3) * 6, seed=seed)
+            quad = detect_face_quad(brightness(frame))
+            self.assertIsNotNone(quad, f"seed {seed}")
+            self.assertLess(np.abs(quad - truth).max(), 5)
+            self.assertEqual(sticker_colours(warp_stickers(frame, quad)), colours)
+
+    def test_no_face_in_background(self):
+        frame, _ = synthetic_frame([0] * 9, centre=(2000, 2000))
+        self.assertIsNone(detect_face_quad(brightness(frame)))
+
+    def test_tracks_motion_without_redetecting(self):
+        """One detection covers a face sliding and turning across 30 frames; losing it triggers a new one."""
+        tracker = GridTracker()
+        for k in range(30):
+            frame, truth = synthetic_frame([0, 1, 2, 3, 4, 5, 0, 1, 2], centre=(280 + 3 * k, 220 + k), angle=k * 0.5, seed=1)
+            quad = tracker.update(frame)
+            self.assertIsNotNone(quad)
+            self.assertLess(np.abs(quad - truth).max(), 5)
+        self.assertEqual(tracker.detections, 1)
+
+        empty, _ = synthetic_frame([0] * 9, centre=(2000, 2000), seed=1)
+        self.assertIsNone(tracker.update(empty))
+        self.assertEqual(tracker.detections, 2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+# _kociembasolvertest.py
+
+import random
+import time
+import unittest
+import kociemba
+import kociembasolver
+from rubikscube import RubiksCube
+from kociembasolver import ANYTIME_VARIANTS, invert_rotation, solution_from_variant, solve_anytime, variant_facelets
+
+class TestAnytimeSolving(unittest.TestCase):
+
+    def test_variant_solutions_map_back(self):
+        """A solution of any rotated or inverted variant, mapped back, solves the original cube."""
+        random.seed(3)
+        for _ in range(30):
+            cube = RubiksCube()
+            cube.shuffle(25)
+            for rotation, inverse in ANYTIME_VARIANTS:
+                with self.subTest(rotation=rotation, inverse=inverse):
+                    variant_solution = kociemba.solve(variant_facelets(cube, rotation, inverse))
+                    check = RubiksCube(state=cube.state)
+                    check.move(solution_from_variant(variant_solution, rotation, inverse))
+                    self.assertTrue(check.is_solved())
+
+    def test_invert_rotation(self):
+        """A rotation followed by its inverse leaves the cube as it was, half and primed turns included."""
+        for rotation in ["x", "z'", "x2", "y x' z2"]:
+            with self.subTest(rotation=rotation):
+                cube = RubiksCube()
+                cube.move("R U")
+                start = cube.state.copy()
+                cube.move(f"{rotation} {invert_rotation(rotation)}")
+                self.assertTrue((cube.state == start).all())
+
+    def test_pool_is_reused(self):
+        """Consecutive searches share one pool, and searches cut off by the budget do not stop the next one."""
+        for budget in (5.0, 1.0): # The first search also starts and warms up the pool
+            cube = RubiksCube()
+            cube.shuffle(25)
+            solution = solve_anytime(cube, budget)
+            self.assertFalse(solution.startswith("Error"), solution)
+            cube.move(solution)
+            self.assertTrue(cube.is_solved())
+            if budget == 5.0: pool = kociembasolver._anytime_pool
+        self.assertIs(kociembasolver._anytime_pool, pool)
+        deadline = time.monotonic() + 5.0 # Skipped queued tasks still take a moment to come back
+        while pool.pool._cache and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(pool.pool._cache), 0) # Killed searches do not stay in the pool's cache
+        self.assertEqual(solve_anytime(RubiksCube(), 1.0), "")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
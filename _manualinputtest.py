@@ -0,0 +1,58 @@
+# _manualinputtest.py
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+import numpy as np
+from rubikscube import RubiksCube
+from kociembasolver import cube_to_facelets
+from manualinput import cube_from_pasted_state, _read_pasted_state
+
+SOLVED_FACELETS = "U" * 9 + "R" * 9 + "F" * 9 + "D" * 9 + "L" * 9 + "B" * 9
+
+class TestPastedState(unittest.TestCase):
+
+    def setUp(self):
+        self.cube = RubiksCube()
+        self.cube.move("R U F' L2 D B'")
+
+    def assertCubeStateEqual(self, cube, expected_state):
+        self.assertTrue(np.array_equal(cube.state, expected_state), "Cube state does not match the expected state.")
+
+    def test_facelets_and_packed_hex_round_trip(self):
+        """A facelet string and the hex of pack() both give back the cube they came from."""
+        self.assertCubeStateEqual(cube_from_pasted_state(cube_to_facelets(self.cube)), self.cube.state)
+        self.assertCubeStateEqual(cube_from_pasted_state(self.cube.pack().hex()), self.cube.state)
+
+    def test_upper_case_and_padded_hex(self):
+        """Hex is accepted in either case and with whitespace anywhere in it."""
+        packed = self.cube.pack().hex().upper()
+        padded = "  " + " ".join(packed[i:i + 6] for i in range(0, len(packed), 6)) + "\n"
+        self.assertCubeStateEqual(cube_from_pasted_state(packed), self.cube.state)
+        self.assertCubeStateEqual(cube_from_pasted_state(padded), self.cube.state)
+
+    def test_wrong_length(self):
+        with self.assertRaisesRegex(ValueError, "got 53 characters"):
+            cube_from_pasted_state(SOLVED_FACELETS[:-1])
+        with self.assertRaisesRegex(ValueError, "hexadecimal"):
+            cube_from_pasted_state("zz" * 21)
+
+    def test_wrong_colour_counts(self):
+        with self.assertRaisesRegex(ValueError, "exactly 9 times"):
+            cube_from_pasted_state("U" * 54)
+
+    def test_bad_centres(self):
+        """Swapping the U centre with an R sticker keeps the counts but duplicates the R centre; one error prefix is printed."""
+        facelets = "UUUURUUUU" + "U" + SOLVED_FACELETS[10:]
+        with self.assertRaisesRegex(ValueError, "invalid centres"):
+            cube_from_pasted_state(facelets)
+
+        output = io.StringIO()
+        with mock.patch('builtins.input', side_effect=[facelets, ""]), contextlib.redirect_stdout(output):
+            self.assertIsNone(_read_pasted_state())
+        self.assertEqual(output.getvalue().count("Input Error:"), 1)
+        self.assertNotIn("edit the faces", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
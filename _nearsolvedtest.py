@@ -0,0 +1,48 @@
+# _nearsolvedtest.py
+
+import contextlib
+import io
+import tempfile
+import unittest
+from rubikscube import RubiksCube
+from nearsolved import NearSolvedTable, build_near_solved_table
+
+class TestNearSolvedTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tables_dir = tempfile.TemporaryDirectory()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.meta = build_near_solved_table(3, cls.tables_dir.name)
+        cls.table = NearSolvedTable(3, cls.tables_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tables_dir.cleanup()
+
+    def test_distribution(self):
+        """Every state within three moves is in the table: 1 + 18 + 243 + 3240."""
+        self.assertEqual(self.meta['distribution'], {0: 1, 1: 18, 2: 243, 3: 3240})
+
+    def test_solutions_are_optimal(self):
+        """A three-move scramble with no cancellations is solved in exactly three moves."""
+        cube = RubiksCube()
+        cube.move("R U2 F'")
+        solution = self.table.solve(cube)
+        self.assertEqual(len(solution.split()), 3)
+        cube.move(solution)
+        self.assertTrue(cube.is_solved())
+        self.assertEqual(self.table.solve(RubiksCube()), "")
+
+    def test_rotated_cube_and_misses(self):
+        """Whole-cube rotations do not stop a lookup; cubes beyond the depth return None."""
+        cube = RubiksCube()
+        cube.move("x y R U")
+        solution = self.table.solve(cube)
+        cube.move(solution)
+        self.assertTrue(cube.is_solved())
+        cube.move("R U F L")
+        self.assertIsNone(self.table.solve(cube))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
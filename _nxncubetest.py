@@ -0,0 +1,35 @@
+# _nxncubetest.py
+
+import unittest
+import numpy as np
+from rubikscube import MOVE_PERMUTATIONS
+from nxncube import NxNCube
+
+class TestNxNCube(unittest.TestCase):
+
+    def test_3x3_matches_rubikscube(self):
+        """NxNCube(3) uses the same sticker permutations as RubiksCube for every move and rotation."""
+        for move, perm in MOVE_PERMUTATIONS.items():
+            token = move.lower() if move[0] in "XYZ" else move
+            self.assertTrue(np.array_equal(NxNCube.move_permutation(3, token), perm), move)
+
+    def test_wide_move_is_outer_plus_slice(self):
+        """On a 5x5, 3Rw turns the same stickers as R 2R 3R."""
+        wide, layers = NxNCube(5), NxNCube(5)
+        wide.move("3Rw U 3Rw'")
+        layers.move("R 2R 3R U R' 2R' 3R'")
+        self.assertTrue(np.array_equal(wide.state, layers.state))
+        self.assertFalse(wide.is_solved())
+
+    def test_quarter_turns_have_order_four(self):
+        """Four quarter turns of any layer return a cube of any size to where it started."""
+        for n in range(2, 8):
+            cube = NxNCube(n)
+            cube.shuffle()
+            start = cube.flat.copy()
+            for move in ["R", "Uw", "x", f"{n}F"]:
+                cube.move(" ".join([move] * 4))
+                self.assertTrue(np.array_equal(cube.flat, start), (n, move))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -2,7 +2,7 @@
 
 import unittest
 import numpy as np
-from rubikscube import RubiksCube 
+from rubikscube import RubiksCube, ORIENTATIONS
 
 class TestRubiksCube(unittest.TestCase):
 
@@ -119,6 +119,82 @@ class TestRubiksCube(unittest.TestCase):
                 self.cube.move(f"{rot} {rot} {rot} {rot}")
                 self.assertCubeStateEqual(self.cube, initial_state)
 
+    def test_rotations_are_symmetries(self):
+        """Conjugating a face move by a whole-cube rotation gives another face move, e.g. z U z' == L."""
+        expected = {'x': {'U': 'F', 'R': 'R'}, 'y': {'F': 'R', 'U': 'U'}, 'z': {'U': 'L', 'R': 'U', 'F': 'F'}}
+        for rot, mapping in expected.items():
+            for face, conjugate in mapping.items():
+                with self.subTest(rotation=rot, face=face):
+                    rotated = RubiksCube()
+                    rotated.shuffle(10)
+                    plain = RubiksCube(state=rotated.state)
+                    rotated.move(f"{rot} {face} {rot}'")
+                    plain.move(conjugate)
+                    self.assertCubeStateEqual(rotated, plain.state)
+        self.assertEqual(len(ORIENTATIONS), 24)
+
+    def test_lazy_orientation_matches_physical_rotations(self):
+        """Face moves after tracked rotations give the same stickers as physically rotating the cube."""
+        rng = np.random.default_rng(7)
+        lazy, physical = RubiksCube(), RubiksCube()
+        lazy.zobrist_hash()
+        rotations = {'x': physical._rotate_x, 'y': physical._rotate_y, 'z': physical._rotate_z}
+        for _ in range(200):
+            move = str(rng.choice(list("UDFBLRxyz"))) + str(rng.choice(["", "'", "2"]))
+            lazy.move(move)
+            for _ in range(2 if move[1:] == '2' else 1):
+                if move[0] in rotations: rotations[move[0]](clockwise=move[1:] != "'")
+                else: physical._apply_move("UDFBLR".index(move[0]), clockwise=move[1:] != "'")
+        self.assertEqual(lazy.zobrist_hash(), RubiksCube(state=physical.state).zobrist_hash())
+        self.assertCubeStateEqual(lazy, physical.state)
+        self.assertEqual(lazy.orientation, 0) # Reading the state materialised the rotation
+        lazy.move("x y R")
+        self.assertNotEqual(lazy.orientation, 0)
+        lazy.move("R' y' x'")
+        self.assertCubeStateEqual(lazy, physical.state)
+
+    def test_physical_rotations_keep_every_sticker(self):
+        """Each physical rotation moves all 54 stickers to distinct places; none is overwritten by another face."""
+        for rotate in ('_rotate_x', '_rotate_y', '_rotate_z'):
+            for clockwise in (True, False):
+                with self.subTest(rotation=rotate, clockwise=clockwise):
+                    cube = RubiksCube(state=np.arange(54).reshape(6, 3, 3))
+                    getattr(cube, rotate)(clockwise=clockwise)
+                    self.assertEqual(sorted(cube._stickers.ravel()), list(range(54)))
+
+    def test_incremental_zobrist_hash(self):
+        """The hash maintained through moves equals a fresh hash, and depends only on the state."""
+        self.cube.zobrist_hash()
+        self.cube.shuffle(30)
+        self.cube.move("x y' z2")
+        self.assertEqual(self.cube.zobrist_hash(), RubiksCube(state=self.cube.state).zobrist_hash())
+
+        a, b = RubiksCube(), RubiksCube()
+        a.zobrist_hash()
+        b.zobrist_hash()
+        a.move("R U R' U'")
+        b.move(" ".join(["R U R' U'"] * 7)) # (R U R' U') has order 6, so a and b end in the same state
+        self.assertCubeStateEqual(a, b.state)
+        self.assertEqual(a.zobrist_hash(), b.zobrist_hash())
+
+        a.state = self.cube.state.copy() # Assigning the stickers must not keep the old hash
+        self.assertEqual(a.zobrist_hash(), self.cube.zobrist_hash())
+
+    def test_pack_round_trip(self):
+        """pack()/unpack() preserve the state in 21 bytes."""
+        self.cube.shuffle(20)
+        packed = self.cube.pack()
+        self.assertEqual(len(packed), 21)
+        self.assertCubeStateEqual(RubiksCube.unpack(packed), self.cube.state)
+
+    def test_timeline_matches_moves(self):
+        """Each row of timeline() equals the state after that many moves."""
+        sune = "R U R' U R U2 R'"
+        frames = self.cube.timeline(sune)
+        self.assertEqual(frames.shape, (8, 54))
+        for i, move in enumerate(sune.split(), start=1):
+            self.cube.move(move)
+            self.assertTrue(np.array_equal(frames[i], self.cube.state.ravel()))
 
 if __name__ == '__main__':
     # Run directly from the command line
@@ -0,0 +1,68 @@
+# _solverbackendtest.py
+
+import random
+import time
+import unittest
+from rubikscube import RubiksCube
+from solverbackend import SolverBackend, SOLVED, INVALID, TIMEOUT, CANCELLED
+
+class TestSolverBackend(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = SolverBackend().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.close()
+
+    def setUp(self):
+        self.cube = RubiksCube()
+        self.cube.shuffle(25)
+
+    def test_solution_solves_cube(self):
+        """A scrambled cube comes back as a SOLVED result whose moves solve it."""
+        result = self.backend.solve(self.cube)
+        self.assertEqual(result.status, SOLVED)
+        self.cube.move(result.solution)
+        self.assertTrue(self.cube.is_solved())
+
+    def test_solved_cube_needs_no_moves(self):
+        """A solved cube is SOLVED with an empty solution, not Kociemba's identity sequence."""
+        result = self.backend.solve(RubiksCube())
+        self.assertEqual(result.status, SOLVED)
+        self.assertEqual(result.solution, "")
+        self.assertEqual(result.moves, 0)
+
+    def test_invalid_state_is_typed(self):
+        """An impossible state is reported as INVALID with a message, not as an error string."""
+        result = self.backend.solve("U" * 54)
+        self.assertEqual(result.status, INVALID)
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.solution)
+        self.assertTrue(result.message)
+
+    def test_deadline_and_cancel_recover(self):
+        """A search past its deadline, or cancelled, is stopped and the next solve still works."""
+        self.assertEqual(self.backend.solve(self.cube, deadline=0.3, time_budget=5.0).status, TIMEOUT)
+        handle = self.backend.submit(self.cube, time_budget=5.0)
+        handle.cancel()
+        self.assertEqual(handle.result(timeout=5.0).status, CANCELLED)
+        self.assertEqual(self.backend.solve(self.cube).status, SOLVED)
+
+    def test_cancel_plain_search(self):
+        """A plain search stuck in C (a low max_depth takes minutes) is still stopped promptly."""
+        random.seed(1)
+        cube = RubiksCube()
+        cube.shuffle(30)
+        self.assertEqual(self.backend.solve(cube).status, SOLVED) # Worker warm, so the next request starts searching at once
+        handle = self.backend.submit(cube, max_depth=17)
+        time.sleep(1.0)
+        start = time.monotonic()
+        handle.cancel()
+        self.assertEqual(handle.result(timeout=10.0).status, CANCELLED)
+        self.assertLess(time.monotonic() - start, 5.0)
+        self.assertEqual(self.backend.solve(self.cube).status, SOLVED)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,77 @@
+# _solveservicetest.py
+
+import asyncio
+import json
+import unittest
+from rubikscube import RubiksCube
+from solveservice import SolveService, SolveClient
+
+class TestSolveService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.service = SolveService(num_workers=1)
+        host, port = await self.service.start('127.0.0.1', 0) # Any free port
+        self.client = SolveClient(host, port)
+        await self.client.connect()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.service.stop()
+
+    async def test_solution_solves_cube(self):
+        """A packed state sent over the socket comes back with a working solution."""
+        cube = RubiksCube()
+        cube.shuffle(25)
+        reply = await self.client.solve(cube)
+        self.assertIsNone(reply['error'])
+        cube.move(reply['solution'])
+        self.assertTrue(cube.is_solved())
+
+    async def test_identical_requests_are_coalesced(self):
+        """Concurrent identical requests share one search."""
+        cube = RubiksCube()
+        cube.shuffle(25)
+        replies = await asyncio.gather(*(self.client.solve(cube) for _ in range(4)))
+        self.assertEqual(len({r['solution'] for r in replies}), 1)
+        self.assertEqual(sum(r['coalesced'] for r in replies), 3)
+
+    async def test_invalid_facelets(self):
+        """Malformed input is rejected without reaching a worker."""
+        for facelets in ("UUU", "U" * 54): # Too short; one colour everywhere, so duplicate centres
+            reply = await self.client.solve(facelets)
+            self.assertIn("Error", reply['error'])
+        metrics = await self.client.metrics()
+        self.assertEqual(metrics['errors'], 2)
+
+    async def test_malformed_requests_get_replies(self):
+        """Requests of the wrong shape or with fields of the wrong type get an error reply, not silence."""
+        host, port = self.service._server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        lines = ['[1, 2]', '{"id": 1, "facelets": 123}', '{"id": 2, "packed": 5}',
+                 '{"id": 3, "facelets": "%s", "deadline": "x"}' % ("U" * 9 + "R" * 9 + "F" * 9 + "D" * 9 + "L" * 9 + "B" * 9)]
+        writer.write("".join(line + "\n" for line in lines).encode())
+        await writer.drain()
+        replies = [json.loads(await asyncio.wait_for(reader.readline(), 5.0)) for _ in lines]
+        writer.close()
+        await writer.wait_closed()
+        self.assertTrue(all(r['error'].startswith("Error") for r in replies))
+        self.assertEqual(sorted(r['id'] for r in replies if r['id'] is not None), [1, 2, 3])
+
+    async def test_abandoned_search_frees_its_slot(self):
+        """A search every caller has given up on is cancelled and stops counting against max_pending."""
+        self.service.max_pending = 1
+        cube = RubiksCube()
+        cube.shuffle(25)
+        reply = await self.client.solve(cube, deadline=0.001)
+        self.assertIn("deadline", reply['error'])
+        self.assertEqual(self.service._in_flight, {})
+
+        cube.move("R U")
+        reply = await self.client.solve(cube) # Not refused as busy; runs on the replacement worker
+        self.assertIsNone(reply['error'])
+        metrics = await self.client.metrics()
+        self.assertEqual((metrics['abandoned'], metrics['rejected']), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+# _stickerstoretest.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import uuid
+import cv2
+import numpy as np
+from stickerstore import (CLASS_NAMES, ShardReader, ShardWriter, convert_folder_dataset, load_sticker_arrays,
+                          shard_root, unconverted_folders)
+
+def _stickers(n, start=0):
+    return np.stack([np.full((32, 32, 3), (start + i) % 256, dtype=np.uint8) for i in range(n)])
+
+class TestShardStore(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'dataset')
+        self.enterContext(contextlib.redirect_stdout(io.StringIO())) # The writer reports every shard
+
+    def _write_png(self, class_name, value, name=None):
+        """One flat sticker, named like datacollector's captures unless `name` is given."""
+        os.makedirs(os.path.join(self.data_dir, class_name), exist_ok=True)
+        name = name or f"{class_name}_{uuid.uuid4()}.png"
+        cv2.imwrite(os.path.join(self.data_dir, class_name, name), np.full((32, 32, 3), value, dtype=np.uint8))
+
+    def _class_values(self, class_name):
+        images, labels, _ = load_sticker_arrays(self.data_dir)
+        return sorted(int(v) for v in images[labels == CLASS_NAMES.index(class_name), 0, 0, 0])
+
+    def test_writer_reader_round_trip(self):
+        """Samples are cut into full shards as they arrive; flush and close write the remainder; the reader returns them in order."""
+        images = _stickers(11)
+        labels = np.array([i % len(CLASS_NAMES) for i in range(11)], dtype=np.uint8)
+        root = shard_root(self.data_dir)
+        writer = ShardWriter(root, {'source': 'test'}, shard_size=4)
+        for image, label in zip(images[:3], labels[:3]):
+            writer.add(image, CLASS_NAMES[label])
+        writer.add_batch(images[3:9], labels[3:9]) # Crosses two shard boundaries
+        writer.flush()
+        writer.add_batch(images[9:], labels[9:])
+        writer.close()
+
+        reader = ShardReader(root)
+        self.assertEqual([e['count'] for e in reader.entries], [4, 4, 1, 2])
+        self.assertTrue(all(e['source'] == 'test' for e in reader.entries))
+        self.assertEqual(len(reader), 11)
+        np.testing.assert_array_equal(reader.images(), images)
+        np.testing.assert_array_equal(reader.labels, labels)
+        batches = list(reader.iter_batches(batch_size=3))
+        np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), labels)
+
+    def test_convert_alongside_existing_shards(self):
+        """PNG folders are added next to shards already written, and only PNGs added later are converted on the next run."""
+        writer = ShardWriter(shard_root(self.data_dir), shard_size=4)
+        writer.add_batch(_stickers(2), [0, 0])
+        writer.close()
+        for value in (20, 30, 40):
+            self._write_png('blue', value)
+        for value in (50, 60):
+            self._write_png('red', value)
+        self.assertTrue(unconverted_folders(self.data_dir))
+
+        convert_folder_dataset(self.data_dir)
+        self.assertFalse(unconverted_folders(self.data_dir))
+        self.assertEqual(self._class_values('blue'), [0, 1, 20, 30, 40])
+        self.assertEqual(self._class_values('red'), [50, 60])
+
+        self._write_png('red', 70, name=f"red_{'0' * 32}.png") # Sorts before every file already converted
+        self.assertTrue(unconverted_folders(self.data_dir))
+        convert_folder_dataset(self.data_dir)
+        self.assertFalse(unconverted_folders(self.data_dir))
+        self.assertEqual(self._class_values('red'), [50, 60, 70])
+        self.assertEqual(self._class_values('blue'), [0, 1, 20, 30, 40])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
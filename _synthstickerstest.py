@@ -0,0 +1,31 @@
+# _synthstickerstest.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from stickerstore import CLASS_NAMES, load_sticker_arrays
+from synthstickers import balanced_counts, generate_to_shards
+
+class TestBalancing(unittest.TestCase):
+
+    def test_balance_counts_png_folders(self):
+        """A dataset still stored as PNG class folders is topped up only by what each class lacks."""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = os.path.join(tmp, 'dataset')
+            for name, count in (('blue', 3), ('red', 6)):
+                os.makedirs(os.path.join(data_dir, name))
+                for i in range(count):
+                    cv2.imwrite(os.path.join(data_dir, name, f"{i}.png"), np.full((32, 32, 3), 40 * i, dtype=np.uint8))
+            with contextlib.redirect_stdout(io.StringIO()):
+                counts = balanced_counts(data_dir, 5)
+                self.assertEqual(counts, {'blue': 2, 'green': 5, 'orange': 5, 'red': 0, 'white': 5, 'yellow': 5})
+                generate_to_shards(data_dir, counts)
+                _, labels, _ = load_sticker_arrays(data_dir)
+            self.assertEqual(np.bincount(labels, minlength=len(CLASS_NAMES)).tolist(), [5, 5, 5, 6, 5, 5])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
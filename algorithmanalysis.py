@@ -0,0 +1,115 @@
+# algorithmanalysis.py
+
+import argparse
+import math
+import time
+import numpy as np
+from rubikscube import CORNER_STICKERS, EDGE_STICKERS, piece_transitions, sticker_permutation
+
+# Slot names in CORNER_STICKERS / EDGE_STICKERS order (Kociemba's cubie order)
+CORNER_NAMES = ['URF', 'UFL', 'ULB', 'UBR', 'DFR', 'DLF', 'DBL', 'DRB']
+EDGE_NAMES = ['UR', 'UF', 'UL', 'UB', 'DR', 'DF', 'DL', 'DB', 'FR', 'FL', 'BL', 'BR']
+CENTRE_STICKERS = [face * 9 + 4 for face in range(6)]
+
+def algorithm_permutation(move_str):
+    """Sticker permutation of a whole move string: new_flat_state = old_flat_state[perm]."""
+    perm = np.arange(54)
+    for move in move_str.split():
+        perm = perm[sticker_permutation(move)]
+    return perm
+
+def cycle_decomposition(mapping):
+    """
+    Non-trivial cycles of `mapping` (element i goes to mapping[i]), each starting at its smallest
+    element, e.g. [[0, 2, 1]] for 0 -> 2 -> 1 -> 0.
+    """
+    mapping = np.asarray(mapping).tolist()
+    seen = [False] * len(mapping)
+    cycles = []
+    for start in range(len(mapping)):
+        if seen[start] or mapping[start] == start: continue
+        cycle, i = [], start
+        while not seen[i]:
+            seen[i] = True
+            cycle.append(i)
+            i = mapping[i]
+        cycles.append(cycle)
+    return cycles
+
+def permutation_order(cycles):
+    """Order of a permutation from its cycles: the LCM of their lengths."""
+    return math.lcm(*(len(c) for c in cycles)) if cycles else 1
+
+def permutation_parity(cycles):
+    """0 for an even permutation, 1 for odd. A cycle of length k is k - 1 transpositions."""
+    return sum(len(c) - 1 for c in cycles) % 2
+
+def _piece_summary(pieces, names, perm, twists):
+    slot_map, ori_map = piece_transitions(pieces, perm)
+    cycles = cycle_decomposition(slot_map)
+    # A piece leaving slot s lands in slot_map[s] with its reference sticker at position ori_map[s, 0]
+    orientation = {names[slot_map[s]]: int(ori_map[s, 0]) for s in range(len(pieces)) if ori_map[s, 0]}
+    return {
+        'cycles': [[names[s] for s in c] for c in cycles],
+        'parity': permutation_parity(cycles),
+        'orientation': orientation, # Destination slot -> twist (corners, 1 = clockwise) or flip (edges)
+        'total_orientation': sum(orientation.values()) % twists, # 0 for anything made of face turns
+        'affected': [names[s] for s in range(len(pieces)) if slot_map[s] != s or ori_map[s, 0]],
+    }
+
+def analyse_algorithm(move_str):
+    """
+    Everything about what `move_str` does to a solved cube, worked out from its permutation alone:
+    order, sticker cycles, corner/edge cycles, parity, twists/flips and the pieces it touches.
+    """
+    perm = algorithm_permutation(move_str)
+    sticker_cycles = cycle_decomposition(np.argsort(perm)) # argsort: where each sticker goes
+    corners = _piece_summary(CORNER_STICKERS, CORNER_NAMES, perm, 3)
+    edges = _piece_summary(EDGE_STICKERS, EDGE_NAMES, perm, 2)
+    return {
+        'moves': len(move_str.split()),
+        'order': permutation_order(sticker_cycles),
+        'sticker_cycles': sticker_cycles,
+        'corners': corners,
+        'edges': edges,
+        'centres_moved': bool(np.any(perm[CENTRE_STICKERS] != CENTRE_STICKERS)), # Only whole-cube rotations move them
+    }
+
+def format_analysis(move_str, analysis):
+    def cycles_text(cycles):
+        return " ".join("(" + " ".join(c) + ")" for c in cycles) or "none"
+    corners, edges = analysis['corners'], analysis['edges']
+    lines = [
+        f"{move_str}",
+        f"  order {analysis['order']}, {analysis['moves']} moves, {len(analysis['sticker_cycles'])} sticker cycles",
+        f"  corners: {cycles_text(corners['cycles'])}; twists {corners['orientation'] or 'none'}",
+        f"  edges:   {cycles_text(edges['cycles'])}; flips {sorted(edges['orientation']) or 'none'}",
+        f"  affects {len(corners['affected'])} corners, {len(edges['affected'])} edges; permutation parity {'odd' if corners['parity'] else 'even'}",
+    ]
+    if analysis['centres_moved']: lines.append("  includes a whole-cube rotation")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cycle structure, order and effect of move sequences, without applying them.")
+    parser.add_argument('algorithms', nargs='*', help="Move strings, e.g. \"R U R' U'\".")
+    parser.add_argument('--file', help="Screen a library: one algorithm per line ('#' starts a comment).")
+    args = parser.parse_args()
+
+    algorithms = list(args.algorithms)
+    if args.file:
+        with open(args.file) as f:
+            algorithms += [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+    if not algorithms:
+        algorithms = ["R U R' U'", "R U R' U' R' F R2 U' R' U' R U R' F'", "F R U R' U' F'"]
+
+    start = time.perf_counter()
+    results = []
+    for alg in algorithms:
+        try:
+            results.append((alg, analyse_algorithm(alg)))
+        except ValueError as e:
+            print(f"Error: {alg!r}: {e}")
+    elapsed = time.perf_counter() - start
+    for alg, analysis in results:
+        print(format_analysis(alg, analysis))
+    print(f"Analysed {len(results)} algorithms in {elapsed * 1000:.2f} ms ({elapsed / max(len(results), 1) * 1e6:.0f} us each).")
@@ -0,0 +1,91 @@
+# batchsolve.py
+
+import concurrent.futures
+import json
+import os
+import sys
+from rubikscube import RubiksCube
+from kociembasolver import cube_from_facelets, cube_to_facelets, warm_up
+from solverbackend import solve_facelets
+
+NUM_WORKERS = os.cpu_count() or 1
+WINDOW_PER_WORKER = 4 # In-flight lines per worker; bounds memory however long the input is
+
+def cube_from_input(text):
+    """A line is either a 54-character URFDLB facelet string or a scramble applied to a solved cube."""
+    compact = text.strip()
+    if len(compact) == 54 and set(compact) <= set("URFDLB"): # Facelets have no spaces; 54 spaced face turns are a scramble
+        return cube_from_facelets(compact)
+    cube = RubiksCube()
+    cube.move(text)
+    return cube
+
+def parse_line(line_no, line):
+    """Plain text, or a JSON object with 'scramble' or 'facelets' and an optional 'id' that is echoed back."""
+    line = line.strip()
+    if line.startswith(('{', '[')): # A scramble never starts with a bracket, so these are (possibly wrong) JSON
+        obj = json.loads(line)
+        if not isinstance(obj, dict): raise ValueError("expected a JSON object.")
+        for field in ('facelets', 'scramble'):
+            if field in obj and not isinstance(obj[field], str): raise ValueError(f"'{field}' must be a string.")
+        text = next((obj[field] for field in ('facelets', 'scramble') if obj.get(field, '').strip()), None)
+        if text is None: raise ValueError("expected a 'facelets' or 'scramble' field.")
+        return {'line': line_no, 'id': obj.get('id'), 'input': text}
+    return {'line': line_no, 'input': line}
+
+def solve_item(item):
+    result = dict(item)
+    try:
+        cube = cube_from_input(item['input'])
+    except Exception as e: # ValueError from bad facelets, or anything a malformed scramble raises
+        result.update({'solution': None, 'moves': None, 'solve_ms': None, 'error': f"Error: invalid input. {e}"})
+        return result
+
+    try:
+        solved = solve_facelets(cube_to_facelets(cube))
+    except KeyError:
+        result.update({'solution': None, 'moves': None, 'solve_ms': None, 'error': "Error: Could not map cube colours. Ensure cube state is valid."})
+        return result
+    except Exception as e: # One bad line must not end the batch
+        result.update({'solution': None, 'moves': None, 'solve_ms': None, 'error': f"Error: {e}"})
+        return result
+    solve_ms = round(solved.elapsed * 1000.0, 3)
+    if solved.ok:
+        result.update({'solution': solved.solution, 'moves': solved.moves, 'solve_ms': solve_ms, 'error': None})
+    else:
+        result.update({'solution': None, 'moves': None, 'solve_ms': solve_ms, 'error': f"Error: {solved.message}"})
+    return result
+
+def run_batch(lines, out=sys.stdout, workers=NUM_WORKERS):
+    """
+    Solve every non-empty line concurrently and write one JSON result per line to `out` as soon
+    as it completes (so output order is completion order; use 'line' or 'id' to match inputs).
+    """
+    window = workers * WINDOW_PER_WORKER
+    counts = {'solved': 0, 'errors': 0}
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=warm_up) as pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = concurrent.futures.wait(pending, return_when=return_when)
+            for future in done:
+                result = future.result()
+                counts['errors' if result['error'] else 'solved'] += 1
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip(): continue
+            try:
+                item = parse_line(line_no, line)
+            except ValueError as e: # Includes json.JSONDecodeError
+                counts['errors'] += 1
+                message = f"invalid JSON. {e}" if isinstance(e, json.JSONDecodeError) else f"invalid input. {e}"
+                out.write(json.dumps({'line': line_no, 'input': line.strip(), 'solution': None, 'moves': None, 'solve_ms': None, 'error': f"Error: {message}"}) + "\n")
+                continue
+            pending.add(pool.submit(solve_item, item))
+            if len(pending) >= window: # Stop reading until something finishes
+                drain(concurrent.futures.FIRST_COMPLETED)
+        drain(concurrent.futures.ALL_COMPLETED)
+    return counts
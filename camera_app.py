@@ -4,41 +4,24 @@ import cv2
 import numpy as np
 import sys
 from screeninfo import get_monitors
-
-def select_camera():
-    print("Searching for cameras...")
-    for i in range(5):
-        cap = cv2.VideoCapture(i)
-        if not cap.isOpened():
-            continue
-
-        print(f"Testing camera index {i}...")
-        for _ in range(300): # Preview for ~10 seconds
-            ret, frame = cap.read()
-            if not ret: break
-            
-            frame = cv2.flip(frame, 1)
-            text = f"Camera Index: {i}. Use this camera? (y/n)"
-            cv2.putText(frame, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3, cv2.LINE_AA)
-            cv2.putText(frame, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2, cv2.LINE_AA)
-            cv2.imshow('Camera Selection', frame)
-            
-            key = cv2.waitKey(30) & 0xFF
-            if key == ord('y'):
-                print(f"Selected camera at index {i}.")
-                cv2.destroyWindow('Camera Selection')
-                return cap, i
-            elif key == ord('n'):
-                break
-        
-        cap.release()
-        cv2.destroyWindow('Camera Selection')
-
-    print("No camera was selected.")
-    return None, -1
+from framesource import LiveCameraSource, select_camera # select_camera re-exported for existing callers
+
+def grid_cells(frame_w, frame_h, sticker_size, gap):
+    """Top-left corners of the 3x3 grid centred in the frame, in display (mirrored) coordinates, row by row."""
+    grid_w = (3 * sticker_size) + (2 * gap)
+    start_x, start_y = (frame_w - grid_w) // 2, (frame_h - grid_w) // 2
+    return [(start_x + (i % 3) * (sticker_size + gap), start_y + (i // 3) * (sticker_size + gap)) for i in range(9)]
+
+def mirrored_rois(raw_frame, cells, sticker_size):
+    """
+    The stickers under `cells` as they appear in the mirrored display, cut from the unflipped camera frame.
+    Each is a view of the raw frame with its columns reversed, so nothing outside the nine squares is touched.
+    """
+    frame_w = raw_frame.shape[1]
+    return [raw_frame[y:y + sticker_size, frame_w - x - sticker_size:frame_w - x][:, ::-1] for x, y in cells]
 
 class CameraApp:
-    def __init__(self, window_name):
+    def __init__(self, window_name, source=None):
         self.window_name = window_name
         
         try:
@@ -47,29 +30,32 @@ class CameraApp:
         except Exception:
             self.screen_w, self.screen_h = 1920, 1080
 
-        self.cap, self.camera_index = select_camera()
-        if self.cap is None:
+        self.source = source or LiveCameraSource.select() # Any FrameSource: camera, file, or recorded session
+        if self.source is None:
             raise RuntimeError("Camera selection failed. Exiting.")
+        self.camera_index = self.source.camera_index
+        self.feed_w, self.feed_h = self.source.size
+        self._canvas = None
 
-        self.feed_w, self.feed_h = 1280, 720
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.feed_w)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.feed_h)
-
-        cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
-        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        if not self.source.headless:
+            cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
     def _display_frame(self, frame):
-        """Create a canvas and centre the camera feed on it."""
-        canvas = np.full((self.screen_h, self.screen_w, 3), 255, dtype=np.uint8)
+        """Centre the camera feed on a white screen-sized canvas (allocated once, reused every frame)."""
+        if self.source.headless: return
+        if self._canvas is None:
+            self._canvas = np.full((self.screen_h, self.screen_w, 3), 255, dtype=np.uint8)
         h, w, _ = frame.shape
         start_x = (self.screen_w - w) // 2
         start_y = (self.screen_h - h) // 2
-        canvas[start_y:start_y + h, start_x:start_x + w] = frame
-        cv2.imshow(self.window_name, canvas)
+        self._canvas[start_y:start_y + h, start_x:start_x + w] = frame
+        cv2.imshow(self.window_name, self._canvas)
 
     def cleanup(self):
-        """Release the camera and destroy all windows."""
+        """Release the frame source and destroy all windows."""
         print("Cleaning up and closing application.")
-        self.cap.release()
-        cv2.destroyAllWindows()
+        self.source.release()
+        if not self.source.headless:
+            cv2.destroyAllWindows()
 
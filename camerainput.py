@@ -1,37 +1,99 @@
 # camerainput.py 
 
+import argparse
+import concurrent.futures
 import cv2
 import numpy as np
 import os
-from tensorflow.keras.models import load_model
 from rubikscube import RubiksCube
-from camera_app import CameraApp # base class
+from camera_app import CameraApp, grid_cells, mirrored_rois # base class
+from framesource import add_source_arguments, source_from_args
+from faceinference import ambiguous_stickers, last_face_candidates
+from gridtracker import GridTracker, quad_cells, warp_stickers
+
+MODEL_PATH = os.path.join('models', 'best_model.keras')
+WARMUP_BATCH = np.zeros((9, 32, 32, 3), dtype=np.float32) # Same shape as one frame's stickers
+
+def load_warm_model(model_path=MODEL_PATH):
+    """Import TensorFlow, load the classifier and run one dummy batch, so the first live frame pays no setup cost."""
+    from tensorflow.keras.models import load_model # Imported here so even the TensorFlow import overlaps camera selection
+    model = load_model(model_path)
+    model(WARMUP_BATCH, training=False)
+    return model
 
 class CubeScannerApp(CameraApp):
     """Scanning a Rubik's Cube state with live predictions and freeze-frame review."""
-    def __init__(self):
-        super().__init__("Rubik's Cube CNN Scanner")
-        MODEL_PATH = os.path.join('models', 'best_model.keras')
+    def __init__(self, source=None):
+        # Load the model on a background thread while the (interactive) camera selection runs
         print(f"Loading colour classification model from: {MODEL_PATH}")
-        self.model = load_model(MODEL_PATH)
-        print("Model loaded.")
+        loader = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='ModelLoader')
+        self._model_future = loader.submit(load_warm_model, MODEL_PATH)
+        loader.shutdown(wait=False)
+        self.model = None
+        self.fine_tuner = None # Learns from EDIT-mode corrections in the background; needs the model
+
+        super().__init__("Rubik's Cube CNN Scanner", source)
         self.CLASS_LABELS = ['blue', 'green', 'orange', 'red', 'white', 'yellow']
         self.COLOR_TO_INT = {'white': 0, 'yellow': 1, 'blue': 2, 'green': 3, 'red': 4, 'orange': 5}
         self.INT_TO_FACE = {0: "U (White)", 1: "D (Yellow)", 2: "F (Blue)", 3: "B (Green)", 4: "L (Red)", 5: "R (Orange)"}
         self.scanned_faces = {}
+        self.last_face_options = None # Possible last faces, when five scanned faces leave some stickers open
+        self.ambiguous_mask = None # 3x3, True where those options disagree
+        self.ambiguous_cells = set() # The same stickers as grid cell indices (the grid is mirrored)
 
         # State management variables
         self.mode = 'ALIGN'  # ALIGN, REVIEW, EDIT
         self.captured_frame = None
         self.captured_predictions = None
+        self.captured_stickers = None # The nine 32x32 RGB crops the predictions were made from
+        self.original_predictions = None # Model output before any edits
         self.edit_selection_index = 4  # Start with centre sticker highlighted
+        self.tracker = GridTracker() # Finds the face's sticker grid, so it need not be lined up with a fixed one
+        self.captured_cells = None
         
-    def _predict_colour(self, roi):
-        roi_rgb = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
-        img = cv2.resize(roi_rgb, (32, 32))
-        img_array = np.expand_dims(img, axis=0) / 255.0
-        prediction = self.model.predict(img_array, verbose=0)
-        return self.CLASS_LABELS[np.argmax(prediction)]
+    def _sticker_batch(self, rois):
+        """The nine BGR sticker crops (views are fine) as one (9, 32, 32, 3) uint8 RGB batch."""
+        return np.stack([cv2.resize(np.ascontiguousarray(roi[:, :, ::-1]), (32, 32)) for roi in rois]) # BGR -> RGB
+
+    def _locate_stickers(self, raw_frame, sticker_size, gap):
+        """
+        The nine sticker crops in display order and their outlines in display coordinates. Uses the
+        tracked face when there is one, otherwise the fixed grid at the centre of the screen.
+        """
+        frame_h, frame_w = raw_frame.shape[:2]
+        quad = self.tracker.update(raw_frame)
+        if quad is None:
+            cells = grid_cells(frame_w, frame_h, sticker_size, gap)
+            outlines = [np.int32([[x, y], [x + sticker_size, y], [x + sticker_size, y + sticker_size], [x, y + sticker_size]]) for x, y in cells]
+            return mirrored_rois(raw_frame, cells, sticker_size), outlines, False
+        # Swapping left and right corners makes the warp mirror the face, as the display does
+        display_order = quad[[1, 0, 3, 2]]
+        mirrored = display_order.copy()
+        mirrored[:, 0] = frame_w - 1 - mirrored[:, 0]
+        return warp_stickers(raw_frame, display_order), quad_cells(mirrored), True
+
+    def _predict_colours(self, batch):
+        predictions = self.model(batch.astype(np.float32) / 255.0, training=False).numpy()
+        return [self.CLASS_LABELS[i] for i in np.argmax(predictions, axis=1)]
+
+    def _model_ready(self):
+        """True once the background load has finished; the first time, installs the model and starts the fine-tuner."""
+        if self.model is None and self._model_future.done():
+            try:
+                self.model = self._model_future.result()
+            except Exception as e: # Surface a failed load the same way as a failed camera
+                self.cleanup()
+                raise RuntimeError(f"Could not load the colour model: {e}") from e
+            if not self.source.reproducible: # A background swap, or a saved model, would make replays differ run to run
+                from finetuner import CorrectionFineTuner
+                self.fine_tuner = CorrectionFineTuner(self.model)
+            print("Model loaded.")
+        return self.model is not None
+
+    def cleanup(self):
+        if self.fine_tuner is not None:
+            self.fine_tuner.stop()
+        super().cleanup()
     
     def _save_current_face(self):
         """Helper function to save the face state and reset the app mode."""
@@ -50,64 +112,90 @@ class CubeScannerApp(CameraApp):
             face_state = [self.COLOR_TO_INT[c] for c in self.captured_predictions]
             mirrored_matrix = np.array(face_state).reshape(3, 3)
             correct_matrix = np.fliplr(mirrored_matrix)
+            if self.last_face_options is not None:
+                # Only the ambiguous stickers were needed; the rest follow from the other five faces
+                matches = [f for f in self.last_face_options if np.array_equal(f[self.ambiguous_mask], correct_matrix[self.ambiguous_mask])]
+                if len(matches) == 1: correct_matrix = matches[0]
             self.scanned_faces[centre_colour_int] = correct_matrix
+            if self.fine_tuner is not None:
+                self.fine_tuner.add_face(self.captured_stickers, self.original_predictions, self.captured_predictions)
             print(f"Scanned and saved face {self.INT_TO_FACE[centre_colour_int]}. {6 - len(self.scanned_faces)} faces remaining.")
+            if len(self.scanned_faces) == 5:
+                self._infer_last_face()
         
         # Reset state to go back to alignment mode
         self.mode = 'ALIGN'
         self.captured_frame = None
         self.captured_predictions = None
+        self.captured_stickers = None
+
+    def _infer_last_face(self):
+        """Fill in the sixth face from the cubies still unaccounted for, or narrow its scan down to the stickers that stay open."""
+        missing, options = last_face_candidates(self.scanned_faces)
+        name = self.INT_TO_FACE[missing]
+        if len(options) == 1:
+            self.scanned_faces[missing] = options[0]
+            print(f"Inferred face {name} from the other five; no need to scan it.")
+        elif options:
+            self.last_face_options = options
+            self.ambiguous_mask = ambiguous_stickers(options)
+            self.ambiguous_cells = {r * 3 + (2 - c) for r, c in zip(*np.nonzero(self.ambiguous_mask))}
+            print(f"Scan face {name}: only the {len(self.ambiguous_cells)} highlighted stickers are still undetermined.")
+        else:
+            print(f"The five scanned faces do not fit together as a cube. Scan face {name}, then check the others.")
 
     def run(self):
         print("\n   Starting Cube Scanner")
-        print("1. Align face to see live predictions.")
+        print("1. Hold a face up to see live predictions. The grid turns green once it has found the face and follows it;")
+        print("   until then, line the face up with the white grid.")
         print("2. Press SPACEBAR to capture and review.")
         print("3. Press ENTER to accept, 'e' to edit, or 'r' to retry.")
 
-        clean_frame_for_capture = None
+        sticker_size, gap = 40, 5
+        raw_frame = None # Unflipped camera frame; the grid is mirrored in coordinates, not pixels
+        if self.source.reproducible: # Recordings and replays both have the model from the first frame, so keys act the same in each
+            concurrent.futures.wait([self._model_future])
 
         while len(self.scanned_faces) < 6:
+            updated_model = self.fine_tuner.poll() if self.fine_tuner else None
+            if updated_model is not None: # Swapped here, between frames, so a prediction never sees half an update
+                self.model = updated_model
+                print("Colour model updated from your corrections.")
+
             # Frame acquisition and prediction
             if self.mode == 'ALIGN':
-                ret, live_frame = self.cap.read()
+                ret, raw_frame = self.source.read()
                 if not ret: break
-                clean_frame_for_capture = cv2.flip(live_frame, 1) # Store flipped frame
-                display_frame = clean_frame_for_capture.copy()
+                display_frame = cv2.flip(raw_frame, 1) # Mirrored once, for drawing on and showing
             else:           # REVIEW or EDIT
-                display_frame = self.captured_frame.copy()
+                display_frame = cv2.flip(self.captured_frame, 1)
 
-            sticker_size, gap = 40, 5
-            grid_w = (3 * sticker_size) + (2 * gap)
-            grid_start_x = (display_frame.shape[1] - grid_w) // 2
-            grid_start_y = (display_frame.shape[0] - grid_w) // 2
-            
             # Drawing predictions
             predictions_to_show = None
             if self.mode == 'ALIGN':
-                live_predictions = [] # For every frame
-                for i in range(9):
-                    row, col = i // 3, i % 3
-                    x1 = grid_start_x + col * (sticker_size + gap)
-                    y1 = grid_start_y + row * (sticker_size + gap)
-                    roi = display_frame[y1:y1 + sticker_size, x1:x1 + sticker_size]
-                    live_predictions.append(self._predict_colour(roi))
-                predictions_to_show = live_predictions
+                # Only the nine stickers are read from the raw frame (for every frame)
+                rois, cells, tracked = self._locate_stickers(raw_frame, sticker_size, gap)
+                if self._model_ready():
+                    live_stickers = self._sticker_batch(rois)
+                    predictions_to_show = self._predict_colours(live_stickers)
             else: # REVIEW or EDIT
+                cells, tracked = self.captured_cells, False
                 predictions_to_show = self.captured_predictions
 
             # Grid and live predictions
-            for i in range(9):
-                row, col = i // 3, i % 3
-                x1 = grid_start_x + col * (sticker_size + gap)
-                y1 = grid_start_y + row * (sticker_size + gap)
-                cv2.rectangle(display_frame, (x1, y1), (x1 + sticker_size, y1 + sticker_size), (255, 255, 255), 2)
+            for i, outline in enumerate(cells):
+                cv2.polylines(display_frame, [outline], True, (0, 255, 0) if tracked else (255, 255, 255), 2)
+                x1, y1 = outline.min(axis=0)
 
                 if predictions_to_show:
                     colour_name = predictions_to_show[i]
-                    cv2.putText(display_frame, colour_name[:1].upper(), (x1 + 5, y1 + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+                    cv2.putText(display_frame, colour_name[:1].upper(), (int(x1) + 5, int(y1) + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+
+                if self.mode == 'ALIGN' and i in self.ambiguous_cells:
+                    cv2.polylines(display_frame, [outline], True, (0, 255, 255), 5)
 
                 if self.mode == 'EDIT' and i == self.edit_selection_index:
-                    cv2.rectangle(display_frame, (x1, y1), (x1 + sticker_size, y1 + sticker_size), (0, 255, 0), 4)
+                    cv2.polylines(display_frame, [outline], True, (0, 255, 0), 4)
 
             # Centre face info and instructions
             if predictions_to_show:
@@ -131,7 +219,11 @@ class CubeScannerApp(CameraApp):
                         cv2.putText(display_frame, orientation_text, (20, text_y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
 
             # Text
-            if self.mode == 'ALIGN':
+            if self.mode == 'ALIGN' and self.model is None:
+                cv2.putText(display_frame, "Loading colour model...", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+            elif self.mode == 'ALIGN' and self.ambiguous_cells:
+                cv2.putText(display_frame, "Last face: only the highlighted stickers are needed. SPACEBAR to capture.", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+            elif self.mode == 'ALIGN':
                 cv2.putText(display_frame, "Press SPACEBAR to capture; 'q' to quit.", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
             elif self.mode == 'REVIEW':
                 cv2.putText(display_frame, "ENTER: Accept | 'e': Edit | 'r': Retry", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
@@ -149,15 +241,19 @@ class CubeScannerApp(CameraApp):
             self._display_frame(display_frame)
 
             # Key Handling
-            key = cv2.waitKey(1) & 0xFF
+            key = self.source.wait_key(1) & 0xFF
             if key == ord('q'): break
 
             if self.mode == 'ALIGN':
-                if key == ord(' '):  # SPACEBAR
+                if key == ord(' ') and predictions_to_show:  # SPACEBAR, once the model is ready
                     print("Frame captured. Review predictions.")
-                    # Save the frame stored earlier, not the one with text on it.
-                    self.captured_frame = clean_frame_for_capture.copy()
+                    # Keep the raw frame, not the one with text on it (each read returns a new array)
+                    self.captured_frame = raw_frame
                     self.captured_predictions = predictions_to_show[:]  # Copy the list
+                    self.original_predictions = predictions_to_show[:]
+                    self.captured_stickers = live_stickers
+                    self.captured_cells = cells
+                    self.tracker.reset() # No frames are read while reviewing, so the next one starts from a fresh detection
                     self.mode = 'REVIEW'
             
             elif self.mode == 'REVIEW':
@@ -201,9 +297,9 @@ class CubeScannerApp(CameraApp):
             print("\nScanning was not completed. Exiting.")
             return None
 
-def get_cube_from_camera():
+def get_cube_from_camera(source=None):
     try:
-        scanner = CubeScannerApp()
+        scanner = CubeScannerApp(source)
         cube_object = scanner.run()
         return cube_object
     except RuntimeError as e:
@@ -211,8 +307,16 @@ def get_cube_from_camera():
         return None
 
 if __name__ == "__main__":
-    cube = get_cube_from_camera()
+    parser = argparse.ArgumentParser(description="Scan a cube with the camera, a video, images, or a recorded session.")
+    add_source_arguments(parser)
+    args = parser.parse_args()
+
+    source = source_from_args(args)
+    cube = get_cube_from_camera(source) if source is not None else None
     if cube:
         print("\nFinal cube state from test run:")
         print(cube.state)
+    if args.replay:
+        replay = getattr(source, 'inner', source) # Unwrap if the replay was also being recorded
+        print(f"Replay: {replay.stats()}")
 
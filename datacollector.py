@@ -1,27 +1,35 @@
 # datacollector.py
 
+import argparse
 import cv2
 import numpy as np
-import os
-import uuid
 from camera_app import CameraApp # base class
+from stickerstore import ShardWriter, convert_folder_dataset, shard_root, unconverted_folders
+from dedupindex import has_index, update_index
+from framesource import add_source_arguments, source_from_args
 
 class DataCollectorApp(CameraApp):
     """Collecting sticker image data."""
-    def __init__(self, target_directory):
+    def __init__(self, target_directory, source=None):
         self.DATA_DIR = target_directory
         self.IMG_SIZE = (32, 32)
         self.COLOUR_MAP = {'w': 'white', 'y': 'yellow', 'b': 'blue', 'g': 'green', 'r': 'red', 'o': 'orange'}
         self.BGR_COLOUR_MAP = {'white': (255, 255, 255), 'yellow': (0, 255, 255), 'blue': (255, 0, 0), 'green': (0, 255, 0), 'red': (0, 0, 255), 'orange': (0, 165, 255)}
-        self._setup_directories()
         
-        super().__init__("Rubik's Cube data collector")
+        super().__init__("Rubik's Cube data collector", source)
 
-    def _setup_directories(self):
-        print(f"Ensuring directories exist in '{self.DATA_DIR}'...")
-        for colour_name in self.COLOUR_MAP.values():
-            os.makedirs(os.path.join(self.DATA_DIR, colour_name), exist_ok=True)
-        print("Directories are ready.")
+        if unconverted_folders(self.DATA_DIR): # Otherwise the new shards would hide the existing PNG folders from training
+            convert_folder_dataset(self.DATA_DIR)
+
+        # Samples are appended to shards by a background thread, never written on the UI thread
+        print(f"Saving stickers to shards in '{shard_root(self.DATA_DIR)}'.")
+        self.writer = ShardWriter(shard_root(self.DATA_DIR), {'data_dir': self.DATA_DIR, 'camera_index': self.camera_index})
+
+    def cleanup(self):
+        self.writer.close()
+        if has_index(self.DATA_DIR): # Keep the duplicate index current; only this session's shards are hashed
+            update_index(self.DATA_DIR)
+        super().cleanup()
 
     def run(self):
         print("\n   Starting Data Collector")
@@ -30,10 +38,12 @@ class DataCollectorApp(CameraApp):
         print("3. Use BACKSPACE to correct, 's' to skip, 'q' to quit.")
         
         while True:
-            ret, frame = self.cap.read()
+            ret, frame = self.source.read()
             if not ret: break
 
-            unflipped_frame = cv2.resize(frame, (self.feed_w, self.feed_h))
+            unflipped_frame = frame
+            if frame.shape[1::-1] != (self.feed_w, self.feed_h): # Only when the driver ignored the negotiated size
+                unflipped_frame = cv2.resize(frame, (self.feed_w, self.feed_h))
             annotated_frame = cv2.flip(unflipped_frame, 1)
             
             sticker_size, gap = 50, 7
@@ -50,7 +60,7 @@ class DataCollectorApp(CameraApp):
             
             self._display_frame(annotated_frame)
 
-            key = cv2.waitKey(1) & 0xFF
+            key = self.source.wait_key(1) & 0xFF
             if key == ord('q'): break
             if key == ord(' '):
                 self._capture_and_label_face(unflipped_frame, sticker_size, gap, grid_start_x, grid_start_y)
@@ -92,7 +102,7 @@ class DataCollectorApp(CameraApp):
             
             self._display_frame(display_copy)
             
-            key = cv2.waitKey(0)
+            key = self.source.wait_key(0)
             if key in [8, 127]: # Backspace
                 i = max(0, i - 1)
                 face_data_to_save[i] = None
@@ -111,13 +121,16 @@ class DataCollectorApp(CameraApp):
 
         images_to_save = [d for d in face_data_to_save if d is not None]
         if images_to_save:
-            print(f"\nSaving {len(images_to_save)} images to '{self.DATA_DIR}'...")
             for data in images_to_save:
-                save_path = os.path.join(self.DATA_DIR, data['label'], f"{data['label']}_{uuid.uuid4()}.png")
-                cv2.imwrite(save_path, cv2.resize(data['roi'], self.IMG_SIZE))
-            print("Save complete.")
+                sticker = cv2.resize(data['roi'], self.IMG_SIZE)
+                self.writer.add(cv2.cvtColor(sticker, cv2.COLOR_BGR2RGB), data['label'])
+            print(f"\nQueued {len(images_to_save)} images for '{self.DATA_DIR}'.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect labelled sticker images.")
+    add_source_arguments(parser)
+    args = parser.parse_args()
+
     target_dir = None
     while True:
         choice = input("Save images to:\n1. Training dataset (dataset)\n2. Test dataset (test_dataset)\nEnter choice (1 or 2): ")
@@ -130,6 +143,9 @@ if __name__ == "__main__":
         else:
             print("Invalid choice. Please enter 1 or 2.")
 
-    app = DataCollectorApp(target_directory=target_dir)
+    source = source_from_args(args)
+    if source is None:
+        raise SystemExit("Camera selection failed. Exiting.")
+    app = DataCollectorApp(target_directory=target_dir, source=source)
     app.run()
 
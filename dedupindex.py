@@ -0,0 +1,211 @@
+# dedupindex.py
+
+import argparse
+import os
+import numpy as np
+from stickerstore import CLASS_NAMES, ShardReader, has_shards, label_counts, rewrite_index, shard_root, write_shard_files
+
+INDEX_NAME = 'phash_index.npz'
+HASH_SIZE = 8 # 8x8 lowest DCT frequencies -> 64-bit hash
+MAX_DISTANCE = 6 # Hamming distance at or below which two hashes count as near-duplicates (flat stickers make a few bits noisy)
+MAX_COLOUR_DISTANCE = 4.0 # And their mean colours (0-255 RGB) must be this close, so lighting changes are kept
+BATCH = 4096
+
+def _dct_matrix(size, keep=HASH_SIZE):
+    x = np.arange(size, dtype=np.float32)
+    u = np.arange(keep, dtype=np.float32)[:, None]
+    return np.sqrt(2.0 / size) * np.cos(np.pi * (2 * x + 1) * u / (2 * size)).astype(np.float32)
+
+def perceptual_hashes(images):
+    """
+    64-bit DCT perceptual hashes and mean colours of (n, h, w, 3) uint8 RGB stickers, whole batch
+    at once. Each bit is whether a low-frequency luminance coefficient is above the image's median.
+    """
+    images = np.asarray(images)
+    luminance = images.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    rows, cols = _dct_matrix(images.shape[1]), _dct_matrix(images.shape[2])
+    coeffs = (rows @ luminance @ cols.T).reshape(len(images), HASH_SIZE * HASH_SIZE)
+    bits = coeffs > np.median(coeffs[:, 1:], axis=1, keepdims=True) # DC term left out of the median
+    hashes = np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+    means = images.reshape(len(images), -1, 3).mean(axis=1).astype(np.float32)
+    return hashes, means
+
+def _index_path(data_dir):
+    return os.path.join(shard_root(data_dir), INDEX_NAME)
+
+def _save_index(data_dir, shards, counts, hashes, means, labels):
+    tmp_path = _index_path(data_dir) + '.tmp.npz'
+    np.savez(tmp_path, shards=np.array(shards, dtype=str), counts=np.array(counts, dtype=np.int64),
+             hashes=hashes, means=means, labels=labels)
+    os.replace(tmp_path, _index_path(data_dir))
+
+def has_index(data_dir):
+    return os.path.exists(_index_path(data_dir))
+
+def update_index(data_dir):
+    """
+    Hashes of every sticker in a dataset's shard store, in index order. Only shards not already in
+    the saved hash index are read and hashed; shards that have gone are dropped from it.
+    Returns (hashes, mean colours, labels).
+    """
+    reader = ShardReader(shard_root(data_dir))
+    known = {}
+    if has_index(data_dir):
+        with np.load(_index_path(data_dir)) as saved:
+            offsets = np.concatenate([[0], np.cumsum(saved['counts'])])
+            for k, name in enumerate(saved['shards']):
+                part = slice(offsets[k], offsets[k + 1])
+                known[str(name)] = (saved['hashes'][part], saved['means'][part], saved['labels'][part])
+
+    parts, new = [], 0
+    for entry, images, labels in zip(reader.entries, reader.image_blocks, reader.label_blocks):
+        if entry['shard'] not in known:
+            hashed = [perceptual_hashes(images[i:i + BATCH]) for i in range(0, len(labels), BATCH)]
+            known[entry['shard']] = (np.concatenate([h for h, _ in hashed]) if hashed else np.zeros(0, dtype=np.uint64),
+                                     np.concatenate([m for _, m in hashed]) if hashed else np.zeros((0, 3), dtype=np.float32),
+                                     np.array(labels, dtype=np.uint8))
+            new += len(labels)
+        parts.append(known[entry['shard']])
+
+    hashes = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, dtype=np.uint64)
+    means = np.concatenate([p[1] for p in parts]) if parts else np.zeros((0, 3), dtype=np.float32)
+    labels = np.concatenate([p[2] for p in parts]) if parts else np.zeros(0, dtype=np.uint8)
+    _save_index(data_dir, [e['shard'] for e in reader.entries], [e['count'] for e in reader.entries], hashes, means, labels)
+    if new: print(f"Hashed {new} new stickers in '{shard_root(data_dir)}'.")
+    return hashes, means, labels
+
+def near_duplicate_pairs(hashes, means, labels, max_distance=MAX_DISTANCE, max_colour_distance=MAX_COLOUR_DISTANCE):
+    """
+    (i, j) index arrays, i < j, of same-label stickers whose hashes differ in at most `max_distance`
+    bits and whose mean colours are close. Candidates come from multi-index hashing: the 64 bits are
+    split into max_distance + 1 blocks, and any pair that close must agree exactly on one of them.
+    """
+    n = len(hashes)
+    bounds = np.linspace(0, 64, max_distance + 2).astype(np.uint64)
+    found = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        block = (hashes >> lo) & ((np.uint64(1) << (hi - lo)) - np.uint64(1))
+        keys = block.astype(np.int64) * len(CLASS_NAMES) + labels
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # End of each run of equal keys; pairs are every member with every later member of its run
+        run_end = np.searchsorted(sorted_keys, sorted_keys, side='right')
+        active = np.flatnonzero(run_end - np.arange(n) > 1)
+        step = 1
+        while len(active):
+            found.append(np.stack([order[active], order[active + step]]))
+            step += 1
+            active = active[run_end[active] - active > step]
+    if not found:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    i, j = np.concatenate(found, axis=1)
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    close = np.bitwise_count(hashes[i] ^ hashes[j]) <= max_distance
+    close &= np.linalg.norm(means[i] - means[j], axis=1) <= max_colour_distance
+    pair_ids = np.unique(i[close] * n + j[close])
+    return pair_ids // n, pair_ids % n
+
+def cluster_ids(n, i, j):
+    """Connected components of the pair graph; each sticker's id is the smallest index in its cluster."""
+    parent = np.arange(n)
+    while len(i):
+        low = np.minimum(parent[i], parent[j])
+        np.minimum.at(parent, parent[i], low)
+        np.minimum.at(parent, parent[j], low)
+        while not np.array_equal(parent, parent[parent]): # Point every sticker straight at its root
+            parent = parent[parent]
+        if np.array_equal(parent[i], parent[j]): break
+    return parent
+
+def duplicate_mask(data_dir, max_distance=MAX_DISTANCE):
+    """Stickers to drop so each near-duplicate cluster keeps only its earliest capture."""
+    hashes, means, labels = update_index(data_dir)
+    i, j = near_duplicate_pairs(hashes, means, labels, max_distance)
+    return cluster_ids(len(hashes), i, j) != np.arange(len(hashes))
+
+def leak_mask(train_dir, test_dir, max_distance=MAX_DISTANCE):
+    """Training stickers with a near-duplicate in the test set."""
+    train, test = update_index(train_dir), update_index(test_dir)
+    hashes, means, labels = (np.concatenate([a, b]) for a, b in zip(train, test))
+    i, j = near_duplicate_pairs(hashes, means, labels, max_distance)
+    n_train = len(train[0])
+    cross = (i < n_train) & (j >= n_train) # i < j, so a train/test pair always has the train sticker first
+    mask = np.zeros(n_train, dtype=bool)
+    mask[i[cross]] = True
+    return mask, np.unique(j[cross] - n_train)
+
+def prune(data_dir, remove):
+    """
+    Rewrite the shards that lose stickers (new files, same session fields in the index) and
+    delete the old ones. `remove` is a boolean mask in index order. Converted file names stay in
+    the index even when their stickers are pruned, so a later conversion does not bring them back.
+    """
+    root = shard_root(data_dir)
+    reader = ShardReader(root)
+    with np.load(_index_path(data_dir)) as saved:
+        hashes, means, labels = saved['hashes'], saved['means'], saved['labels']
+    entries, stale, offset = [], [], 0
+    orphaned_files = [] # Converted file names of shards that lose every sticker
+    for entry, images, shard_labels in zip(reader.entries, reader.image_blocks, reader.label_blocks):
+        drop = remove[offset:offset + len(shard_labels)]
+        offset += len(shard_labels)
+        if not drop.any():
+            entries.append(entry)
+            continue
+        stale.append(entry['shard'])
+        keep = ~drop
+        if not keep.any():
+            orphaned_files.extend(entry.get('files', ()))
+        else:
+            name = write_shard_files(root, np.array(images[keep]), np.array(shard_labels[keep]))
+            entries.append({**entry, 'shard': name, 'count': int(keep.sum()), 'label_counts': label_counts(shard_labels[keep]),
+                            'pruned': entry.get('pruned', 0) + int(drop.sum())})
+    if orphaned_files and entries:
+        entries[-1] = {**entries[-1], 'files': entries[-1].get('files', []) + orphaned_files}
+    reader = images = shard_labels = None # Release the memory maps before deleting their files
+    rewrite_index(root, entries)
+    _save_index(data_dir, [e['shard'] for e in entries], [e['count'] for e in entries],
+                hashes[~remove], means[~remove], labels[~remove])
+    for name in stale:
+        for suffix in ('images', 'labels'):
+            os.remove(os.path.join(root, f"{name}.{suffix}.npy"))
+    return int(remove.sum())
+
+def report(train_dir, test_dir, max_distance=MAX_DISTANCE):
+    for data_dir in (train_dir, test_dir):
+        if not has_shards(data_dir): continue
+        hashes, means, labels = update_index(data_dir)
+        i, j = near_duplicate_pairs(hashes, means, labels, max_distance)
+        ids = cluster_ids(len(hashes), i, j)
+        duplicates = ids != np.arange(len(ids))
+        sizes = np.bincount(ids, minlength=len(ids))
+        print(f"\n{data_dir}: {len(hashes):,} stickers, {duplicates.sum():,} near-duplicates "
+              f"in {np.count_nonzero(sizes > 1):,} clusters (largest {sizes.max() if len(sizes) else 0}).")
+        for name, count in zip(CLASS_NAMES, np.bincount(labels[duplicates], minlength=len(CLASS_NAMES))):
+            print(f"  {name}: {count} duplicates")
+    if has_shards(train_dir) and has_shards(test_dir):
+        train_leaks, test_leaks = leak_mask(train_dir, test_dir, max_distance)
+        n_test = len(update_index(test_dir)[0])
+        print(f"\nLeakage: {len(test_leaks):,} of {n_test:,} test stickers ({len(test_leaks) / max(n_test, 1):.1%}) "
+              f"have a near-duplicate among {train_leaks.sum():,} training stickers.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find and prune near-duplicate stickers with perceptual hashes.")
+    parser.add_argument('command', choices=['report', 'prune'])
+    parser.add_argument('data_dir', nargs='?', default='dataset', help="Dataset to prune (report covers --train and --test).")
+    parser.add_argument('--train', default='dataset')
+    parser.add_argument('--test', default='test_dataset')
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE)
+    parser.add_argument('--leaks', action='store_true', help="With prune: also drop training stickers that duplicate a test sticker.")
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        report(args.train, args.test, args.max_distance)
+    elif not has_shards(args.data_dir):
+        print(f"Error: '{args.data_dir}' has no shards. Convert it first with: python stickerstore.py convert {args.data_dir}")
+    else:
+        remove = duplicate_mask(args.data_dir, args.max_distance)
+        if args.leaks:
+            remove |= leak_mask(args.data_dir, args.test, args.max_distance)[0]
+        print(f"Removed {prune(args.data_dir, remove):,} stickers from '{shard_root(args.data_dir)}'.")
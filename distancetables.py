@@ -0,0 +1,212 @@
+# distancetables.py
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+import numpy as np
+from rubikscube import CORNER_STICKERS, EDGE_STICKERS, piece_state, piece_transitions, sticker_permutation
+
+ALL_MOVES = [face + modifier for face in "UDFBLR" for modifier in ["", "'", "2"]]
+UNVISITED = 255
+CHUNK_STATES = 1 << 20 # Frontier states per worker task
+TABLES_DIR = 'tables'
+
+# Named coordinate spaces; pieces are indices into CORNER_STICKERS / EDGE_STICKERS
+PRESETS = {
+    'corners': {'corners': list(range(8)), 'edges': [], 'moves': ALL_MOVES}, # 8! * 3^7 = 88,179,840 states
+    'ru-corners': {'corners': list(range(8)), 'edges': [], 'moves': ["R", "R'", "R2", "U", "U'", "U2"]},
+    'll-corners': {'corners': [0, 1, 2, 3], 'edges': [], 'moves': ALL_MOVES},
+    'll-edges': {'corners': [], 'edges': [0, 1, 2, 3], 'moves': ALL_MOVES},
+    'edges-6': {'corners': [], 'edges': list(range(6)), 'moves': ALL_MOVES}, # 12!/6! * 2^6 = 42,577,920 states
+}
+
+class PieceCoordinate:
+    """
+    Dense integer coordinate for the positions and orientations of a chosen set of corners and edges.
+    Each group is ranked as a partial permutation of its tracked pieces over all slots, times their
+    orientations (the last orientation is implied when every piece of the group is tracked).
+    All methods work on whole NumPy arrays of coordinates at once.
+    """
+    def __init__(self, corners=(), edges=(), moves=ALL_MOVES):
+        self.corners, self.edges, self.moves = list(corners), list(edges), list(moves)
+        self.groups = []
+        for stickers, tracked, twists in ((CORNER_STICKERS, self.corners, 3), (EDGE_STICKERS, self.edges, 2)):
+            if not tracked: continue
+            n, k = len(stickers), len(tracked)
+            free_oris = k - 1 if k == n else k
+            perm_size = math.perm(n, k)
+            transitions = [piece_transitions(stickers, sticker_permutation(m)) for m in self.moves]
+            self.groups.append({'stickers': stickers, 'tracked': tracked, 'n': n, 'k': k, 'twists': twists,
+                                'free_oris': free_oris, 'size': perm_size * twists ** free_oris, 'transitions': transitions})
+        self.size = math.prod(g['size'] for g in self.groups)
+
+    def _encode_group(self, g, pos, ori):
+        rank = np.zeros(len(pos), dtype=np.int64)
+        for i in range(g['k']): # Lehmer-style digit: slots below pos[i] not already taken by earlier pieces
+            digit = pos[:, i] - np.sum(pos[:, :i] < pos[:, i:i + 1], axis=1)
+            rank = rank * (g['n'] - i) + digit
+        ori_code = np.zeros(len(pos), dtype=np.int64)
+        for i in range(g['free_oris']):
+            ori_code = ori_code * g['twists'] + ori[:, i]
+        return rank * g['twists'] ** g['free_oris'] + ori_code
+
+    def _decode_group(self, g, code):
+        rank, ori_code = np.divmod(code, g['twists'] ** g['free_oris'])
+        ori = np.zeros((len(code), g['k']), dtype=np.int64)
+        for i in reversed(range(g['free_oris'])):
+            ori_code, ori[:, i] = np.divmod(ori_code, g['twists'])
+        if g['free_oris'] < g['k']:
+            ori[:, -1] = (-ori[:, :-1].sum(axis=1)) % g['twists']
+
+        digits = np.zeros((len(code), g['k']), dtype=np.int64)
+        for i in reversed(range(g['k'])):
+            rank, digits[:, i] = np.divmod(rank, g['n'] - i)
+        pos = np.zeros((len(code), g['k']), dtype=np.int64)
+        used = np.zeros((len(code), g['n']), dtype=bool)
+        rows = np.arange(len(code))
+        for i in range(g['k']): # digits[i]-th free slot
+            free_rank = np.cumsum(~used, axis=1) - 1
+            pos[:, i] = np.argmax((free_rank == digits[:, i:i + 1]) & ~used, axis=1)
+            used[rows, pos[:, i]] = True
+        return pos, ori
+
+    def encode(self, group_states):
+        index = np.zeros(len(group_states[0][0]), dtype=np.int64)
+        for g, (pos, ori) in zip(self.groups, group_states):
+            index = index * g['size'] + self._encode_group(g, pos, ori)
+        return index
+
+    def decode(self, index):
+        group_states = []
+        for g in reversed(self.groups):
+            index, code = np.divmod(index, g['size'])
+            group_states.append(self._decode_group(g, code))
+        return group_states[::-1]
+
+    def apply_move(self, group_states, move_idx):
+        moved = []
+        for g, (pos, ori) in zip(self.groups, group_states):
+            slot_map, ori_map = g['transitions'][move_idx]
+            moved.append((slot_map[pos], ori_map[pos, ori]))
+        return moved
+
+    def neighbours(self, index):
+        group_states = self.decode(index)
+        return np.concatenate([self.encode(self.apply_move(group_states, m)) for m in range(len(self.moves))])
+
+    def from_cube(self, cube):
+        group_states = []
+        for g in self.groups:
+            pos, ori = piece_state(cube.state, g['stickers'])
+            group_states.append((pos[g['tracked']][None, :], ori[g['tracked']][None, :]))
+        return int(self.encode(group_states)[0])
+
+    def solved_index(self):
+        return int(self.encode([(np.array([g['tracked']]), np.zeros((1, g['k']), dtype=np.int64)) for g in self.groups])[0])
+
+_worker_coordinate = None
+
+def _init_worker(spec):
+    global _worker_coordinate
+    _worker_coordinate = PieceCoordinate(**spec)
+
+def _expand_chunk(args):
+    """Unvisited neighbours of one slice of the frontier (the table is only read here; the parent writes)."""
+    table_path, frontier = args
+    table = np.load(table_path, mmap_mode='r')
+    candidates = np.unique(_worker_coordinate.neighbours(frontier))
+    return candidates[table[candidates] == UNVISITED]
+
+def _iter_frontier(bits, size):
+    step = CHUNK_STATES // 8
+    for start in range(0, len(bits), step):
+        block = bits[start:start + step]
+        if not block.any(): continue
+        indices = np.flatnonzero(np.unpackbits(block)) + start * 8
+        yield indices[indices < size]
+
+def build_distance_table(name, corners=(), edges=(), moves=ALL_MOVES, out_dir=TABLES_DIR, workers=None, max_depth=None):
+    """
+    Breadth-first search from solved over the coordinate space, one depth layer at a time. The
+    frontier is a bit set; each layer is split into chunks expanded by a process pool. The table
+    is a uint8 .npy (distance per coordinate, 255 = unreached) that can be opened with mmap_mode='r'.
+    """
+    spec = {'corners': list(corners), 'edges': list(edges), 'moves': list(moves)}
+    coord = PieceCoordinate(**spec)
+    os.makedirs(out_dir, exist_ok=True)
+    table_path = os.path.join(out_dir, f"{name}.npy")
+    print(f"Building '{name}': {coord.size:,} coordinates, {len(coord.moves)} moves -> {table_path}")
+
+    table = np.lib.format.open_memmap(table_path, mode='w+', dtype=np.uint8, shape=(coord.size,))
+    table[:] = UNVISITED
+    frontier = np.zeros((coord.size + 7) // 8, dtype=np.uint8)
+    solved = coord.solved_index()
+    table[solved] = 0
+    frontier[solved >> 3] |= np.uint8(0x80 >> (solved & 7))
+    distribution = {0: 1}
+
+    start = time.perf_counter()
+    depth = 0
+    with multiprocessing.Pool(workers or os.cpu_count() or 1, initializer=_init_worker, initargs=(spec,)) as pool:
+        while distribution.get(depth) and (max_depth is None or depth < max_depth):
+            table.flush() # Workers read the table from disk
+            next_frontier = np.zeros_like(frontier)
+            found = 0
+            tasks = ((table_path, chunk) for chunk in _iter_frontier(frontier, coord.size))
+            for new in pool.imap_unordered(_expand_chunk, tasks):
+                new = new[table[new] == UNVISITED] # Another chunk may have reached them first
+                table[new] = depth + 1
+                np.bitwise_or.at(next_frontier, new >> 3, (0x80 >> (new & 7)).astype(np.uint8))
+                found += len(new)
+            depth += 1
+            frontier = next_frontier
+            if found:
+                distribution[depth] = found
+                print(f"  depth {depth:2d}: {found:>12,} states  ({time.perf_counter() - start:.1f}s)")
+    table.flush()
+
+    meta = {**spec, 'name': name, 'size': coord.size, 'reached': int(sum(distribution.values())),
+            'distribution': distribution, 'max_depth': max(distribution), 'build_seconds': round(time.perf_counter() - start, 2)}
+    with open(os.path.join(out_dir, f"{name}.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+class DistanceTable:
+    """A built table, memory-mapped, with the coordinate needed to look cubes up in it."""
+    def __init__(self, name, tables_dir=TABLES_DIR):
+        with open(os.path.join(tables_dir, f"{name}.json")) as f:
+            self.meta = json.load(f)
+        self.meta['distribution'] = {int(depth): count for depth, count in self.meta['distribution'].items()} # JSON keys are strings
+        self.coordinate = PieceCoordinate(self.meta['corners'], self.meta['edges'], self.meta['moves'])
+        self.table = np.load(os.path.join(tables_dir, f"{name}.npy"), mmap_mode='r')
+
+    def distance(self, cube):
+        """Moves needed (within the table's move set) to solve the tracked pieces; None if unreachable."""
+        d = int(self.table[self.coordinate.from_cube(cube)])
+        return None if d == UNVISITED else d
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build BFS distance tables for piece subsets and move subgroups.")
+    parser.add_argument('name', help=f"Preset ({', '.join(PRESETS)}) or a name for a custom table.")
+    parser.add_argument('--corners', nargs='*', type=int, help="Tracked corners (0-7, Kociemba order URF UFL ULB UBR DFR DLF DBL DRB).")
+    parser.add_argument('--edges', nargs='*', type=int, help="Tracked edges (0-11, UR UF UL UB DR DF DL DB FR FL BL BR).")
+    parser.add_argument('--moves', nargs='*', help="Move set, e.g. R R' R2 U U' U2 (default: all 18 face moves).")
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=TABLES_DIR)
+    args = parser.parse_args()
+
+    spec = dict(PRESETS.get(args.name, {'corners': [], 'edges': [], 'moves': ALL_MOVES}))
+    for key in ('corners', 'edges', 'moves'):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+    if not spec['corners'] and not spec['edges']:
+        parser.error("Choose a preset or at least one --corners/--edges piece.")
+
+    meta = build_distance_table(args.name, spec['corners'], spec['edges'], spec['moves'], args.out, args.workers, args.max_depth)
+    print(f"\n{meta['reached']:,} of {meta['size']:,} coordinates reached, max depth {meta['max_depth']}, {meta['build_seconds']}s.")
+    for depth, count in meta['distribution'].items():
+        print(f"{depth:>3}: {count:,}")
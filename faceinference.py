@@ -0,0 +1,106 @@
+# faceinference.py
+
+import itertools
+import numpy as np
+from rubikscube import CORNER_STICKERS, EDGE_STICKERS, RubiksCube
+
+UNKNOWN = -1
+_SOLVED = RubiksCube().state.ravel()
+HOME_CORNERS = [tuple(_SOLVED[list(p)]) for p in CORNER_STICKERS] # Colours of each corner, in sticker order
+HOME_EDGES = [tuple(_SOLVED[list(p)]) for p in EDGE_STICKERS]
+
+def _options(colours, homes, pieces_left):
+    """(piece, twist) pairs whose colours, rotated by `twist`, agree with every known sticker of a slot."""
+    options = []
+    for piece in pieces_left:
+        home = homes[piece]
+        for twist in range(len(home)):
+            rotated = home[twist:] + home[:twist]
+            if all(c == UNKNOWN or c == h for c, h in zip(colours, rotated)):
+                options.append((piece, twist))
+    return options
+
+def _parity(permutation):
+    seen, parity = set(), 0
+    for start in range(len(permutation)):
+        length, i = 0, start
+        while i not in seen:
+            seen.add(i)
+            i = permutation[i]
+            length += 1
+        parity += max(length - 1, 0)
+    return parity % 2
+
+def _assignments(flat, stickers, homes):
+    """
+    Every way to fill the slots with unknown stickers using the pieces not already seen whole.
+    Returns ([(slot, piece, twist), ...] for the fixed slots, list of candidate fillings), or None
+    if the known stickers already contradict each other.
+    """
+    fixed, open_slots = [], []
+    for slot, piece_stickers in enumerate(stickers):
+        colours = tuple(int(flat[s]) for s in piece_stickers)
+        (open_slots if UNKNOWN in colours else fixed).append((slot, colours))
+    seen = []
+    for slot, colours in fixed:
+        options = _options(colours, homes, range(len(homes)))
+        if len(options) != 1 or options[0][0] in [piece for _, piece, _ in seen]: return None # Impossible piece or seen twice
+        seen.append((slot,) + options[0])
+
+    pieces_left = [p for p in range(len(homes)) if p not in [piece for _, piece, _ in seen]]
+    per_slot = [[(slot,) + option for option in _options(colours, homes, pieces_left)] for slot, colours in open_slots]
+    fillings = [filling for filling in itertools.product(*per_slot) if len({piece for _, piece, _ in filling}) == len(filling)]
+    return seen, fillings
+
+def last_face_candidates(faces):
+    """
+    Complete a cube from five scanned faces. `faces` maps face index -> 3x3 colour array for five of
+    the six faces, with colour c being the centre colour of face c. Returns (missing face index,
+    list of 3x3 arrays): every version of the missing face that gives a valid cube. That means each
+    cubie appears once, corner twists sum to 0 mod 3, edge flips sum to 0 mod 2, and the corner and
+    edge permutations have equal parity. An empty list means the five faces cannot all be right.
+    """
+    missing = [face for face in range(6) if face not in faces]
+    if len(missing) != 1: raise ValueError("Exactly five faces are needed.")
+    missing = missing[0]
+    state = np.full((6, 3, 3), UNKNOWN, dtype=int)
+    for face, matrix in faces.items():
+        state[face] = matrix
+    state[missing, 1, 1] = missing
+    flat = state.ravel()
+
+    corners, edges = _assignments(flat, CORNER_STICKERS, HOME_CORNERS), _assignments(flat, EDGE_STICKERS, HOME_EDGES)
+    if corners is None or edges is None: return missing, []
+
+    candidates = []
+    for corner_fill, edge_fill in itertools.product(corners[1], edges[1]):
+        placed_corners, placed_edges = corners[0] + list(corner_fill), edges[0] + list(edge_fill)
+        if sum(t for _, _, t in placed_corners) % 3 or sum(t for _, _, t in placed_edges) % 2: continue
+        corner_perm, edge_perm = [0] * 8, [0] * 12
+        for slot, piece, _ in placed_corners: corner_perm[slot] = piece
+        for slot, piece, _ in placed_edges: edge_perm[slot] = piece
+        if _parity(corner_perm) != _parity(edge_perm): continue
+
+        complete = flat.copy()
+        for stickers, homes, placed in ((CORNER_STICKERS, HOME_CORNERS, placed_corners), (EDGE_STICKERS, HOME_EDGES, placed_edges)):
+            for slot, piece, twist in placed:
+                home = homes[piece]
+                complete[list(stickers[slot])] = home[twist:] + home[:twist]
+        face = complete.reshape(6, 3, 3)[missing]
+        if not any(np.array_equal(face, c) for c in candidates):
+            candidates.append(face)
+    return missing, candidates
+
+def ambiguous_stickers(candidates):
+    """3x3 boolean mask of the stickers that differ between candidate faces."""
+    stacked = np.stack(candidates)
+    return np.any(stacked != stacked[0], axis=0)
+
+if __name__ == "__main__":
+    cube = RubiksCube()
+    cube.shuffle(30)
+    faces = {face: cube.state[face] for face in range(6) if face != RubiksCube.B}
+    missing, candidates = last_face_candidates(faces)
+    print(f"Missing face {missing}: {len(candidates)} candidate(s)")
+    for candidate in candidates:
+        print(candidate, np.array_equal(candidate, cube.state[missing]))
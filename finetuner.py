@@ -0,0 +1,159 @@
+# finetuner.py
+
+import os
+import queue
+import threading
+import numpy as np
+import tensorflow as tf
+from stickerstore import CLASS_NAMES, has_shards, load_sticker_arrays
+from trainclassifier import split_indices
+
+FINETUNED_MODEL_PATH = os.path.join('models', 'finetuned_model.keras')
+VALIDATION_DIR = 'dataset' # Its fixed validation split gates updates; test_dataset stays for evaluation only
+MIN_NEW_CORRECTIONS = 3 # Corrections collected before another fine-tuning round starts
+MAX_CONFIRMED = 270 # Most recent confirmed stickers (30 faces) kept to stop the head forgetting what already worked
+CORRECTION_REPEATS = 3 # Corrections are rare; weight them up against the confirmed stickers
+EPOCHS = 15
+LEARNING_RATE = 5e-4
+VALIDATION_LIMIT = 3000 # Samples of the validation set used to accept or reject an update
+VALIDATION_TOLERANCE = 0.01 # Accuracy a new head may lose on the validation set and still be swapped in
+
+def head_start_index(model):
+    """Index of the first Dense layer; it and everything after it form the classification head."""
+    for i, layer in enumerate(model.layers):
+        if isinstance(layer, tf.keras.layers.Dense):
+            return i
+    raise ValueError("Model has no Dense layers to fine-tune.")
+
+def _accuracy(model, images, labels):
+    if len(labels) == 0: return None
+    predictions = model.predict(images.astype(np.float32) / 255.0, batch_size=256, verbose=0)
+    return float(np.mean(np.argmax(predictions, axis=1) == labels))
+
+class CorrectionFineTuner:
+    """
+    Collects the scanner's labelled stickers: corrections (the user changed the prediction) and
+    confirmed ones (accepted unchanged). A background thread fine-tunes a copy of the model with
+    everything before the first Dense layer frozen, checks it against the validation set, and
+    offers it back through poll(); the caller swaps it in on its own thread. The thread never
+    touches the live model: each round starts from a weights snapshot taken on the caller's thread.
+    """
+    def __init__(self, model, save_path=FINETUNED_MODEL_PATH, validation_dir=VALIDATION_DIR):
+        self.model = model
+        self._architecture = tf.keras.models.clone_model(model) # Never run; only cloned, so it is safe to read from the thread
+        self._weights = None # Snapshot of the live model's weights for the next round
+        self.save_path = save_path
+        self.validation_dir = validation_dir
+        self.corrections, self.confirmed = [], [] # (32x32x3 uint8 RGB, class index)
+        self.new_corrections = 0
+        self.rounds = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = queue.Queue(maxsize=1)
+        self._stopped = False
+        self._busy = False
+        self._validation = None
+        self._thread = threading.Thread(target=self._run, name='CorrectionFineTuner', daemon=True)
+        self._thread.start()
+
+    def add_face(self, stickers_rgb, predicted, final):
+        """Record one accepted face: its nine sticker images, the model's labels and the user's final labels."""
+        with self._lock:
+            for image, before, after in zip(stickers_rgb, predicted, final):
+                sample = (np.array(image, dtype=np.uint8), CLASS_NAMES.index(after))
+                if before != after:
+                    self.corrections.append(sample)
+                    self.new_corrections += 1
+                else:
+                    self.confirmed.append(sample)
+            del self.confirmed[:-MAX_CONFIRMED]
+            if self.new_corrections >= MIN_NEW_CORRECTIONS:
+                self._weights = self.model.get_weights() # On the scanner's thread, between frames
+                self._wake.set()
+
+    def poll(self):
+        """The newest accepted model, or None. Call from the thread that uses the model."""
+        try:
+            model = self._ready.get_nowait()
+        except queue.Empty:
+            return None
+        self.model = model
+        return model
+
+    def stop(self):
+        """Finish any round in progress (so a save is never cut short) and end the thread."""
+        self._stopped = True
+        self._wake.set()
+        if self._busy:
+            print("Waiting for fine-tuning to finish...")
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped: return
+            with self._lock:
+                corrections, confirmed, weights = list(self.corrections), list(self.confirmed), self._weights
+                self.new_corrections = 0
+            self._busy = True
+            try:
+                self._fine_tune(corrections, confirmed, weights)
+            except Exception as e: # Never take the scanner down; the current model simply stays in use
+                print(f"Fine-tuning failed: {e}")
+            finally:
+                self._busy = False
+
+    def _validation_set(self):
+        if self._validation is None:
+            images, labels = np.zeros((0, 32, 32, 3), dtype=np.uint8), np.zeros(0, dtype=np.int64)
+            if os.path.isdir(self.validation_dir) or has_shards(self.validation_dir):
+                images, labels, _ = load_sticker_arrays(self.validation_dir)
+            if len(labels):
+                _, held_out = split_indices(labels) # The split trainclassifier.py never trains on
+                keep = np.random.default_rng(0).permutation(held_out)[:VALIDATION_LIMIT]
+                images, labels = images[keep], labels[keep].astype(np.int64)
+            self._validation = (images, labels)
+        return self._validation
+
+    def _copy_of(self, weights):
+        model = tf.keras.models.clone_model(self._architecture)
+        model.set_weights(weights)
+        return model
+
+    def _fine_tune(self, corrections, confirmed, weights):
+        val_images, val_labels = self._validation_set()
+        if len(val_labels) == 0: # Checking against the stickers it was trained on would accept anything
+            print(f"Fine-tuning skipped: no validation set in '{self.validation_dir}' to check an update against.")
+            return
+        base = self._copy_of(weights)
+        images = np.stack([image for image, _ in corrections * CORRECTION_REPEATS + confirmed])
+        labels = np.array([label for _, label in corrections * CORRECTION_REPEATS + confirmed])
+
+        candidate = self._copy_of(weights)
+        head = head_start_index(candidate)
+        for layer in candidate.layers[:head]:
+            layer.trainable = False
+        candidate.compile(optimizer=tf.keras.optimizers.Adam(LEARNING_RATE), loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+        candidate.fit(images.astype(np.float32) / 255.0, labels, epochs=EPOCHS, batch_size=32, shuffle=True, verbose=0)
+
+        correction_images = np.stack([image for image, _ in corrections])
+        correction_labels = np.array([label for _, label in corrections])
+        fixed_before = _accuracy(base, correction_images, correction_labels)
+        fixed_after = _accuracy(candidate, correction_images, correction_labels)
+        val_before, val_after = _accuracy(base, val_images, val_labels), _accuracy(candidate, val_images, val_labels)
+
+        self.rounds += 1
+        summary = f"corrections {fixed_before:.0%} -> {fixed_after:.0%}, validation {val_before:.1%} -> {val_after:.1%}"
+        if fixed_after <= fixed_before or val_after < val_before - VALIDATION_TOLERANCE:
+            print(f"Fine-tuning round {self.rounds} rejected ({summary}).")
+            return
+
+        candidate.save(self.save_path)
+        candidate(np.zeros((9, 32, 32, 3), dtype=np.float32), training=False) # Warm up here, not on the scanner's first frame
+        try:
+            self._ready.get_nowait() # Replace any update the scanner has not picked up yet
+        except queue.Empty:
+            pass
+        self._ready.put(candidate)
+        print(f"Fine-tuning round {self.rounds} accepted ({summary}); saved to {self.save_path}.")
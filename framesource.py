@@ -0,0 +1,268 @@
+# framesource.py
+
+import concurrent.futures
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+
+FEED_SIZE = (1280, 720)
+PREFERRED_FOURCCS = ('MJPG', 'YUYV') # MJPG reaches 720p at full frame rate on most USB webcams; YUYV is the usual fallback
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+QUIT_KEY = ord('q') # Returned once a recording has no keys left, so every app loop ends
+RECORD_QUEUE_FRAMES = 16 # Frames waiting to be encoded; past this, read() waits for the writer rather than drop one
+ENCODER_THREADS = max(1, min(4, (os.cpu_count() or 1) - 1)) # cv2.imencode releases the GIL, so frames encode in parallel
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1] # Fastest zlib level; PNG stays lossless
+
+def negotiate_format(cap, size=FEED_SIZE, fourccs=PREFERRED_FOURCCS):
+    """
+    Ask the driver for each pixel format in turn at the target size and keep the first it accepts.
+    Returns the (width, height, fourcc) actually delivered, which may differ from what was asked for.
+    """
+    fourcc = ''
+    for name in fourccs:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*name))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        code = int(cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+        if fourcc == name: break
+    return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), fourcc
+
+def select_camera():
+    print("Searching for cameras...")
+    for i in range(5):
+        cap = cv2.VideoCapture(i)
+        if not cap.isOpened():
+            continue
+
+        print(f"Testing camera index {i}...")
+        for _ in range(300): # Preview for ~10 seconds
+            ret, frame = cap.read()
+            if not ret: break
+
+            frame = cv2.flip(frame, 1)
+            text = f"Camera Index: {i}. Use this camera? (y/n)"
+            cv2.putText(frame, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(frame, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2, cv2.LINE_AA)
+            cv2.imshow('Camera Selection', frame)
+
+            key = cv2.waitKey(30) & 0xFF
+            if key == ord('y'):
+                print(f"Selected camera at index {i}.")
+                cv2.destroyWindow('Camera Selection')
+                return cap, i
+            elif key == ord('n'):
+                break
+
+        cap.release()
+        cv2.destroyWindow('Camera Selection')
+
+    print("No camera was selected.")
+    return None, -1
+
+class FrameSource:
+    """
+    Where a CameraApp gets its frames and keypresses. read() behaves like cv2.VideoCapture.read()
+    and wait_key() like cv2.waitKey(); headless sources are never shown in a window.
+    """
+    headless = False
+    reproducible = False # True for recorded and replayed sessions, which must make the same decisions every run
+    camera_index = -1
+    size = FEED_SIZE # (width, height)
+
+    def read(self):
+        raise NotImplementedError
+
+    def wait_key(self, delay_ms):
+        return cv2.waitKey(delay_ms)
+
+    def release(self):
+        pass
+
+class LiveCameraSource(FrameSource):
+    """A webcam, chosen interactively and set to the best format it offers at `size`."""
+    def __init__(self, cap, camera_index, size=FEED_SIZE):
+        self.cap, self.camera_index = cap, camera_index
+        width, height, self.fourcc = negotiate_format(cap, size)
+        self.size = (width, height)
+        print(f"Camera delivering {width}x{height} ({self.fourcc or 'unknown format'}).")
+
+    @classmethod
+    def select(cls, size=FEED_SIZE):
+        cap, camera_index = select_camera()
+        return None if cap is None else cls(cap, camera_index, size)
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+class VideoFileSource(FrameSource):
+    """Frames from a video file, at whatever pace the app reads them; keys still come from the window."""
+    def __init__(self, path, loop=False):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video file '{path}'.")
+        self.loop = loop
+        self.size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+class ImageDirectorySource(FrameSource):
+    """Still images from a directory in name order, cycled by default so each can be inspected."""
+    def __init__(self, directory, loop=True):
+        self.paths = sorted(p for p in glob.glob(os.path.join(directory, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise RuntimeError(f"No images found in '{directory}'.")
+        self.loop = loop
+        self.position = 0
+        first = cv2.imread(self.paths[0])
+        self.size = (first.shape[1], first.shape[0])
+
+    def read(self):
+        if self.position >= len(self.paths):
+            if not self.loop: return False, None
+            self.position = 0
+        frame = cv2.imread(self.paths[self.position])
+        self.position += 1
+        return frame is not None, frame
+
+class RecordingSource(FrameSource):
+    """
+    Passes another source through unchanged while recording every frame, key and timestamp.
+    Frames are PNG-encoded (lossless, so a replay sees identical pixels) on a few background
+    threads, and a writer thread appends them in order to a temporary file as they finish.
+    release() packs everything into one .npz file.
+    """
+    reproducible = True
+
+    def __init__(self, inner, path):
+        self.inner, self.path = inner, path
+        self.headless, self.camera_index, self.size = inner.headless, inner.camera_index, inner.size
+        self.start = time.perf_counter()
+        self.frame_times, self.keys, self.key_times = [], [], []
+        self.frame_offsets = [0] # Appended by the writer thread
+        self._bytes_path = path + '.frames.tmp'
+        self._bytes_file = open(self._bytes_path, 'wb')
+        self._encoder = concurrent.futures.ThreadPoolExecutor(ENCODER_THREADS, thread_name_prefix='RecordingEncoder')
+        self._queue = queue.Queue(maxsize=RECORD_QUEUE_FRAMES) # Encodings in frame order
+        self._thread = threading.Thread(target=self._write_frames, name='RecordingWriter', daemon=True)
+        self._thread.start()
+
+    def read(self):
+        ret, frame = self.inner.read()
+        if ret:
+            # A copy, so the app may draw on its frame before it is encoded
+            self._queue.put(self._encoder.submit(cv2.imencode, '.png', frame.copy(), PNG_PARAMS))
+            self.frame_times.append(time.perf_counter() - self.start)
+        return ret, frame
+
+    def _write_frames(self):
+        while (encoding := self._queue.get()) is not None:
+            encoded = encoding.result()[1]
+            encoded.tofile(self._bytes_file)
+            self.frame_offsets.append(self.frame_offsets[-1] + len(encoded))
+
+    def wait_key(self, delay_ms):
+        key = self.inner.wait_key(delay_ms)
+        self.keys.append(key)
+        self.key_times.append(time.perf_counter() - self.start)
+        return key
+
+    def release(self):
+        self.inner.release()
+        self._queue.put(None)
+        self._thread.join()
+        self._encoder.shutdown()
+        self._bytes_file.close()
+        # Memory-mapped, so the encoded frames are copied into the .npz from disk, not held in RAM
+        frame_bytes = np.memmap(self._bytes_path, dtype=np.uint8, mode='r') if self.frame_offsets[-1] else np.zeros(0, dtype=np.uint8)
+        np.savez(self.path, frame_bytes=frame_bytes,
+                 frame_offsets=np.array(self.frame_offsets, dtype=np.int64),
+                 frame_times=np.array(self.frame_times), keys=np.array(self.keys, dtype=np.int32),
+                 key_times=np.array(self.key_times),
+                 meta=json.dumps({'size': list(self.size), 'camera_index': self.camera_index, 'recorded_at': time.time()}))
+        del frame_bytes
+        os.remove(self._bytes_path)
+        print(f"Recorded {len(self.frame_times)} frames and {len(self.keys)} key polls to '{self.path}'.")
+
+class ReplaySource(FrameSource):
+    """
+    Plays a RecordingSource file back headless: the same frames and the same key sequence, so the
+    app makes the same decisions. By default it runs as fast as the app can consume frames;
+    realtime=True waits for each frame's recorded timestamp instead.
+    """
+    headless = True
+    reproducible = True
+
+    def __init__(self, path, realtime=False):
+        with np.load(path) as data:
+            self.frame_bytes, self.frame_offsets = data['frame_bytes'], data['frame_offsets']
+            self.frame_times, self.keys = data['frame_times'], data['keys']
+            meta = json.loads(str(data['meta']))
+        self.size, self.camera_index = tuple(meta['size']), meta['camera_index']
+        self.realtime = realtime
+        self.frames_read = self.keys_read = 0
+        self.start = time.perf_counter()
+
+    def __len__(self):
+        return len(self.frame_offsets) - 1
+
+    def read(self):
+        if self.frames_read >= len(self):
+            return False, None
+        i = self.frames_read
+        if self.realtime:
+            time.sleep(max(0.0, self.frame_times[i] - (time.perf_counter() - self.start)))
+        frame = cv2.imdecode(self.frame_bytes[self.frame_offsets[i]:self.frame_offsets[i + 1]], cv2.IMREAD_COLOR)
+        self.frames_read += 1
+        return True, frame
+
+    def wait_key(self, delay_ms):
+        if self.keys_read >= len(self.keys):
+            return QUIT_KEY
+        key = int(self.keys[self.keys_read])
+        self.keys_read += 1
+        return key
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.start
+        return {'frames': self.frames_read, 'keys': self.keys_read, 'seconds': round(elapsed, 3),
+                'fps': round(self.frames_read / elapsed, 1) if elapsed > 0 else None}
+
+def add_source_arguments(parser):
+    """--video / --images / --replay pick a source (default: live camera); --record wraps whichever is chosen."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--video', help="Read frames from a video file instead of a camera.")
+    group.add_argument('--images', help="Cycle through the images in a directory instead of a camera.")
+    group.add_argument('--replay', help="Replay a recorded session headless, as fast as possible.")
+    parser.add_argument('--realtime', action='store_true', help="With --replay, keep the recorded timing.")
+    parser.add_argument('--record', help="Record frames, keys and timestamps to this .npz file.")
+
+def source_from_args(args):
+    """The FrameSource described by add_source_arguments' options, or None if no camera was selected."""
+    if args.replay:
+        source = ReplaySource(args.replay, args.realtime)
+    elif args.video:
+        source = VideoFileSource(args.video)
+    elif args.images:
+        source = ImageDirectorySource(args.images)
+    else:
+        source = LiveCameraSource.select()
+    if source is not None and args.record:
+        source = RecordingSource(source, args.record)
+    return source
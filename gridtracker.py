@@ -0,0 +1,198 @@
+# gridtracker.py
+
+import argparse
+import time
+import cv2
+import numpy as np
+from framesource import add_source_arguments, source_from_args
+
+DETECT_WIDTH = 320 # Detection runs on a frame downscaled to this width
+TRACK_WIDTH = 640 # And tracking on one downscaled to this
+MIN_STICKER_AREA = 60 # In downscaled pixels; about 8x8
+MAX_STICKER_FRACTION = 0.04 # Of the downscaled frame's area
+MIN_STICKERS = 6 # Squares needed to place the 3x3 grid
+MAX_TRACK_POINTS = 60
+MIN_TRACK_POINTS = 12 # Fewer inliers than this and tracking is lost
+REPLENISH_POINTS = 30 # Re-seed features inside the quad when the inliers fall below this
+FB_ERROR = 1.0 # Max forward-backward optical flow error, in pixels
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+UNIT_QUAD = np.float32([[0, 0], [3, 0], [3, 3], [0, 3]]) # Face corners in sticker units: TL, TR, BR, BL
+
+def brightness(frame):
+    """Each pixel's brightest channel (HSV value). Unlike grayscale, blue and red stickers stay well clear of the black plastic."""
+    if frame.ndim == 2: return frame
+    b, g, r = cv2.split(frame)
+    return cv2.max(cv2.max(b, g), r)
+
+def _upright(quad):
+    """The same quad with its corners reordered so the first edge is the one pointing most to the right (TL, TR, BR, BL)."""
+    if cv2.contourArea(quad) < 0: quad = quad[::-1] # Make it clockwise on screen
+    start = int(np.argmax([(np.roll(quad, -k, axis=0)[1] - np.roll(quad, -k, axis=0)[0])[0] for k in range(4)]))
+    return np.roll(quad, -start, axis=0).astype(np.float32)
+
+def _valid_quad(quad, frame_w, frame_h):
+    """A plausible face: convex, not tiny, and with its centre in the frame."""
+    area = abs(cv2.contourArea(quad))
+    cx, cy = quad.mean(axis=0)
+    return (cv2.isContourConvex(quad.astype(np.float32)) and area > 9 * MIN_STICKER_AREA
+            and 0 <= cx < frame_w and 0 <= cy < frame_h)
+
+def _sticker_squares(gray):
+    """Centres, sides and angles of convex, roughly square contours: the candidate stickers."""
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 20, 60)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    max_area = MAX_STICKER_FRACTION * gray.size
+    squares = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if not MIN_STICKER_AREA <= area <= max_area: continue
+        (cx, cy), (w, h), angle = cv2.minAreaRect(contour)
+        if not 0.75 < w / h < 1.33 or area < 0.8 * w * h: continue # Square and filled, not an outline or a blob
+        approx = cv2.approxPolyDP(contour, 0.08 * cv2.arcLength(contour, True), True)
+        if len(approx) != 4 or not cv2.isContourConvex(approx): continue
+        squares.append((cx, cy, np.sqrt(area), angle))
+    return np.array(squares, dtype=np.float32).reshape(-1, 4)
+
+def detect_face_quad(gray):
+    """
+    Find a cube face in a single-channel frame (see brightness()): square stickers of one size on a
+    3x3 lattice. Returns its corners (4, 2) as TL, TR, BR, BL in frame coordinates, or None. A
+    homography from lattice to image, fitted to the sticker centres, places the corners, so a face
+    seen at an angle still fits.
+    """
+    scale = min(1.0, DETECT_WIDTH / gray.shape[1])
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    squares = _sticker_squares(small)
+    if len(squares) < MIN_STICKERS: return None
+
+    centres, sides = squares[:, :2], squares[:, 2]
+    distances = np.linalg.norm(centres[:, None] - centres[None], axis=2)
+    similar = (sides[:, None] / sides[None] > 0.7) & (sides[:, None] / sides[None] < 1.4)
+    # The centre sticker has all eight others within 1.5 pitches (pitch is about 1.2 sides)
+    neighbours = similar & (distances < 2.2 * sides[:, None]) & (distances > 0.5 * sides[:, None])
+    seed = int(np.argmax(neighbours.sum(axis=1)))
+    if neighbours[seed].sum() < MIN_STICKERS - 1: return None
+    pitch = float(distances[seed][neighbours[seed]].min()) # Nearest neighbour is one row or column away
+
+    # Duplicates (inner and outer edge of one sticker) share a centre; keep the first of each
+    group = np.flatnonzero(similar[seed] & (distances[seed] < 3.2 * pitch))
+    theta = np.angle(np.mean(np.exp(4j * np.deg2rad(squares[group, 3])))) / 4 # Grid angle, mod 90 degrees
+    rotation = np.array([[np.cos(theta), np.sin(theta)], [-np.sin(theta), np.cos(theta)]], dtype=np.float32)
+    lattice = (centres[group] - centres[seed]) @ rotation.T / pitch
+    cells = np.round(lattice)
+    on_grid = np.all(np.abs(lattice - cells) < 0.3, axis=1)
+    cells, points = cells[on_grid].astype(int), centres[group][on_grid]
+    _, first = np.unique(cells, axis=0, return_index=True)
+    cells, points = cells[first], points[first]
+    if len(cells) < MIN_STICKERS or np.any(np.ptp(cells, axis=0) != 2): return None # Must span exactly three rows and columns
+
+    grid_points = (cells - cells.min(axis=0) + 0.5).astype(np.float32)
+    homography, _ = cv2.findHomography(grid_points, points)
+    if homography is None: return None
+    quad = cv2.perspectiveTransform(UNIT_QUAD[None], homography)[0] / scale
+    return _upright(quad) if _valid_quad(quad * scale, small.shape[1], small.shape[0]) else None
+
+def warp_stickers(frame, quad, size=32, margin=0.15):
+    """
+    The nine stickers inside `quad` (TL, TR, BR, BL), each (size, size, 3), row by row. The face is
+    warped square first, then each cell is cropped with `margin` of its width trimmed off every side.
+    """
+    cell = int(round(size / (1 - 2 * margin)))
+    inset = (cell - size) // 2
+    target = np.float32([[0, 0], [3 * cell, 0], [3 * cell, 3 * cell], [0, 3 * cell]])
+    face = cv2.warpPerspective(frame, cv2.getPerspectiveTransform(np.float32(quad), target), (3 * cell, 3 * cell))
+    return [face[r * cell + inset:r * cell + inset + size, c * cell + inset:c * cell + inset + size] for r in range(3) for c in range(3)]
+
+def quad_cells(quad):
+    """The nine cell outlines (4, 2) inside `quad`, row by row, as int32 polygons for drawing."""
+    homography = cv2.getPerspectiveTransform(UNIT_QUAD, np.float32(quad))
+    corners = np.float32([[[c, r], [c + 1, r], [c + 1, r + 1], [c, r + 1]] for r in range(3) for c in range(3)])
+    return [cv2.perspectiveTransform(cell[None], homography)[0].round().astype(np.int32) for cell in corners]
+
+class GridTracker:
+    """
+    Locates the face once with detect_face_quad(), then follows it frame to frame with pyramidal
+    Lucas-Kanade optical flow on corner features inside it. Full detection runs again only once
+    tracking is lost. update() returns the face quad (TL, TR, BR, BL, frame coordinates) or None.
+    """
+    def __init__(self):
+        self.quad = None # In tracking (downscaled) coordinates
+        self.points = None
+        self.prev_gray = None
+        self.detections = 0
+        self.tracked_frames = 0
+        self.detect_seconds = 0.0
+        self.track_seconds = 0.0
+
+    def reset(self):
+        self.quad = self.points = self.prev_gray = None
+
+    def _seed_points(self, gray):
+        mask = np.zeros_like(gray)
+        cv2.fillConvexPoly(mask, self.quad.round().astype(np.int32), 255)
+        self.points = cv2.goodFeaturesToTrack(gray, MAX_TRACK_POINTS, 0.01, 5, mask=mask)
+
+    def _track(self, gray):
+        if self.points is None or len(self.points) < MIN_TRACK_POINTS: return None
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, forward, None, **LK_PARAMS)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (np.linalg.norm((back - self.points).reshape(-1, 2), axis=1) < FB_ERROR)
+        if good.sum() < MIN_TRACK_POINTS: return None
+        homography, inliers = cv2.findHomography(self.points[good], forward[good], cv2.RANSAC, 3.0)
+        if homography is None or inliers.sum() < MIN_TRACK_POINTS: return None
+        quad = cv2.perspectiveTransform(self.quad[None], homography)[0]
+        if not _valid_quad(quad, gray.shape[1], gray.shape[0]): return None
+        self.points = forward[good][inliers.ravel() == 1]
+        return _upright(quad)
+
+    def update(self, frame):
+        scale = min(1.0, TRACK_WIDTH / frame.shape[1])
+        gray = brightness(frame)
+        if scale < 1: gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if self.quad is not None:
+            start = time.perf_counter()
+            self.quad = self._track(gray)
+            self.track_seconds += time.perf_counter() - start
+            self.tracked_frames += 1
+            if self.quad is not None and len(self.points) < REPLENISH_POINTS:
+                self._seed_points(gray)
+        if self.quad is None:
+            start = time.perf_counter()
+            self.quad = detect_face_quad(gray)
+            self.detect_seconds += time.perf_counter() - start
+            self.detections += 1
+            if self.quad is not None:
+                self._seed_points(gray)
+        self.prev_gray = gray
+        return None if self.quad is None else self.quad / scale
+
+    def stats(self):
+        return {'detections': self.detections, 'tracked_frames': self.tracked_frames,
+                'detect_ms': 1000 * self.detect_seconds / max(self.detections, 1),
+                'track_ms': 1000 * self.track_seconds / max(self.tracked_frames, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect and track a cube face's sticker grid; prints per-frame cost.")
+    add_source_arguments(parser)
+    args = parser.parse_args()
+
+    source = source_from_args(args)
+    if source is not None:
+        tracker, found, frames = GridTracker(), 0, 0
+        while True:
+            ret, frame = source.read()
+            if not ret: break
+            frames += 1
+            quad = tracker.update(frame)
+            found += quad is not None
+            if not source.headless:
+                for cell in (quad_cells(quad) if quad is not None else []):
+                    cv2.polylines(frame, [cell], True, (0, 255, 0), 2)
+                cv2.imshow("Grid tracker", frame)
+            if source.wait_key(1) & 0xFF == ord('q'): break
+        source.release()
+        cv2.destroyAllWindows()
+        stats = tracker.stats()
+        print(f"{frames} frames, face found in {found}. {stats['detections']} detections at {stats['detect_ms']:.2f} ms, "
+              f"{stats['tracked_frames']} tracked frames at {stats['track_ms']:.2f} ms.")
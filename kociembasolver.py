@@ -1,28 +1,244 @@
 # kociembasolver.py
 
+import itertools
 import kociemba
-from rubikscube import RubiksCube
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import numpy as np
+from rubikscube import RubiksCube, sticker_permutation
 
-def solve_with_kociemba(cube_obj):
-    
+KOCIEMBA_FACE_ORDER = [RubiksCube.U, RubiksCube.R, RubiksCube.F, RubiksCube.D, RubiksCube.L, RubiksCube.B]
+WARMUP_FACELETS = 'DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD'
+FACE_LETTERS = {RubiksCube.U: 'U', RubiksCube.R: 'R', RubiksCube.F: 'F', RubiksCube.D: 'D', RubiksCube.L: 'L', RubiksCube.B: 'B'}
+
+def cube_to_facelets(cube_obj):
+    """54-character facelet string in Kociemba's U, R, F, D, L, B order. Raises KeyError if the centres are not six distinct colours."""
     # Kociemba requires a fixed mapping: U, R, F, D, L, B
-    centre_pieces = {
-        cube_obj.state[cube_obj.U, 1, 1]: 'U',
-        cube_obj.state[cube_obj.R, 1, 1]: 'R',
-        cube_obj.state[cube_obj.F, 1, 1]: 'F',
-        cube_obj.state[cube_obj.D, 1, 1]: 'D',
-        cube_obj.state[cube_obj.L, 1, 1]: 'L',
-        cube_obj.state[cube_obj.B, 1, 1]: 'B'
-    }
+    centre_pieces = {cube_obj.state[face_idx, 1, 1]: FACE_LETTERS[face_idx] for face_idx in KOCIEMBA_FACE_ORDER}
+    if len(centre_pieces) != 6:
+        raise KeyError("duplicate centre colours")
+
+    kociemba_str = ""
+    for face_idx in KOCIEMBA_FACE_ORDER:
+        for row in range(3):
+            for col in range(3):
+                colour_code = cube_obj.state[face_idx, row, col]
+                kociemba_str += centre_pieces[colour_code]
+    return kociemba_str
+
+def cube_from_facelets(facelets):
+    """Inverse of cube_to_facelets, with each face letter mapped to that face's home colour."""
+    letter_to_colour = {letter: face_idx for face_idx, letter in FACE_LETTERS.items()}
+    if len(facelets) != 54 or any(c not in letter_to_colour for c in facelets):
+        raise ValueError("Facelet string must be 54 characters from U, R, F, D, L, B.")
+    state = np.zeros((6, 3, 3), dtype=int)
+    for i, face_idx in enumerate(KOCIEMBA_FACE_ORDER):
+        state[face_idx] = np.array([letter_to_colour[c] for c in facelets[i * 9:(i + 1) * 9]]).reshape(3, 3)
+    return RubiksCube(state=state)
+
+# Facelet indices (in the 54-character URFDLB string) of each cubie, in Kociemba's standard order
+CORNER_FACELETS = [(8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11), (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51)]
+EDGE_FACELETS = [(5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25), (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14)]
+SOLVED_FACELETS = "".join(letter * 9 for letter in "URFDLB")
+FACE_MOVES = [face + modifier for face in "UDFBLR" for modifier in ["", "'", "2"]]
+ANYTIME_BUDGET = 2.0 # Seconds
+ANYTIME_VARIANTS = [(rotation, inverse) for rotation in ["", "x", "z"] for inverse in (False, True)] # One per UD axis, plus inverses
+ANYTIME_FIRST_DEPTH = 24 # Depth limit of each variant's first search (kociemba's default); improvements search below the best
+KILL_SIGNAL = getattr(signal, 'SIGKILL', signal.SIGTERM)
+
+def facelet_permutation(facelets):
+    """sigma with facelets[i] == SOLVED_FACELETS[sigma[i]]: the home facelet of the sticker now at i."""
+    sigma = np.arange(54)
+    for slots in CORNER_FACELETS + EDGE_FACELETS:
+        letters = [facelets[i] for i in slots]
+        for home in CORNER_FACELETS + EDGE_FACELETS:
+            if len(home) != len(slots): continue
+            home_letters = [SOLVED_FACELETS[i] for i in home]
+            twist = next((t for t in range(len(home)) if letters == home_letters[t:] + home_letters[:t]), None)
+            if twist is not None:
+                for k, i in enumerate(slots):
+                    sigma[i] = home[(k + twist) % len(home)]
+                break
+        else:
+            raise ValueError(f"No cubie has colours {''.join(letters)}.")
+    return sigma
+
+def invert_facelets(facelets):
+    """The state reached by applying the inverse of whatever sequence produced `facelets`."""
+    sigma = facelet_permutation(facelets)
+    inverse = [''] * 54
+    for i in range(54):
+        inverse[sigma[i]] = SOLVED_FACELETS[i]
+    return "".join(inverse)
+
+def invert_moves(move_str):
+    inverse_modifier = {"": "'", "'": "", "2": "2"}
+    return " ".join(move[0] + inverse_modifier[move[1:]] for move in reversed(move_str.split()))
+
+_conjugation_cache = {}
+
+def conjugation_map(rotation):
+    """Face move m (as seen after `rotation`) -> the equivalent face move in the original frame."""
+    if rotation not in _conjugation_cache:
+        by_perm = {tuple(sticker_permutation(m)): m for m in FACE_MOVES}
+        composed = {}
+        for m in FACE_MOVES:
+            cube = RubiksCube(state=np.arange(54).reshape(6, 3, 3))
+            cube.move(f"{rotation} {m} {invert_rotation(rotation)}".strip())
+            composed[m] = by_perm[tuple(cube.state.ravel())]
+        _conjugation_cache[rotation] = composed
+    return _conjugation_cache[rotation]
+
+def invert_rotation(rotation):
+    return invert_moves(rotation) # Rotation steps take the same suffixes as face moves: x, x' and x2
+
+def variant_facelets(cube_obj, rotation, inverse):
+    """Facelets to search for one symmetry/inverse variant of `cube_obj`."""
+    rotated = RubiksCube(state=cube_obj.state)
+    if rotation: rotated.move(rotation)
+    facelets = cube_to_facelets(rotated)
+    return invert_facelets(facelets) if inverse else facelets
+
+def solution_from_variant(variant_solution, rotation, inverse):
+    """Map a solution of a variant back to a solution of the original cube."""
+    if inverse: variant_solution = invert_moves(variant_solution)
+    mapping = conjugation_map(rotation)
+    return " ".join(mapping[m] for m in variant_solution.split())
+
+_worker_ended = _worker_started = None
+
+def _init_anytime_worker(ended, started):
+    global _worker_ended, _worker_started
+    signal.signal(signal.SIGTERM, signal.SIG_DFL) # A handler inherited from the solver worker would never run inside kociemba's C search
+    _worker_ended, _worker_started = ended, started
+    warm_up()
 
+def _solve_variant(search_id, task_id, facelets, max_depth):
+    with _worker_ended.get_lock(): # The parent holds this lock while it ends a search and kills busy workers
+        if search_id <= _worker_ended.value: return None # Queued behind a search that has already ended
+        _worker_started.put((task_id, os.getpid()))
+    try:
+        return kociemba.solve(facelets, max_depth=max_depth)
+    except Exception:
+        return None # Includes "no solution within max_depth"
+    finally:
+        with _worker_ended.get_lock(): # Once reported, this worker is never killed, e.g. while it holds the pool's task queue
+            _worker_started.put((task_id, None))
+
+_anytime_pool = None # One warm pool per process, reused by every anytime search
+_search_ids = itertools.count(1)
+_task_ids = itertools.count()
+
+class _AnytimePool:
+    """A process pool plus what is needed to stop one search's tasks without stopping the pool."""
+    def __init__(self, processes):
+        self.pid, self.processes = os.getpid(), processes
+        self.ended = multiprocessing.Value('q', 0) # Highest search id that has ended
+        self.started = multiprocessing.SimpleQueue() # (task id, worker pid) as a task starts, (task id, None) as it finishes
+        self.busy = {} # task id -> pid of the worker running it
+        self.pool = multiprocessing.Pool(processes, initializer=_init_anytime_worker, initargs=(self.ended, self.started))
+
+    def end_search(self, search_id, running):
+        """
+        Drop the search's queued tasks and kill the workers still on its `running` tasks ({task id:
+        AsyncResult}); the pool replaces them.
+        """
+        with self.ended.get_lock():
+            self.ended.value = max(self.ended.value, search_id)
+            while not self.started.empty():
+                task_id, pid = self.started.get()
+                if pid is None: self.busy.pop(task_id, None)
+                else: self.busy[task_id] = pid
+            for task_id in running.keys() & self.busy.keys():
+                try:
+                    os.kill(self.busy.pop(task_id), KILL_SIGNAL)
+                except OSError:
+                    pass # Already gone
+                # A killed task never reports back, and Pool has no public way to drop it: fail it here so it
+                # leaves the pool's cache instead of staying there for the pool's lifetime
+                running[task_id]._set(0, (False, RuntimeError("search ended")))
+
+def _get_anytime_pool(processes):
+    """This process's anytime pool, created (and its workers warmed up) on first use or when the size changes."""
+    global _anytime_pool
+    if _anytime_pool is not None and (_anytime_pool.pid, _anytime_pool.processes) != (os.getpid(), processes):
+        if _anytime_pool.pid == os.getpid(): _anytime_pool.pool.terminate() # A forked child must leave its parent's pool alone
+        _anytime_pool = None
+    if _anytime_pool is None:
+        _anytime_pool = _AnytimePool(processes)
+    return _anytime_pool
+
+def iter_anytime_solutions(cube_obj, time_budget=ANYTIME_BUDGET, workers=None, variants=ANYTIME_VARIANTS):
+    """
+    Search several rotated and inverted variants of the cube in parallel processes and yield
+    (solution, seconds elapsed, variant) each time a shorter solution arrives. A variant that
+    improves the best is searched again with a lower depth limit. The process pool is kept for
+    the next call; searches still running when the budget runs out are killed.
+    """
+    start = time.monotonic()
+    deadline = start + time_budget
+    if cube_obj.is_solved():
+        yield "", 0.0, ("", False)
+        return
+    jobs = [(rotation, inverse, variant_facelets(cube_obj, rotation, inverse)) for rotation, inverse in variants]
+
+    results = queue.Queue()
+    anytime = _get_anytime_pool(workers or min(len(jobs), os.cpu_count() or 1))
+    search_id, running = next(_search_ids), {}
+    def submit(job_id, max_depth):
+        task_id = next(_task_ids)
+        running[task_id] = anytime.pool.apply_async(_solve_variant, (search_id, task_id, jobs[job_id][2], max_depth),
+                                                    callback=lambda solution: results.put((task_id, job_id, solution)),
+                                                    error_callback=lambda _: results.put((task_id, job_id, None)))
+    try:
+        for job_id in range(len(jobs)):
+            submit(job_id, ANYTIME_FIRST_DEPTH)
+        best_length = None
+        while running:
+            try:
+                task_id, job_id, variant_solution = results.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break # Out of time
+            running.pop(task_id, None)
+            if variant_solution is None: continue
+            rotation, inverse, _ = jobs[job_id]
+            solution = solution_from_variant(variant_solution, rotation, inverse)
+            length = len(solution.split())
+            if best_length is None or length < best_length:
+                best_length = length
+                yield solution, time.monotonic() - start, (rotation, inverse)
+                if length > 0:
+                    submit(job_id, length - 1)
+    finally:
+        anytime.end_search(search_id, running) # Depth-limited searches can run far past the budget; don't wait for them
+
+def solve_anytime(cube_obj, time_budget=ANYTIME_BUDGET, on_improvement=None, workers=None):
+    """Shortest solution found within `time_budget` seconds, or an error string like solve_with_kociemba."""
+    try:
+        cube_to_facelets(cube_obj)
+    except KeyError:
+        return "Error: Could not map cube colours. Ensure cube state is valid."
+    try:
+        best = None
+        for solution, elapsed, variant in iter_anytime_solutions(cube_obj, time_budget, workers):
+            best = solution
+            if on_improvement: on_improvement(solution, elapsed, variant)
+    except ValueError as e: # Facelets that are not a real cube
+        return f"Error: The cube state is very likely invalid or unsolvable. {e}"
+    if best is None:
+        return "Error: The cube state is very likely invalid or unsolvable, or no solution was found in time."
+    return best
+
+def warm_up():
+    """The first solve in a process loads Kociemba's pruning tables; call this before real work arrives."""
+    solve_with_kociemba(cube_from_facelets(WARMUP_FACELETS))
+
+def solve_with_kociemba(cube_obj):
     try:
-        kociemba_str = ""
-        face_order = [cube_obj.U, cube_obj.R, cube_obj.F, cube_obj.D, cube_obj.L, cube_obj.B]
-        for face_idx in face_order:
-            for row in range(3):
-                for col in range(3):
-                    colour_code = cube_obj.state[face_idx, row, col]
-                    kociemba_str += centre_pieces[colour_code]
+        kociemba_str = cube_to_facelets(cube_obj)
     except KeyError:
         return "Error: Could not map cube colours. Ensure cube state is valid."
 
@@ -1,9 +1,58 @@
 # main.py
 
-from manualinput import get_cube_from_manual_input
-from camerainput import get_cube_from_camera
-from kociembasolver import solve_with_kociemba
+from solverbackend import SolverBackend, DEFAULT_DEADLINE
+from rubikscube import RubiksCube
+import argparse
 import sys
+import time
+import numpy as np
+import readchar
+
+COLOUR_LETTERS = "WYBGRO"
+# Top-left sticker (line, column) of each face in the RubiksCube.__str__ net
+NET_OFFSETS = {RubiksCube.U: (0, 6), RubiksCube.L: (4, 0), RubiksCube.F: (4, 7), RubiksCube.R: (4, 14), RubiksCube.B: (4, 21), RubiksCube.D: (8, 6)}
+NET_TOP = 5 # Screen row of the net's first line; rows above hold the header
+PROMPT_ROW = NET_TOP + 12
+STICKER_POSITIONS = [(NET_TOP + NET_OFFSETS[face][0] + r, 1 + NET_OFFSETS[face][1] + 2 * c)
+                     for face in range(6) for r in range(3) for c in range(3)]
+NEXT_KEYS = {'\r', '\n', ' ', 'n', readchar.key.RIGHT}
+BACK_KEYS = {'\x08', '\x7f', 'b', 'p', readchar.key.LEFT}
+
+def _walkthrough_in_place(moves, frames):
+    """Random-access stepping through precomputed frames. Only stickers that differ from the frame on screen are redrawn."""
+    total = len(moves)
+    write = sys.stdout.write
+    write("\x1b[2J") # Clear once; every later frame is drawn over it
+    write("\x1b[2;1HKeep BLUE facing you, with WHITE on TOP.")
+    write("\x1b[3;1H[Enter]/[Space] next, [Backspace] back, 'g' go to step, 'q' quit.")
+
+    step, shown = 0, None
+    while True:
+        changed = range(54) if shown is None else np.flatnonzero(frames[step] != frames[shown])
+        last_move = moves[step - 1] if step > 0 else "-"
+        next_move = moves[step] if step < total else "Solved!"
+        out = [f"\x1b[1;1H\x1b[2KMove {step}/{total}:   {last_move.ljust(3)}   Next: {next_move}"]
+        out += [f"\x1b[{STICKER_POSITIONS[i][0]};{STICKER_POSITIONS[i][1]}H{COLOUR_LETTERS[frames[step][i]]}" for i in changed]
+        out.append(f"\x1b[{PROMPT_ROW};1H")
+        write("".join(out))
+        sys.stdout.flush()
+        shown = step
+
+        key = readchar.readkey()
+        if key in ('q', readchar.key.CTRL_C):
+            break
+        elif key in NEXT_KEYS:
+            step = min(step + 1, total)
+        elif key in BACK_KEYS:
+            step = max(step - 1, 0)
+        elif key == 'g':
+            try:
+                step = max(0, min(total, int(input(f"Go to step (0-{total}): "))))
+            except ValueError:
+                pass
+            write(f"\x1b[{PROMPT_ROW};1H\x1b[2K")
+    write(f"\x1b[{PROMPT_ROW};1H\n")
+    return shown
 
 def display_solution_with_cube_state(solution_str, cube):
     moves = solution_str.split()
@@ -13,12 +62,21 @@ def display_solution_with_cube_state(solution_str, cube):
         print("The cube is already solved!")
         return
 
+    frames = cube.timeline(solution_str) # Every intermediate state, computed once
+
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        step = _walkthrough_in_place(moves, frames)
+        cube.state = frames[step].reshape(6, 3, 3).astype(int)
+        print("\nSolved!" if step == total_moves else "\nExiting solution steps.")
+        return
+
+    # Not a terminal (piped/logged output): print every step in sequence
     print("The cube state will be updated after each move.")
     print("Keep BLUE facing you, with WHITE on TOP.")
     print("Press [Enter] to see the next move, or type 'q' to quit.\n")
 
     for i, move in enumerate(moves):
-        cube.move(move)
+        cube.state = frames[i + 1].reshape(6, 3, 3).astype(int)
         print("-" * 40)
         print(f"Move {i+1}/{total_moves}:   {move.ljust(3)}")
         print(cube)
@@ -33,17 +91,40 @@ def display_solution_with_cube_state(solution_str, cube):
     print("\n\nSolved!")
 
 
-def main():
+def _print_progress(solution, elapsed):
+    """One line per improvement; on a terminal, each clears whatever was left on the line."""
+    clear = "\r\x1b[2K" if sys.stdout.isatty() else "" # No escape codes in piped or redirected output
+    print(f"{clear}  {len(solution.split())} moves after {elapsed:.2f}s")
+
+def _wait_for_solution(handle):
+    """Block on a SolverBackend handle while showing elapsed time; Ctrl+C cancels the search instead of the app."""
+    start = time.monotonic()
+    show_timer = sys.stdout.isatty()
+    try:
+        while not handle.wait(0.1):
+            if show_timer:
+                print(f"\rSolving... {time.monotonic() - start:.1f}s (Ctrl+C to cancel)", end="", flush=True)
+    except KeyboardInterrupt:
+        handle.cancel()
+    result = handle.result()
+    if show_timer:
+        print("\r\x1b[2K", end="", flush=True)
+    return result
+
+def main(time_budget=None, deadline=DEFAULT_DEADLINE):
     """The main function for the text-based Rubik's Cube solver application."""
     scrambled_cube = None
+    backend = SolverBackend(deadline).start() # Solver process loads its tables while the cube is being entered
     
     while True:
         choice = input("Choose input method:\n1. Manual Text Input\n2. Webcam Scanner\nEnter choice (1 or 2): ")
         if choice == '1':
+            from manualinput import get_cube_from_manual_input
             scrambled_cube = get_cube_from_manual_input()
             break
         elif choice == '2':
             print("\nStarting webcam scanner...")
+            from camerainput import get_cube_from_camera # Loads TensorFlow; only when the scanner is chosen
             scrambled_cube = get_cube_from_camera()
             break
         else:
@@ -51,6 +132,7 @@ def main():
             
     if scrambled_cube is None:
         print("\nCould not get cube state. Exiting.")
+        backend.close()
         return
 
     try:
@@ -58,22 +140,45 @@ def main():
         print(scrambled_cube)
 
         print("Attempting to solve the cube...")
-        solution = solve_with_kociemba(scrambled_cube)
+        # With a budget, the anytime search keeps the shortest solution found in that time
+        handle = backend.submit(scrambled_cube, time_budget=time_budget,
+                                on_progress=_print_progress)
+        result = _wait_for_solution(handle)
 
-        if "Error" in solution:
+        if not result.ok:
             print("An Error Occurred")
-            print(solution)
-            print("\nPlease ensure all 54 stickers were entered correctly and form a valid cube.")
+            print(f"Error ({result.status}): {result.message}")
+            if result.status == 'invalid':
+                print("\nPlease ensure all 54 stickers were entered correctly and form a valid cube.")
         else:
-            print("Solution Found!")
-            display_solution_with_cube_state(solution, scrambled_cube)
+            print(f"Solution Found! ({result.moves} moves in {result.elapsed:.2f}s)")
+            display_solution_with_cube_state(result.solution, scrambled_cube)
 
     except (KeyboardInterrupt, SystemExit): # Ctrl+C
         print("\nApplication exited.")
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
         print("The program will now exit.")
+    finally:
+        backend.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Rubik's Cube solver.")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help="Non-interactive: solve one scramble or facelet string per line from FILE (default stdin), writing JSONL to stdout.")
+    parser.add_argument('--workers', type=int, default=None, help="Solver processes for --batch.")
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS',
+                        help="Search several orientations in parallel for this long and keep the shortest solution.")
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE, metavar='SECONDS',
+                        help="Give up on a solve after this long (on top of any --budget).")
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        from batchsolve import run_batch, NUM_WORKERS
+        source = sys.stdin if args.batch == '-' else open(args.batch)
+        with source:
+            counts = run_batch(source, sys.stdout, args.workers or NUM_WORKERS)
+        print(f"Solved {counts['solved']}, errors {counts['errors']}.", file=sys.stderr)
+    else:
+        main(args.budget, args.deadline)
 
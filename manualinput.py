@@ -5,6 +5,7 @@ import sys
 import numpy as np
 import readchar
 from rubikscube import RubiksCube
+from kociembasolver import cube_from_facelets
 
 COLOUR_MAP = {'w': 0, 'y': 1, 'b': 2, 'g': 3, 'o': 5, 'r': 4} # Note: Orange=5(Right of blue), Red=4(Left of blue)
 DISPLAY_MAP = {v: k.upper() for k, v in COLOUR_MAP.items()}
@@ -26,27 +27,41 @@ FACE_DETAILS_MAP = {f[0]: f for f in FACE_ORDER}
 
 VALID_COLOUR_KEYS = set(COLOUR_MAP.keys())
 BACKSPACE_KEYS = {'\x08', '\x7f'}
+PASTE_KEYS = {'p', 'P'}
+PACKED_HEX_LENGTH = 42 # RubiksCube.pack() is 21 bytes
 
-def _clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
+if os.name == 'nt':
+    os.system('') # Once, so the Windows console honours the ANSI codes below
+
+def _redraw(lines):
+    """Draw a whole screen in place: cursor home, each line over the old one, then clear whatever is left below."""
+    if not sys.stdout.isatty(): # Piped or redirected: plain lines, no escape codes
+        sys.stdout.write("".join(f"{line}\n" for line in lines))
+    else:
+        sys.stdout.write("\x1b[H" + "".join(f"{line}\x1b[K\n" for line in lines) + "\x1b[J")
+    sys.stdout.flush()
 
 def _display_face_grid(face_name, instruction, entered_colours):
     """Display the current state of the face being entered."""
-    _clear_screen()
-    print("Guided input")
-    print("\nImportant: always return to the 'home' position before each new face.")
-    print("Home position: WHITE centre on top, BLUE centre facing you.")
-    print(f"Instruction: {instruction}")
-    print(f"\nEnter the 9 colours for the {face_name} face from top-left to bottom-right.")
-    print("Press [Backspace] to undo.\n")
-
     grid = [DISPLAY_MAP.get(c, '.') for c in entered_colours]
     grid += ['.'] * (9 - len(grid))
 
-    print(f"    {grid[0]} {grid[1]} {grid[2]}")
-    print(f"    {grid[3]} {grid[4]} {grid[5]}")
-    print(f"    {grid[6]} {grid[7]} {grid[8]}")
-    print("\nPress Ctrl+C to exit.")
+    _redraw([
+        "Guided input",
+        "",
+        "Important: always return to the 'home' position before each new face.",
+        "Home position: WHITE centre on top, BLUE centre facing you.",
+        f"Instruction: {instruction}",
+        "",
+        f"Enter the 9 colours for the {face_name} face from top-left to bottom-right.",
+        "Press [Backspace] to undo.",
+        "",
+        f"    {grid[0]} {grid[1]} {grid[2]}",
+        f"    {grid[3]} {grid[4]} {grid[5]}",
+        f"    {grid[6]} {grid[7]} {grid[8]}",
+        "",
+        "Press Ctrl+C to exit.",
+    ])
 
 def _display_full_cube_for_confirmation(face_colours_map):
     """Display the full state for user confirmation."""
@@ -63,21 +78,11 @@ def _display_full_cube_for_confirmation(face_colours_map):
     right_face = get_face_str(RubiksCube.R)
     back_face = get_face_str(RubiksCube.B)
 
-    _clear_screen()
-    print("Review cube")
-    print("Unfolded cube; Home is White on top, Blue in front.\n")
-
-    # Up Face (White)
-    for row in up_face: print("       " + row)
-    print("")
-
-    # Middle Band of Faces
-    for i in range(3):
-        print(f"{left_face[i]}  {front_face[i]}  {right_face[i]}  {back_face[i]}")
-    print("")
-
-    # Down Face (Yellow)
-    for row in down_face: print("       " + row)
+    lines = ["Review cube", "Unfolded cube; Home is White on top, Blue in front.", ""]
+    lines += ["       " + row for row in up_face] + [""] # Up Face (White)
+    lines += [f"{left_face[i]}  {front_face[i]}  {right_face[i]}  {back_face[i]}" for i in range(3)] + [""] # Middle Band of Faces
+    lines += ["       " + row for row in down_face] # Down Face (Yellow)
+    _redraw(lines)
 
 def _wait_for_any_key():
     try:
@@ -95,32 +100,88 @@ def _validate_centres(face_colours_map):
         return "Input Error: not all 6 faces were entered."
 
     centres = [colours[4] for face, colours in sorted(face_colours_map.items())]
-    
-    if set(centres) != set(COLOUR_MAP.values()):
-        centre_counts = {c: centres.count(c) for c in centres}
-        error_messages = []
-        expected_colours = {val: key.upper() for key, val in COLOUR_MAP.items()}
-        
-        for colour_val, count in centre_counts.items():
-            if count > 1:
-                error_messages.append(f"{count} '{expected_colours[colour_val]}' centres")
-        
-        missing_colours = set(COLOUR_MAP.values()) - set(centres)
-        for colour_val in missing_colours:
-            error_messages.append(f"no '{expected_colours[colour_val]}' centre")
-            
-        return f"Input Error: invalid centres ({', '.join(error_messages)}). Please edit the faces."
+    problem = _centre_problem(centres)
+    if problem:
+        return f"Input Error: {problem} Please edit the faces."
     return None # Validation passed
 
+def _centre_problem(centres):
+    """Describe duplicate or missing centre colours, or None if all six are present once."""
+    if set(centres) == set(COLOUR_MAP.values()): return None
+    centre_counts = {c: centres.count(c) for c in centres}
+    error_messages = []
+    expected_colours = {val: key.upper() for key, val in COLOUR_MAP.items()}
+
+    for colour_val, count in centre_counts.items():
+        if count > 1:
+            error_messages.append(f"{count} '{expected_colours[colour_val]}' centres")
+
+    missing_colours = set(COLOUR_MAP.values()) - set(centres)
+    for colour_val in missing_colours:
+        error_messages.append(f"no '{expected_colours[colour_val]}' centre")
+    return f"invalid centres ({', '.join(error_messages)})."
+
+def cube_from_pasted_state(text):
+    """
+    A whole cube in one string: 54 URFDLB facelets (kociemba order) or the hex of RubiksCube.pack().
+    Raises ValueError with a printable message if it is neither, or is not a plausible cube.
+    """
+    compact = "".join(text.split())
+    if len(compact) == 54:
+        cube = cube_from_facelets(compact.upper())
+    elif len(compact) == PACKED_HEX_LENGTH:
+        try:
+            cube = RubiksCube.unpack(bytes.fromhex(compact))
+        except ValueError:
+            raise ValueError("Packed state must be hexadecimal.")
+    else:
+        raise ValueError(f"Expected 54 facelets or {PACKED_HEX_LENGTH} hex characters, got {len(compact)} characters.")
+
+    counts = np.bincount(cube.state.ravel(), minlength=6)
+    if len(counts) != 6 or np.any(counts != 9):
+        raise ValueError("Each of the 6 colours must appear exactly 9 times.")
+    problem = _centre_problem([int(colour) for colour in cube.state[:, 1, 1]])
+    if problem:
+        raise ValueError(problem)
+    return cube
+
+def _read_pasted_state():
+    """Prompt until a valid pasted state is entered; an empty line returns None (back to guided input)."""
+    _redraw(["Paste a cube state", "",
+             "Paste 54 facelets in URFDLB order (as used by kociemba), or a packed state in hex,",
+             "then press [Enter]. Leave it empty to enter the faces one by one instead.", ""])
+    while True:
+        try:
+            text = input("> ")
+        except (KeyboardInterrupt, EOFError):
+            sys.exit("\nExiting.")
+        if not text.strip():
+            return None
+        try:
+            return cube_from_pasted_state(text)
+        except ValueError as e:
+            print(f"Input Error: {e}")
+
 def get_cube_from_manual_input():
-    _clear_screen()
-    print("Manual input")
-    print("\nHold your cube so that:")
-    print("  - The WHITE centre is on the TOP face.")
-    print("  - The BLUE centre is on the FRONT face (facing you).")
-    print("\nThis is your home orientation. Press any key to begin...")
-    _wait_for_any_key()
-    
+    _redraw([
+        "Manual input",
+        "",
+        "Hold your cube so that:",
+        "  - The WHITE centre is on the TOP face.",
+        "  - The BLUE centre is on the FRONT face (facing you).",
+        "",
+        "This is your home orientation. Press any key to begin...",
+        "(or press 'p' to paste a whole cube state at once)",
+    ])
+    try:
+        key = readchar.readkey()
+        if key == readchar.key.CTRL_C: sys.exit("\nExiting.")
+    except KeyboardInterrupt: sys.exit("\nExiting.")
+    if key in PASTE_KEYS:
+        pasted_cube = _read_pasted_state()
+        if pasted_cube is not None:
+            return pasted_cube
+
     face_colours = {}
     faces_to_enter = [f[0] for f in FACE_ORDER]
 
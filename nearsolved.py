@@ -0,0 +1,146 @@
+# nearsolved.py
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from rubikscube import RubiksCube, sticker_permutation, zobrist_hashes
+from distancetables import ALL_MOVES, TABLES_DIR
+from kociembasolver import invert_moves, solve_with_kociemba
+
+DEFAULT_DEPTH = 5 # 621,649 states, ~6 MB; depth 6 is 7.8 million states, ~70 MB
+CHUNK = 1 << 16 # Frontier states expanded per pass
+NO_MOVE = 255 # Stored for the solved state
+
+def _table_paths(depth, tables_dir):
+    base = os.path.join(tables_dir, f"near_solved_d{depth}")
+    return base + "_keys.npy", base + "_moves.npy", base + ".json"
+
+def _relabelled(state):
+    """Stickers recoloured by the face each colour's centre is on, so any orientation or colour scheme
+    keys the same way. None if the centres are not six different colours."""
+    state = np.asarray(state).reshape(6, 3, 3)
+    centres = state[:, 1, 1]
+    if sorted(centres.tolist()) != list(range(6)): return None
+    face_of = np.empty(6, dtype=np.int64)
+    face_of[centres] = np.arange(6)
+    return face_of[state]
+
+def _in_sorted(sorted_keys, keys):
+    i = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[i] == keys
+
+def build_near_solved_table(depth=DEFAULT_DEPTH, out_dir=TABLES_DIR):
+    """
+    Breadth-first search from solved over the 18 face moves, recording every state within `depth`
+    by its 64-bit Zobrist hash together with the first move of an optimal solution. Keys are
+    sorted and saved as .npy so lookups are binary searches on a memory map.
+    """
+    perms = np.stack([sticker_permutation(m) for m in ALL_MOVES])
+    undo = np.array([ALL_MOVES.index(invert_moves(m)) for m in ALL_MOVES], dtype=np.uint8)
+    frontier = RubiksCube().state.reshape(1, 54).astype(np.uint8)
+    level_keys, level_moves = [zobrist_hashes(frontier)], [np.array([NO_MOVE], dtype=np.uint8)]
+    seen = level_keys[0]
+    distribution = {0: 1}
+    start = time.perf_counter()
+
+    for d in range(1, depth + 1):
+        found_keys, found_parents, found_moves = [], [], []
+        for first in range(0, len(frontier), CHUNK):
+            block = frontier[first:first + CHUNK]
+            parents = np.arange(first, first + len(block))
+            for m, perm in enumerate(perms):
+                keys = zobrist_hashes(block[:, perm])
+                new = ~_in_sorted(seen, keys)
+                found_keys.append(keys[new])
+                found_parents.append(parents[new])
+                found_moves.append(np.full(np.count_nonzero(new), m, dtype=np.uint8))
+        keys, first_seen = np.unique(np.concatenate(found_keys), return_index=True) # One entry per state reached at this depth
+        parents, moves = np.concatenate(found_parents)[first_seen], np.concatenate(found_moves)[first_seen]
+        if d < depth: # The last layer is never expanded
+            frontier = np.take_along_axis(frontier[parents], perms[moves], axis=1)
+        level_keys.append(keys)
+        level_moves.append(undo[moves])
+        seen = np.union1d(seen, keys)
+        distribution[d] = len(keys)
+        print(f"  depth {d}: {len(keys):>10,} states  ({time.perf_counter() - start:.1f}s)")
+
+    keys, moves = np.concatenate(level_keys), np.concatenate(level_moves)
+    order = np.argsort(keys)
+    os.makedirs(out_dir, exist_ok=True)
+    keys_path, moves_path, meta_path = _table_paths(depth, out_dir)
+    np.save(keys_path, keys[order])
+    np.save(moves_path, moves[order])
+    meta = {'depth': depth, 'states': int(len(keys)), 'distribution': distribution,
+            'build_seconds': round(time.perf_counter() - start, 2)}
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+class NearSolvedTable:
+    """A built table, memory-mapped. solve() walks it one lookup per move."""
+    def __init__(self, depth=DEFAULT_DEPTH, tables_dir=TABLES_DIR):
+        keys_path, moves_path, meta_path = _table_paths(depth, tables_dir)
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        self.depth = self.meta['depth']
+        self.keys = np.load(keys_path, mmap_mode='r')
+        self.moves = np.load(moves_path, mmap_mode='r')
+
+    def _next_move(self, key):
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i == len(self.keys) or int(self.keys[i]) != key: return None
+        return int(self.moves[i])
+
+    def solve(self, cube_obj):
+        """An optimal (HTM) solution string, or None if the cube is further than `depth` moves from solved."""
+        relabelled = _relabelled(cube_obj.state)
+        if relabelled is None: return None
+        cube = RubiksCube(state=relabelled)
+        solution = []
+        for _ in range(self.depth + 1):
+            move = self._next_move(cube.zobrist_hash())
+            if move is None: return None
+            if move == NO_MOVE:
+                # Confirm, since a state outside the table could share a hash with one inside it
+                return " ".join(solution) if cube.is_solved() else None
+            solution.append(ALL_MOVES[move])
+            cube.move(ALL_MOVES[move])
+        return None
+
+_default_table = False # Not loaded yet; None once we know no table has been built
+
+def default_table():
+    """The table for DEFAULT_DEPTH, or the deepest other one built, loaded once per process; None if none exists."""
+    global _default_table
+    if _default_table is False:
+        _default_table = None
+        for depth in [DEFAULT_DEPTH] + list(range(8, 0, -1)):
+            if os.path.exists(_table_paths(depth, TABLES_DIR)[2]):
+                _default_table = NearSolvedTable(depth)
+                break
+    return _default_table
+
+def solve_with_lookup(cube_obj, table=None):
+    """solve_with_kociemba, answered from the near-solved table when the cube is close enough to solved."""
+    table = table or default_table()
+    solution = table.solve(cube_obj) if table is not None else None
+    return solution if solution is not None else solve_with_kociemba(cube_obj)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the near-solved lookup table of optimal solutions.")
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help="Include every state within this many moves (HTM).")
+    parser.add_argument('--out', default=TABLES_DIR)
+    args = parser.parse_args()
+
+    print(f"Building the near-solved table to depth {args.depth} -> {args.out}")
+    meta = build_near_solved_table(args.depth, args.out)
+    print(f"\n{meta['states']:,} states in {meta['build_seconds']}s.")
+
+    table = NearSolvedTable(args.depth, args.out)
+    cube = RubiksCube()
+    cube.shuffle(args.depth)
+    start = time.perf_counter()
+    solution = table.solve(cube)
+    print(f"Example: {solution!r} in {(time.perf_counter() - start) * 1e6:.0f} us")
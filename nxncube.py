@@ -0,0 +1,165 @@
+# nxncube.py
+
+import random
+import re
+import numpy as np
+
+# Outer face letter -> (axis, side). Axis 0 = x (L to R), 1 = y (D to U), 2 = z (B to F).
+FACE_AXES = {'R': (0, 1), 'L': (0, -1), 'U': (1, 1), 'D': (1, -1), 'F': (2, 1), 'B': (2, -1)}
+ROTATION_AXES = {'X': 'R', 'Y': 'U', 'Z': 'F'} # Whole-cube rotations turn like these faces
+MOVE_PATTERN = re.compile(r"^(\d*)([URFDLBurfdlbxyzXYZ])(w?)(['2]?)$")
+MIN_N, MAX_N = 2, 7
+
+def _sticker_coordinates(n):
+    """
+    (6 * n * n, 3) sticker centres, in the same face order (U, D, F, B, L, R) and row/column
+    conventions as RubiksCube. Layer coordinates are odd integers in [-(n-1), n-1]; stickers sit at +-n.
+    """
+    idx = np.arange(n)
+    rows, cols = np.meshgrid(idx, idx, indexing='ij')
+    low = 2 * cols - (n - 1)       # Runs with the column, low to high
+    down = (n - 1) - 2 * rows      # Top row first
+    toward = 2 * rows - (n - 1)    # Back row first
+    full = np.full_like(rows, n)
+    faces = [
+        (low, full, toward),                     # U: rows back to front, columns left to right
+        (low, -full, -toward),                   # D: rows front to back
+        (low, down, full),                       # F
+        (-low, down, -full),                     # B: columns right to left, seen from behind
+        (-full, down, low),                      # L: columns back to front
+        (full, down, -low),                      # R: columns front to back
+    ]
+    return np.concatenate([np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1) for x, y, z in faces])
+
+def _quarter_turn_matrix(axis, side):
+    """Clockwise quarter turn as seen from the `side` end of `axis` (a -90 degree turn times side)."""
+    a, b = [i for i in range(3) if i != axis]
+    matrix = np.zeros((3, 3), dtype=np.int64)
+    matrix[axis, axis] = 1
+    # Right-handed -90 degrees about `axis`: (a, b) -> (b, -a), with the cyclic order x->y->z
+    sign = side if (b - a) % 3 == 1 else -side
+    matrix[a, b] = sign
+    matrix[b, a] = -sign
+    return matrix
+
+class NxNCube:
+    """
+    N x N x N cube (2 <= N <= 7) with the same API as RubiksCube. Every move is a precomputed
+    permutation of the flat sticker array, so applying one is a single gather whatever N is.
+    Notation: R, R', R2; wide Rw / r (two layers) and 3Rw (three outer layers); single inner
+    slice 2R, 3R; whole-cube rotations x, y, z. NxNCube(3) produces the same states as RubiksCube.
+    """
+    U, D, F, B, L, R = 0, 1, 2, 3, 4, 5
+    _permutations = {} # (n, normalised move) -> permutation, shared by every cube of that size
+    _coordinates = {}
+
+    def __init__(self, n=3, state=None):
+        if not MIN_N <= n <= MAX_N:
+            raise ValueError(f"Cube size must be between {MIN_N} and {MAX_N}.")
+        self.n = n
+        if state is None:
+            self.reset()
+        else:
+            self.flat = np.array(state, dtype=np.int8).ravel()
+
+    @property
+    def state(self):
+        return self.flat.reshape(6, self.n, self.n)
+
+    @state.setter
+    def state(self, value):
+        self.flat = np.array(value, dtype=np.int8).ravel()
+
+    def reset(self): # To solved state
+        self.flat = np.repeat(np.arange(6, dtype=np.int8), self.n * self.n)
+
+    def is_solved(self):
+        faces = self.flat.reshape(6, -1)
+        return bool(np.all(faces == faces[:, :1]))
+
+    @classmethod
+    def move_permutation(cls, n, move):
+        """Index array `perm` with new_flat = old_flat[perm] for a single move token."""
+        match = MOVE_PATTERN.match(move)
+        if match is None:
+            raise ValueError(f"Invalid move format: {move}")
+        depth_str, letter, wide, modifier = match.groups()
+        key = (n, move)
+        if key in cls._permutations:
+            return cls._permutations[key]
+
+        if letter.upper() in ROTATION_AXES:
+            if depth_str or wide: raise ValueError(f"Invalid rotation format: {move}")
+            face, layers = ROTATION_AXES[letter.upper()], range(1, n + 1)
+        else:
+            face = letter.upper()
+            depth = int(depth_str) if depth_str else (2 if wide or letter.islower() else 1)
+            if not 1 <= depth <= n: raise ValueError(f"Invalid layer depth for {n}x{n}: {move}")
+            if letter.islower() and wide: raise ValueError(f"Invalid move format: {move}")
+            # Wide (Rw, r, 3Rw) turns every layer up to the depth; a bare number (3R) turns that slice only
+            layers = range(1, depth + 1) if (wide or letter.islower()) else range(depth, depth + 1)
+
+        axis, side = FACE_AXES[face]
+        if n not in cls._coordinates:
+            cls._coordinates[n] = _sticker_coordinates(n)
+        coords = cls._coordinates[n]
+        # Layer 1 is the outer layer on `side`; stickers on the outer face belong to it too
+        layer_of = ((n - 1) - side * np.clip(coords[:, axis], -(n - 1), n - 1)) // 2 + 1
+        selected = np.isin(layer_of, list(layers))
+
+        turns = {'': 1, "'": 3, '2': 2}[modifier]
+        moved = coords[selected]
+        for _ in range(turns):
+            moved = moved @ _quarter_turn_matrix(axis, side).T
+
+        index_of = {tuple(c): i for i, c in enumerate(coords.tolist())}
+        perm = np.arange(len(coords))
+        destinations = [index_of[tuple(c)] for c in moved.tolist()]
+        perm[destinations] = np.flatnonzero(selected) # Sticker from i lands on its destination
+        cls._permutations[key] = perm
+        return perm
+
+    def move(self, move_str): # Apply move from string notation
+        for move in move_str.split():
+            self.flat = self.flat[self.move_permutation(self.n, move)]
+
+    def shuffle(self, num_moves=None):
+        num_moves = num_moves or 10 * self.n
+        faces = ["U", "D", "L", "R", "F", "B"]
+        modifiers = ["", "'", "2"]
+        for _ in range(num_moves):
+            depth = random.randint(1, max(1, self.n // 2))
+            prefix = str(depth) if depth > 1 else ""
+            self.move(prefix + random.choice(faces) + random.choice(modifiers))
+
+    def __str__(self):
+        colour_map = {0: 'W', 1: 'Y', 2: 'B', 3: 'G', 4: 'R', 5: 'O', -1: ' '}
+        def face_to_str(face_idx):
+            return [" ".join(colour_map[int(c)] for c in row) for row in self.state[face_idx]]
+
+        indent = " " * (2 * self.n + 1)
+        output = []
+        for row in face_to_str(self.U): output.append(indent + row)
+        output.append("")
+        left, front, right, back = (face_to_str(f) for f in (self.L, self.F, self.R, self.B))
+        for i in range(self.n): output.append(f"{left[i]}  {front[i]}  {right[i]}  {back[i]}")
+        output.append("")
+        for row in face_to_str(self.D): output.append(indent + row)
+        return "\n".join(output)
+
+if __name__ == "__main__":
+    import time
+    for n in range(MIN_N, MAX_N + 1):
+        cube = NxNCube(n)
+        moves = [f"{d}{f}{m}" if d > 1 else f"{f}{m}" for d in range(1, max(1, n // 2) + 1) for f in "UDLRFB" for m in ["", "'", "2"]]
+        sequence = " ".join(random.choice(moves) for _ in range(20000))
+        cube.move(sequence) # Builds the permutation cache
+        start = time.perf_counter()
+        cube.move(sequence)
+        elapsed = time.perf_counter() - start
+        print(f"{n}x{n}: {20000 / elapsed:,.0f} moves/s")
+
+    print("\n4x4 after Rw U 2R':")
+    cube = NxNCube(4)
+    cube.move("Rw U 2R'")
+    print(cube)
@@ -17,70 +17,113 @@ class RubiksCube:
     U, D, F, B, L, R = 0, 1, 2, 3, 4, 5
 
     def __init__(self, state=None):
+        self._hash = None # Zobrist hash, only tracked once zobrist_hash() has been called
         if state is None:
             self.reset()
         else:
             self.state = np.copy(state)
 
+    @property
+    def state(self):
+        """
+        The (6, 3, 3) stickers as seen from the current orientation. Whole-cube rotations only change
+        the orientation index, so the stickers are rearranged here, on the first read after one.
+        """
+        if self._orientation:
+            self._stickers = self._flat().reshape(6, 3, 3)
+            self._orientation = 0
+        return self._stickers
+
+    @state.setter
+    def state(self, value):
+        self._stickers = value
+        self._orientation = 0
+        self._hash = None # Rehashed on the next zobrist_hash() call
+
+    @property
+    def orientation(self):
+        """Index into ORIENTATIONS of the rotation applied since the stickers were last materialised."""
+        return self._orientation
+
+    def _flat(self): # Flat stickers in the current frame, without materialising them
+        flat = self._stickers.ravel()
+        return flat[ORIENTATION_PERMUTATIONS[self._orientation]] if self._orientation else flat
+
     def reset(self): # To solved state
         self.state = np.array([[[c] * 3 for _ in range(3)] for c in range(6)], dtype=int)
 
-    def is_solved(self):
+    def is_solved(self): # Unaffected by orientation, so the stickers are checked as stored
         for face_idx in range(6):
-            centre_colour = self.state[face_idx, 1, 1]
-            if not np.all(self.state[face_idx] == centre_colour):
+            centre_colour = self._stickers[face_idx, 1, 1]
+            if not np.all(self._stickers[face_idx] == centre_colour):
                 return False
         return True
 
     def _apply_move(self, face, clockwise=True): # Single move
         k = 1 if clockwise else 3 # 'k' value for rot90. And for a clockwise cube turn, we need an anti-clockwise array rotation.
-        self.state[face] = np.rot90(self.state[face], k=-k)
+        self._stickers[face] = np.rot90(self._stickers[face], k=-k)
 
         for _ in range(k):
             if face == self.U:
-                temp = self.state[self.F][0, :].copy()
-                self.state[self.F][0, :] = self.state[self.R][0, :]
-                self.state[self.R][0, :] = self.state[self.B][0, :]
-                self.state[self.B][0, :] = self.state[self.L][0, :]
-                self.state[self.L][0, :] = temp
+                temp = self._stickers[self.F][0, :].copy()
+                self._stickers[self.F][0, :] = self._stickers[self.R][0, :]
+                self._stickers[self.R][0, :] = self._stickers[self.B][0, :]
+                self._stickers[self.B][0, :] = self._stickers[self.L][0, :]
+                self._stickers[self.L][0, :] = temp
             elif face == self.D:
-                temp = self.state[self.F][2, :].copy()
-                self.state[self.F][2, :] = self.state[self.L][2, :]
-                self.state[self.L][2, :] = self.state[self.B][2, :]
-                self.state[self.B][2, :] = self.state[self.R][2, :]
-                self.state[self.R][2, :] = temp
+                temp = self._stickers[self.F][2, :].copy()
+                self._stickers[self.F][2, :] = self._stickers[self.L][2, :]
+                self._stickers[self.L][2, :] = self._stickers[self.B][2, :]
+                self._stickers[self.B][2, :] = self._stickers[self.R][2, :]
+                self._stickers[self.R][2, :] = temp
             elif face == self.F:
-                temp = self.state[self.U][2, :].copy()
-                self.state[self.U][2, :] = np.flip(self.state[self.L][:, 2])
-                self.state[self.L][:, 2] = self.state[self.D][0, :]
-                self.state[self.D][0, :] = np.flip(self.state[self.R][:, 0])
-                self.state[self.R][:, 0] = temp
+                temp = self._stickers[self.U][2, :].copy()
+                self._stickers[self.U][2, :] = np.flip(self._stickers[self.L][:, 2])
+                self._stickers[self.L][:, 2] = self._stickers[self.D][0, :]
+                self._stickers[self.D][0, :] = np.flip(self._stickers[self.R][:, 0])
+                self._stickers[self.R][:, 0] = temp
             elif face == self.B:
-                temp = self.state[self.U][0, :].copy()
-                self.state[self.U][0, :] = self.state[self.R][:, 2]
-                self.state[self.R][:, 2] = np.flip(self.state[self.D][2, :])
-                self.state[self.D][2, :] = self.state[self.L][:, 0]
-                self.state[self.L][:, 0] = np.flip(temp)
+                temp = self._stickers[self.U][0, :].copy()
+                self._stickers[self.U][0, :] = self._stickers[self.R][:, 2]
+                self._stickers[self.R][:, 2] = np.flip(self._stickers[self.D][2, :])
+                self._stickers[self.D][2, :] = self._stickers[self.L][:, 0]
+                self._stickers[self.L][:, 0] = np.flip(temp)
             elif face == self.R:
-                temp = self.state[self.U][:, 2].copy()
-                self.state[self.U][:, 2] = self.state[self.F][:, 2]
-                self.state[self.F][:, 2] = self.state[self.D][:, 2]
-                self.state[self.D][:, 2] = np.flip(self.state[self.B][:, 0])
-                self.state[self.B][:, 0] = np.flip(temp)
+                temp = self._stickers[self.U][:, 2].copy()
+                self._stickers[self.U][:, 2] = self._stickers[self.F][:, 2]
+                self._stickers[self.F][:, 2] = self._stickers[self.D][:, 2]
+                self._stickers[self.D][:, 2] = np.flip(self._stickers[self.B][:, 0])
+                self._stickers[self.B][:, 0] = np.flip(temp)
             elif face == self.L:
-                temp = self.state[self.U][:, 0].copy()
-                self.state[self.U][:, 0] = np.flip(self.state[self.B][:, 2])
-                self.state[self.B][:, 2] = np.flip(self.state[self.D][:, 0])
-                self.state[self.D][:, 0] = self.state[self.F][:, 0]
-                self.state[self.F][:, 0] = temp
+                temp = self._stickers[self.U][:, 0].copy()
+                self._stickers[self.U][:, 0] = np.flip(self._stickers[self.B][:, 2])
+                self._stickers[self.B][:, 2] = np.flip(self._stickers[self.D][:, 0])
+                self._stickers[self.D][:, 0] = self._stickers[self.F][:, 0]
+                self._stickers[self.F][:, 0] = temp
+
+    def zobrist_hash(self):
+        """
+        64-bit Zobrist hash of the stickers, usable as a dict/set key. After the first call, every
+        move updates it from the stickers that move rather than rehashing all 54. Assigning self.state
+        drops it; editing the sticker array in place bypasses it, so call refresh_hash() afterwards.
+        """
+        if self._hash is None:
+            self.refresh_hash()
+        return self._hash
+
+    def refresh_hash(self):
+        self._hash = int(zobrist_hashes(self._flat().reshape(1, 54))[0])
 
     def move(self, move_str): # Apply move from string notation
         for move in move_str.split():
+            if self._hash is not None:
+                self._hash ^= zobrist_move_delta(self._flat(), move)
             face_char = move[0].upper()
             face_map = {'U': self.U, 'D': self.D, 'F': self.F, 'B': self.B, 'L': self.L, 'R': self.R}
             
             if face_char in face_map:
                 face = face_map[face_char]
+                if self._orientation: face = FACE_REMAP[self._orientation][face] # The stored face now in that position
                 if len(move) > 2: raise ValueError(f"Invalid move format: {move}")
                 
                 if len(move) > 1:
@@ -90,58 +133,51 @@ class RubiksCube:
                     else: raise ValueError(f"Invalid move modifier: {modifier}")
                 else:
                     self._apply_move(face, clockwise=True)
-            else: # Handle whole-cube rotations
-                rotation_map = {'X': self._rotate_x, 'Y': self._rotate_y, 'Z': self._rotate_z}
-                if face_char in rotation_map:
-                    rotate_func = rotation_map[face_char]
+            else: # Whole-cube rotations: only the orientation index changes
+                if face_char in "XYZ":
                     if len(move) > 2: raise ValueError(f"Invalid rotation format: {move}")
-
-                    if len(move) > 1:
-                        modifier = move[1]
-                        if modifier == "'": rotate_func(clockwise=False)
-                        elif modifier == '2': rotate_func(clockwise=True); rotate_func(clockwise=True)
-                        else: raise ValueError(f"Invalid rotation modifier: {modifier}")
-                    else:
-                        rotate_func(clockwise=True)
+                    turns = {"": 1, "'": 3, "2": 2}.get(move[1:])
+                    if turns is None: raise ValueError(f"Invalid rotation modifier: {move[1]}")
+                    self._orientation = ROTATION_TABLE[self._orientation]["XYZ".index(face_char)][turns]
                 else:
                     raise ValueError(f"Invalid move character: {face_char}")
 
-
+    # Physical whole-cube rotations of the stored stickers; only used to build the orientation tables
     def _rotate_x(self, clockwise=True): # Entire cube
         k = 1 if clockwise else 3
         for _ in range(k):
-            temp = self.state[self.F].copy()
-            self.state[self.F] = self.state[self.D]
-            self.state[self.D] = np.rot90(self.state[self.B], k=2)
-            self.state[self.B] = np.rot90(self.state[self.U], k=2)
-            self.state[self.U] = temp
+            temp = self._stickers[self.F].copy()
+            self._stickers[self.F] = self._stickers[self.D]
+            self._stickers[self.D] = np.rot90(self._stickers[self.B], k=2)
+            self._stickers[self.B] = np.rot90(self._stickers[self.U], k=2)
+            self._stickers[self.U] = temp
             # Rotate side faces
-            self.state[self.R] = np.rot90(self.state[self.R], k=-1)
-            self.state[self.L] = np.rot90(self.state[self.L], k=1)
+            self._stickers[self.R] = np.rot90(self._stickers[self.R], k=-1)
+            self._stickers[self.L] = np.rot90(self._stickers[self.L], k=1)
 
     def _rotate_y(self, clockwise=True): # Entire cube
         k = 1 if clockwise else 3
         for _ in range(k):
-            temp = self.state[self.F].copy()
-            self.state[self.F] = self.state[self.R]
-            self.state[self.R] = self.state[self.B]
-            self.state[self.B] = self.state[self.L]
-            self.state[self.L] = temp
+            temp = self._stickers[self.F].copy()
+            self._stickers[self.F] = self._stickers[self.R]
+            self._stickers[self.R] = self._stickers[self.B]
+            self._stickers[self.B] = self._stickers[self.L]
+            self._stickers[self.L] = temp
             # Rotate top/bottom faces
-            self.state[self.U] = np.rot90(self.state[self.U], k=-1)
-            self.state[self.D] = np.rot90(self.state[self.D], k=1)
+            self._stickers[self.U] = np.rot90(self._stickers[self.U], k=-1)
+            self._stickers[self.D] = np.rot90(self._stickers[self.D], k=1)
             
     def _rotate_z(self, clockwise=True): # Entire cube
         k = 1 if clockwise else 3
         for _ in range(k):
-            temp = np.rot90(self.state[self.U], k=1)
-            self.state[self.U] = np.rot90(self.state[self.L], k=1)
-            self.state[self.L] = np.rot90(self.state[self.D], k=1)
-            self.state[self.D] = np.rot90(self.state[self.R], k=1)
-            self.state[self.R] = temp
+            temp = np.rot90(self._stickers[self.U], k=-1).copy()
+            self._stickers[self.U] = np.rot90(self._stickers[self.L], k=-1)
+            self._stickers[self.L] = np.rot90(self._stickers[self.D], k=-1)
+            self._stickers[self.D] = np.rot90(self._stickers[self.R], k=-1)
+            self._stickers[self.R] = temp
             # Rotate front/back faces
-            self.state[self.F] = np.rot90(self.state[self.F], k=-1)
-            self.state[self.B] = np.rot90(self.state[self.B], k=1)
+            self._stickers[self.F] = np.rot90(self._stickers[self.F], k=-1)
+            self._stickers[self.B] = np.rot90(self._stickers[self.B], k=1)
 
     def shuffle(self, num_moves=25):
         moves = ["U", "D", "L", "R", "F", "B"]
@@ -150,6 +186,26 @@ class RubiksCube:
             random_move = random.choice(moves) + random.choice(modifiers)
             self.move(random_move)
 
+    def timeline(self, move_str):
+        """
+        Every intermediate state of `move_str` from this cube, as a (moves + 1, 54) uint8 array
+        (row 0 is the current state). One gather through the composed sticker permutations.
+        """
+        perms = [np.arange(54)]
+        for move in move_str.split():
+            perms.append(perms[-1][sticker_permutation(move)])
+        return self.state.ravel().astype(np.uint8)[np.stack(perms)]
+
+    def pack(self):
+        """Compact 21-byte encoding of the 54 stickers (3 bits each), e.g. for sending states over a socket."""
+        bits = (self.state.reshape(54, 1) >> np.array([2, 1, 0])) & 1
+        return np.packbits(bits.ravel().astype(np.uint8)).tobytes()
+
+    @classmethod
+    def unpack(cls, data):
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))[:54 * 3].reshape(54, 3)
+        return cls(state=(bits @ np.array([4, 2, 1])).reshape(6, 3, 3))
+
     def __str__(self):
         # Provide a string representation for printing the cube state
         colour_map = {0: 'W', 1: 'Y', 2: 'B', 3: 'G', 4: 'R', 5: 'O', -1: ' '}
@@ -168,6 +224,115 @@ class RubiksCube:
         for row in down_face: output.append("      " + row)
         return "\n".join(output)
 
+def _physical_rotation(axis):
+    cube = RubiksCube(state=np.arange(54).reshape(6, 3, 3))
+    getattr(cube, f"_rotate_{axis}")()
+    return cube._stickers.ravel()
+
+def _enumerate_orientations():
+    # Breadth-first over x/y/z so each of the 24 orientations gets its shortest rotation string.
+    # The sticker permutation of `rotation + step` is perms[rotation][step perm].
+    steps = {step: _physical_rotation(step) for step in "xyz"}
+    found = {tuple(np.arange(54)): ""}
+    frontier = [("", np.arange(54))]
+    while frontier:
+        next_frontier = []
+        for rotation, perm in frontier:
+            for step, step_perm in steps.items():
+                candidate = perm[step_perm]
+                if tuple(candidate) not in found:
+                    found[tuple(candidate)] = f"{rotation} {step}".strip()
+                    next_frontier.append((found[tuple(candidate)], candidate))
+        frontier = next_frontier
+    return list(found.values()), [np.array(key) for key in found], steps
+
+ORIENTATIONS, ORIENTATION_PERMUTATIONS, _step_permutations = _enumerate_orientations() # ORIENTATIONS[0] == "" (identity)
+
+def _build_rotation_table():
+    # ROTATION_TABLE[o][axis][k]: orientation after k quarter turns about x, y or z from orientation o
+    orientation_index = {tuple(perm): i for i, perm in enumerate(ORIENTATION_PERMUTATIONS)}
+    table = []
+    for perm in ORIENTATION_PERMUTATIONS:
+        row = []
+        for step in "xyz":
+            turns = [perm]
+            for _ in range(3): turns.append(turns[-1][_step_permutations[step]])
+            row.append([orientation_index[tuple(t)] for t in turns])
+        table.append(row)
+    return table
+
+ROTATION_TABLE = _build_rotation_table()
+
+# FACE_REMAP[o][face]: stored face that sits at `face` in orientation o, found through its centre sticker.
+# Rotations keep handedness, so a clockwise turn there is a clockwise turn of the stored face.
+FACE_REMAP = [[int(perm[face * 9 + 4]) // 9 for face in range(6)] for perm in ORIENTATION_PERMUTATIONS]
+
+def _compute_sticker_permutation(move_str):
+    # Label every sticker with its own index; after the move, position i holds the index it came from
+    cube = RubiksCube(state=np.arange(54).reshape(6, 3, 3))
+    cube.move(move_str)
+    return cube.state.ravel()
+
+MOVE_PERMUTATIONS = {f + m: _compute_sticker_permutation(f + m) for f in "UDFBLRXYZ" for m in ["", "'", "2"]}
+
+# Sticker indices (into state.ravel()) of each cubie, U/D (or F/B) reference sticker first, in Kociemba's cubie
+# order: corners URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB; edges UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR
+CORNER_STICKERS = [(8, 45, 20), (6, 18, 38), (0, 36, 29), (2, 27, 47), (11, 26, 51), (9, 44, 24), (15, 35, 42), (17, 53, 33)]
+EDGE_STICKERS = [(5, 46), (7, 19), (3, 37), (1, 28), (14, 52), (10, 25), (12, 43), (16, 34), (23, 48), (21, 41), (32, 39), (30, 50)]
+
+def piece_transitions(pieces, perm):
+    """
+    Piece-level effect of a sticker permutation: the piece in slot s moves to slot slot_map[s], and a
+    piece whose reference sticker sits at position o of slot s ends with it at position ori_map[s, o].
+    """
+    pieces = np.asarray(pieces)
+    slot_of, position_of = np.zeros(54, dtype=np.int64), np.zeros(54, dtype=np.int64)
+    slot_of[pieces] = np.arange(len(pieces))[:, None]
+    position_of[pieces] = np.arange(pieces.shape[1])
+    dest = np.argsort(perm)[pieces] # Where each sticker of each piece ends up
+    return slot_of[dest[:, 0]], position_of[dest]
+
+def piece_state(state, pieces):
+    """(slot of each piece, orientation of each piece) for a sticker state, pieces identified by their colours."""
+    solved = RubiksCube().state.ravel()
+    home_colours = [tuple(solved[list(piece)]) for piece in pieces]
+    lookup = {frozenset(colours): i for i, colours in enumerate(home_colours)}
+    flat = np.asarray(state).ravel()
+    positions = np.zeros(len(pieces), dtype=np.int64)
+    orientations = np.zeros(len(pieces), dtype=np.int64)
+    for slot, piece in enumerate(pieces):
+        colours = flat[list(piece)]
+        i = lookup.get(frozenset(colours.tolist()))
+        if i is None: raise ValueError(f"No piece has colours {colours.tolist()}.")
+        positions[i] = slot
+        orientations[i] = list(colours).index(home_colours[i][0])
+    return positions, orientations
+
+ZOBRIST_TABLE = np.random.default_rng(0x2B1C).integers(0, 2**64, size=(54, 6), dtype=np.uint64) # Fixed seed: same hashes in every process
+
+def zobrist_hashes(states):
+    """Zobrist hashes of a batch of states, shape (N, 54) (e.g. a timeline()), as a uint64 array."""
+    states = np.asarray(states).reshape(len(states), 54)
+    return np.bitwise_xor.reduce(ZOBRIST_TABLE[np.arange(54), states], axis=1)
+
+_zobrist_moved = {} # move -> (flat ZOBRIST_TABLE row offsets, sticker positions whose colours select the entries)
+
+def zobrist_move_delta(flat_state, move_str):
+    """XOR that turns the hash of `flat_state` into the hash after the single move `move_str`."""
+    moved = _zobrist_moved.get(move_str)
+    if moved is None:
+        perm = sticker_permutation(move_str)
+        changed = np.flatnonzero(perm != np.arange(54))
+        # Old entry (changed, its colour) and new entry (changed, colour of the sticker moving in), in one gather
+        moved = _zobrist_moved[move_str] = (np.concatenate([changed, changed]) * 6, np.concatenate([changed, perm[changed]]))
+    offsets, sources = moved
+    return int(np.bitwise_xor.reduce(ZOBRIST_TABLE.ravel()[offsets + flat_state[sources]]))
+
+def sticker_permutation(move_str):
+    """Index array `perm` with new_flat_state = old_flat_state[perm] for a single move or rotation."""
+    perm = MOVE_PERMUTATIONS.get(move_str[:1].upper() + move_str[1:])
+    return perm if perm is not None else _compute_sticker_permutation(move_str) # Raises ValueError if invalid
+
 if __name__ == "__main__":
     print("Creating a solved Rubik's Cube")
     my_cube = RubiksCube()
@@ -0,0 +1,261 @@
+# solverbackend.py
+
+import atexit
+import itertools
+import multiprocessing
+import queue
+import signal
+import sys
+import threading
+import time
+import kociemba
+from rubikscube import RubiksCube
+from kociembasolver import SOLVED_FACELETS, cube_from_facelets, cube_to_facelets, iter_anytime_solutions, warm_up
+from nearsolved import default_table
+
+DEFAULT_DEADLINE = 30.0 # Seconds from when a request reaches the worker; anytime searches get their budget on top
+POLL_INTERVAL = 0.05 # How often the dispatcher checks for cancellation while a search runs
+TERMINATE_GRACE = 2.0 # Seconds a terminated worker gets to exit before it is killed
+
+SOLVED, INVALID, TIMEOUT, CANCELLED, FAILED = 'solved', 'invalid', 'timeout', 'cancelled', 'failed'
+
+class SolveResult:
+    """Outcome of one solve. `status` is SOLVED, INVALID, TIMEOUT, CANCELLED or FAILED; `message` explains anything but SOLVED."""
+    __slots__ = ('status', 'solution', 'elapsed', 'message')
+
+    def __init__(self, status, solution=None, elapsed=0.0, message=None):
+        self.status, self.solution, self.elapsed, self.message = status, solution, elapsed, message
+
+    @property
+    def ok(self):
+        return self.status == SOLVED
+
+    @property
+    def moves(self):
+        return len(self.solution.split()) if self.solution is not None else None
+
+    def __repr__(self):
+        detail = self.solution if self.ok else self.message
+        return f"SolveResult({self.status}, {detail!r}, {self.elapsed:.3f}s)"
+
+def solve_facelets(facelets, time_budget=None, on_improvement=None, max_depth=None):
+    """
+    Solve a 54-character URFDLB string in this process and return a SolveResult. Cubes within the
+    near-solved table's depth are answered optimally from it. Otherwise, with `time_budget`, run the
+    anytime multi-orientation search for that long and call on_improvement(solution, elapsed) as
+    shorter solutions arrive. `max_depth` caps a plain search's solution length (a low cap can
+    make it run for minutes).
+    """
+    start = time.perf_counter()
+    try:
+        if facelets == SOLVED_FACELETS: # Kociemba answers a solved cube with a 13-move identity. Not is_solved(): "U" * 54 has one-colour faces too
+            return SolveResult(SOLVED, "", time.perf_counter() - start)
+        cube = cube_from_facelets(facelets)
+        near_solved = default_table()
+        solution = near_solved.solve(cube) if near_solved is not None else None
+        if solution is not None:
+            if on_improvement: on_improvement(solution, time.perf_counter() - start)
+        elif time_budget:
+            solution = None
+            for solution, elapsed, _ in iter_anytime_solutions(cube, time_budget):
+                if on_improvement: on_improvement(solution, elapsed)
+            if solution is None:
+                return SolveResult(INVALID, elapsed=time.perf_counter() - start,
+                                   message="The cube state is very likely invalid or unsolvable, or no solution was found in time.")
+        else:
+            solution = kociemba.solve(facelets, max_depth=max_depth) if max_depth else kociemba.solve(facelets)
+    except ValueError as e: # Bad characters, or facelets that are not a real cube
+        return SolveResult(INVALID, elapsed=time.perf_counter() - start, message=f"The cube state is very likely invalid or unsolvable. {e}")
+    except Exception as e:
+        return SolveResult(FAILED, elapsed=time.perf_counter() - start, message=f"Solver failed: {e}")
+    return SolveResult(SOLVED, solution.strip(), time.perf_counter() - start)
+
+def _worker_main(conn):
+    """Persistent solver process: warm up once, then serve (id, facelets, time budget, max depth) requests until told to stop."""
+    warm_up()
+    default_table() # Maps the near-solved table, if one has been built
+    conn.send(('ready',))
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError: # Parent went away
+            return
+        if request is None: return
+        request_id, facelets, time_budget, max_depth = request
+        progress = lambda solution, elapsed: conn.send((request_id, 'progress', solution, elapsed))
+        if time_budget: # Unwind normally when terminated, so the anytime search's pool is terminated too
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        # A plain search sits in C, where a Python handler would never run; the default action ends it at once
+        result = solve_facelets(facelets, time_budget, progress, max_depth)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        conn.send((request_id, 'result', result))
+
+class SolveHandle:
+    """A submitted solve. result() blocks until it finishes; cancel() stops it, killing the search if it has started."""
+    def __init__(self, request_id=None, facelets=None, deadline=None, time_budget=None, on_progress=None, max_depth=None):
+        self.id, self.facelets, self.deadline = request_id, facelets, deadline
+        self.time_budget, self.on_progress, self.max_depth = time_budget, on_progress, max_depth
+        self.cancelled = False
+        self._done = threading.Event()
+        self._result = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """The SolveResult, or None if `timeout` seconds pass first."""
+        return self._result if self._done.wait(timeout) else None
+
+    def add_done_callback(self, fn):
+        """Call fn(handle) once the result is in: on the dispatcher thread, or at once if it already is."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, result):
+        with self._lock:
+            self._result = result
+            self._done.set()
+        for fn in self._callbacks:
+            fn(self)
+
+class SolverBackend:
+    """
+    Runs searches in one persistent subprocess, so a slow solve or a first-call table build never
+    blocks the caller. start() launches and pre-warms the worker straight away. Requests are served
+    in order by a dispatcher thread. A request that passes its deadline or is cancelled has the
+    worker killed and replaced, because a search in C cannot be interrupted any other way.
+    """
+    def __init__(self, default_deadline=DEFAULT_DEADLINE):
+        self.default_deadline = default_deadline
+        self._ctx = multiprocessing.get_context('spawn') # No fork of a parent that may be running TensorFlow threads
+        self._requests = queue.Queue()
+        self._ids = itertools.count(1)
+        self._process = self._conn = None
+        self._ready = False
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        if self._thread is None:
+            self._spawn()
+            self._thread = threading.Thread(target=self._dispatch, name='SolverBackend', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def submit(self, cube_or_facelets, deadline=None, time_budget=None, on_progress=None, max_depth=None):
+        """Queue a RubiksCube or facelet string; returns a SolveHandle at once. on_progress(solution, elapsed) runs on the dispatcher thread."""
+        try:
+            facelets = cube_to_facelets(cube_or_facelets) if isinstance(cube_or_facelets, RubiksCube) else "".join(cube_or_facelets.split()).upper()
+        except KeyError:
+            handle = SolveHandle()
+            handle._finish(SolveResult(INVALID, message="Could not map cube colours. Ensure cube state is valid."))
+            return handle
+        if deadline is None:
+            deadline = self.default_deadline + (time_budget or 0)
+        handle = SolveHandle(next(self._ids), facelets, deadline, time_budget, on_progress, max_depth)
+        self.start()
+        self._requests.put(handle)
+        return handle
+
+    def solve(self, cube_or_facelets, deadline=None, time_budget=None, max_depth=None):
+        return self.submit(cube_or_facelets, deadline, time_budget, max_depth=max_depth).result()
+
+    def close(self):
+        if self._closed: return
+        self._closed = True
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(target=_worker_main, args=(child_conn,), name='SolverWorker')
+        self._process.start()
+        child_conn.close()
+        self._conn, self._ready = parent_conn, False
+
+    def _stop_worker(self):
+        """terminate(), then kill() if the worker has not gone within TERMINATE_GRACE seconds."""
+        self._process.terminate()
+        self._process.join(TERMINATE_GRACE)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+
+    def _restart(self):
+        self._stop_worker()
+        self._conn.close()
+        self._spawn() # Warms up again in the background while the next request waits
+
+    def _dispatch(self):
+        while (handle := self._requests.get()) is not None:
+            if handle.cancelled:
+                handle._finish(SolveResult(CANCELLED, message="Cancelled before it started."))
+                continue
+            self._serve(handle)
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._stop_worker()
+
+    def _serve(self, handle):
+        start = time.monotonic()
+        sent = False
+        while True:
+            elapsed = time.monotonic() - start
+            if handle.cancelled or elapsed > handle.deadline:
+                if sent: # Only a running search needs the worker killed; a warm-up in progress is left alone
+                    self._restart()
+                if handle.cancelled:
+                    handle._finish(SolveResult(CANCELLED, elapsed=elapsed, message="Cancelled."))
+                else:
+                    handle._finish(SolveResult(TIMEOUT, elapsed=elapsed, message=f"No solution within the {handle.deadline:g}s deadline."))
+                return
+            if self._ready and not sent:
+                self._conn.send((handle.id, handle.facelets, handle.time_budget, handle.max_depth))
+                sent = True
+
+            try:
+                message = self._conn.recv() if self._conn.poll(POLL_INTERVAL) else None
+            except (EOFError, OSError):
+                message = ('crashed',)
+            if message is None and not self._process.is_alive():
+                message = ('crashed',)
+            if message is None:
+                continue
+            if message[0] == 'crashed':
+                self._restart()
+                handle._finish(SolveResult(FAILED, elapsed=time.monotonic() - start, message="Solver process exited unexpectedly."))
+                return
+            if message[0] == 'ready':
+                self._ready = True
+            elif message[0] == handle.id and message[1] == 'progress':
+                if handle.on_progress: handle.on_progress(message[2], message[3])
+            elif message[0] == handle.id: # 'result'
+                handle._finish(message[2])
+                return
+
+if __name__ == "__main__":
+    backend = SolverBackend().start()
+    cube = RubiksCube()
+    cube.shuffle(30)
+    print(backend.solve(cube))
+    print(backend.solve("U" * 54))
+    print(backend.solve(cube, deadline=0.5, time_budget=3.0)) # Deadline before the budget ends: killed, worker replaced
+    print(backend.solve(cube))
+    backend.close()
@@ -0,0 +1,285 @@
+# solveservice.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import numpy as np
+from rubikscube import RubiksCube
+from kociembasolver import WARMUP_FACELETS, cube_from_facelets, cube_to_facelets
+from solverbackend import SolverBackend
+
+HOST, PORT = '127.0.0.1', 8765
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_PENDING = 256 # Distinct solves queued or running before new ones are refused
+DEFAULT_DEADLINE = 10.0 # Seconds
+
+# Protocol: newline-delimited JSON over TCP, one object per line; replies carry the request's id.
+#   {"id": 1, "facelets": "<54 chars URFDLB>", "deadline": 2.5}
+#   {"id": 2, "packed": "<hex of RubiksCube.pack()>"}
+#   {"id": 3, "op": "metrics"}
+# Reply: {"id": 1, "solution": "R U ...", "moves": 20, "error": null, "solve_ms": 3.1, "coalesced": false}
+
+class _Search:
+    """One distinct search: its backend handle, the future its callers await, and how many of them still wait."""
+    __slots__ = ('handle', 'future', 'backend', 'waiters')
+
+    def __init__(self, handle, future, backend):
+        self.handle, self.future, self.backend, self.waiters = handle, future, backend, 0
+
+class _Metrics:
+    def __init__(self, window=2048):
+        self.window = window
+        self.latencies = []
+        self.counts = {'requests': 0, 'solved': 0, 'errors': 0, 'coalesced': 0, 'rejected': 0, 'timeouts': 0, 'abandoned': 0}
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+        if len(self.latencies) > self.window:
+            del self.latencies[:len(self.latencies) - self.window]
+
+    def snapshot(self):
+        result = dict(self.counts)
+        if self.latencies:
+            p50, p95, p99 = np.percentile(np.array(self.latencies) * 1000.0, [50, 95, 99])
+            result.update({'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3)})
+        return result
+
+class SolveService:
+    """
+    Local solve server. Identical in-flight requests share one search, searches run on warm
+    SolverBackend workers, and at most `max_pending` distinct searches are queued. A search
+    whose callers have all passed their deadlines is cancelled, which frees its slot and
+    replaces its worker.
+    """
+    def __init__(self, num_workers=NUM_WORKERS, max_pending=MAX_PENDING, default_deadline=DEFAULT_DEADLINE):
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.default_deadline = default_deadline
+        self.metrics = _Metrics()
+        self._in_flight = {} # facelets -> _Search
+        self._backends = []
+        self._load = {} # Backend -> searches submitted to it and not yet finished
+        self._server = None
+        self._connections = {} # Handler task -> writer, so stop() can end them cleanly
+
+    async def start(self, host=HOST, port=PORT):
+        self._backends = [SolverBackend().start() for _ in range(self.num_workers)]
+        self._load = dict.fromkeys(self._backends, 0)
+        # Wait for every worker to warm up now rather than on the first requests
+        await asyncio.gather(*(asyncio.to_thread(backend.solve, WARMUP_FACELETS) for backend in self._backends))
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+        for search in self._in_flight.values():
+            search.handle.cancel()
+        for writer in self._connections.values():
+            writer.transport.abort() # Handlers see EOF and return
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+        await asyncio.gather(*(asyncio.to_thread(backend.close) for backend in self._backends))
+
+    async def serve_forever(self, host=HOST, port=PORT):
+        address = await self.start(host, port)
+        print(f"Solve service listening on {address[0]}:{address[1]} with {self.num_workers} workers.")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        self._connections[asyncio.current_task()] = writer
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def _respond(self, line, writer, write_lock):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            reply = {'id': None, 'error': "Error: request is not valid JSON."}
+        else:
+            if not isinstance(request, dict):
+                reply = {'id': None, 'error': "Error: request must be a JSON object."}
+            else:
+                try:
+                    reply = await self.handle_request(request)
+                except Exception as e: # Every request gets a reply, or its client would wait forever
+                    self.metrics.counts['errors'] += 1
+                    reply = {'id': request.get('id'), 'error': f"Error: could not handle request: {e}"}
+        async with write_lock:
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+
+    async def handle_request(self, request):
+        request_id = request.get('id')
+        if request.get('op') == 'metrics':
+            return {'id': request_id, 'metrics': self.metrics.snapshot()}
+
+        self.metrics.counts['requests'] += 1
+        start = time.perf_counter()
+        deadline = request.get('deadline', self.default_deadline)
+        try:
+            if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or deadline <= 0:
+                raise ValueError("'deadline' must be a positive number of seconds.")
+            facelets = self._parse_state(request)
+        except (KeyError, ValueError) as e:
+            self.metrics.counts['errors'] += 1
+            return {'id': request_id, 'error': f"Error: {e}"}
+
+        search = self._in_flight.get(facelets)
+        coalesced = search is not None
+        if coalesced:
+            self.metrics.counts['coalesced'] += 1
+        elif len(self._in_flight) >= self.max_pending: # Backpressure: refuse rather than queue without bound
+            self.metrics.counts['rejected'] += 1
+            return {'id': request_id, 'error': "Error: service busy, retry later.", 'retry': True}
+        else:
+            search = self._start_search(facelets)
+
+        search.waiters += 1
+        try:
+            # shield(): one caller timing out must not cancel the search other callers are waiting on
+            result = await asyncio.wait_for(asyncio.shield(search.future), timeout=deadline)
+        except asyncio.TimeoutError:
+            self.metrics.counts['timeouts'] += 1
+            return {'id': request_id, 'error': f"Error: deadline of {deadline}s exceeded."}
+        finally:
+            self._release(facelets, search)
+
+        self.metrics.record_latency(time.perf_counter() - start)
+        if not result.ok:
+            self.metrics.counts['errors'] += 1
+            return {'id': request_id, 'error': f"Error: {result.message}", 'coalesced': coalesced}
+        self.metrics.counts['solved'] += 1
+        return {'id': request_id, 'solution': result.solution, 'moves': result.moves, 'error': None,
+                'solve_ms': round(result.elapsed * 1000.0, 3), 'coalesced': coalesced}
+
+    def _start_search(self, facelets):
+        loop = asyncio.get_running_loop()
+        backend = min(self._backends, key=self._load.get)
+        # No backend deadline: the search runs until it finishes or its last caller gives up
+        search = _Search(backend.submit(facelets, deadline=float('inf')), loop.create_future(), backend)
+        self._load[backend] += 1
+        self._in_flight[facelets] = search
+        search.handle.add_done_callback(lambda handle: loop.call_soon_threadsafe(self._finish, facelets, search, handle.result()))
+        return search
+
+    def _finish(self, facelets, search, result):
+        self._load[search.backend] -= 1
+        if self._in_flight.get(facelets) is search:
+            del self._in_flight[facelets]
+        search.future.set_result(result)
+
+    def _release(self, facelets, search):
+        """One caller is done waiting. If it was the last and the search is still going, cancel it."""
+        search.waiters -= 1
+        if search.waiters == 0 and not search.future.done():
+            search.handle.cancel() # The backend kills the worker mid-search and starts a fresh one
+            if self._in_flight.get(facelets) is search:
+                del self._in_flight[facelets] # No longer counts against max_pending
+            self.metrics.counts['abandoned'] += 1
+
+    @staticmethod
+    def _parse_state(request):
+        if 'facelets' in request:
+            if not isinstance(request['facelets'], str): raise ValueError("'facelets' must be a string.")
+            facelets = request['facelets'].strip().upper()
+            cube_to_facelets(cube_from_facelets(facelets)) # Validates the letters, then the centres (KeyError unless six distinct)
+            return facelets
+        if 'packed' in request:
+            if not isinstance(request['packed'], str): raise ValueError("'packed' must be a hex string.")
+            return cube_to_facelets(RubiksCube.unpack(bytes.fromhex(request['packed'])))
+        raise ValueError("request needs 'facelets' or 'packed'.")
+
+class SolveClient:
+    """Async client for SolveService. Requests on one connection may be in flight concurrently."""
+    def __init__(self, host=HOST, port=PORT):
+        self.host, self.port = host, port
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._reader = self._writer = self._reader_task = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._reader_task = asyncio.create_task(self._read_replies())
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._reader_task.cancel()
+
+    async def _read_replies(self):
+        while line := await self._reader.readline():
+            reply = json.loads(line)
+            future = self._pending.pop(reply.get('id'), None)
+            if future and not future.done():
+                future.set_result(reply)
+        for future in self._pending.values(): # Connection closed
+            future.set_exception(ConnectionError("solve service closed the connection"))
+
+    async def _request(self, payload):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write((json.dumps({'id': request_id, **payload}) + "\n").encode())
+        await self._writer.drain()
+        return await future
+
+    async def solve(self, cube_or_facelets, deadline=None):
+        """Solve a RubiksCube or a facelet string; returns the reply dict."""
+        if isinstance(cube_or_facelets, RubiksCube):
+            payload = {'packed': cube_or_facelets.pack().hex()}
+        else:
+            payload = {'facelets': cube_or_facelets}
+        if deadline is not None:
+            payload['deadline'] = deadline
+        return await self._request(payload)
+
+    async def metrics(self):
+        return (await self._request({'op': 'metrics'}))['metrics']
+
+def solve_remote(cube_or_facelets, host=HOST, port=PORT, deadline=None):
+    """Blocking one-shot helper for callers without an event loop."""
+    async def _run():
+        async with SolveClient(host, port) as client:
+            return await client.solve(cube_or_facelets, deadline)
+    return asyncio.run(_run())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Rubik's Cube solve service (JSON lines over TCP).")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS)
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING)
+    args = parser.parse_args()
+
+    service = SolveService(args.workers, args.max_pending)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nSolve service stopped.")
@@ -0,0 +1,239 @@
+# stickerstore.py
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import numpy as np
+
+CLASS_NAMES = ['blue', 'green', 'orange', 'red', 'white', 'yellow'] # Alphabetical, same order the classifier was trained on
+IMG_SIZE = (32, 32)
+SHARD_SIZE = 4096
+INDEX_FILE = 'index.jsonl'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp') # Same files trainclassifier.py reads from class folders
+
+def shard_root(data_dir):
+    """Shards live next to (not inside) the folder-per-class dataset, so directory-based tools never see them."""
+    return os.path.normpath(data_dir) + '_shards'
+
+def has_shards(data_dir):
+    return os.path.exists(os.path.join(shard_root(data_dir), INDEX_FILE))
+
+def label_counts(labels):
+    return {CLASS_NAMES[i]: int(n) for i, n in enumerate(np.bincount(labels, minlength=len(CLASS_NAMES))) if n}
+
+def write_shard_files(root, images, labels):
+    """Save one shard's image and label blocks under a new unique name, and return the name."""
+    name = f"shard_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    for suffix, array in (('images', images), ('labels', labels)):
+        tmp_path = os.path.join(root, f"{name}.{suffix}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(root, f"{name}.{suffix}.npy")) # Readers never see half-written files
+    return name
+
+def rewrite_index(root, entries):
+    """Replace a store's index in one step, e.g. after shards have been pruned."""
+    tmp_path = os.path.join(root, INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_path, os.path.join(root, INDEX_FILE))
+
+class ShardWriter:
+    """
+    Append-only sticker store. Samples are queued from the caller's thread and written by a
+    background thread as (N, 32, 32, 3) uint8 RGB `.npy` blocks plus a label block. Each
+    finished shard gets one line in index.jsonl; existing shards are never rewritten. Samples
+    converted from files carry the file names, which the shard's entry lists under 'files'.
+    """
+    def __init__(self, root, session_meta=None, shard_size=SHARD_SIZE):
+        self.root = root
+        self.shard_size = shard_size
+        self.session = {'session_id': str(uuid.uuid4()), 'started': time.time(), **(session_meta or {})}
+        os.makedirs(self.root, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._images, self._labels, self._files = [], [], [] # Blocks of samples, written out shard_size at a time
+        self._buffered = 0
+        self._thread = threading.Thread(target=self._run, name='ShardWriter', daemon=True)
+        self._thread.start()
+
+    def add(self, image_rgb, label):
+        """Queue one sticker (h, w, 3 uint8 RGB, already IMG_SIZE) with its colour name. Never blocks on disk."""
+        self._queue.put((np.ascontiguousarray(image_rgb, dtype=np.uint8)[None], np.array([CLASS_NAMES.index(label)], dtype=np.uint8), [None]))
+
+    def add_batch(self, images_rgb, labels, files=None):
+        """Queue (n, h, w, 3) uint8 RGB stickers with their label indices into CLASS_NAMES, and optionally their source files, as one block."""
+        files = list(files) if files is not None else [None] * len(labels)
+        self._queue.put((np.ascontiguousarray(images_rgb, dtype=np.uint8), np.asarray(labels, dtype=np.uint8), files))
+
+    def flush(self):
+        """Write whatever is buffered as a (possibly short) shard."""
+        self._queue.put('flush')
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None or item == 'flush':
+                self._write_shard()
+                if item is None: return
+                continue
+            images, labels, files = item
+            self._images.append(images)
+            self._labels.append(labels)
+            self._files.extend(files)
+            self._buffered += len(labels)
+            while self._buffered >= self.shard_size:
+                self._write_shard(self.shard_size)
+
+    def _write_shard(self, count=None):
+        if not self._buffered: return
+        images, labels = np.concatenate(self._images), np.concatenate(self._labels)
+        count = count or len(labels)
+        self._images, self._labels = [images[count:]], [labels[count:]] # Remainder starts the next shard
+        files, self._files = self._files[:count], self._files[count:]
+        self._buffered = len(labels) - count
+        images, labels = images[:count], labels[:count]
+
+        name = write_shard_files(self.root, images, labels)
+        entry = {'shard': name, 'count': len(labels), 'written': time.time(), 'label_counts': label_counts(labels), **self.session}
+        if any(f is not None for f in files):
+            entry['files'] = [f for f in files if f is not None]
+        with open(os.path.join(self.root, INDEX_FILE), 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"Wrote {len(labels)} stickers to shard {name}.")
+
+class ShardReader:
+    """Memory-mapped view over every shard listed in a store's index."""
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, INDEX_FILE)) as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.class_names = list(CLASS_NAMES)
+        self.image_blocks = [np.load(os.path.join(root, f"{e['shard']}.images.npy"), mmap_mode='r') for e in self.entries]
+        self.label_blocks = [np.load(os.path.join(root, f"{e['shard']}.labels.npy"), mmap_mode='r') for e in self.entries]
+
+    def __len__(self):
+        return sum(len(block) for block in self.label_blocks)
+
+    @property
+    def labels(self):
+        if not self.label_blocks: return np.zeros(0, dtype=np.uint8)
+        return np.concatenate(self.label_blocks)
+
+    def images(self):
+        """All images as one in-memory array. Use `iter_batches` to stay memory-mapped."""
+        if not self.image_blocks: return np.zeros((0, *IMG_SIZE, 3), dtype=np.uint8)
+        return np.concatenate(self.image_blocks)
+
+    def iter_batches(self, batch_size=1024):
+        for images, labels in zip(self.image_blocks, self.label_blocks):
+            for start in range(0, len(labels), batch_size):
+                yield images[start:start + batch_size], labels[start:start + batch_size]
+
+def _folder_files(data_dir):
+    """Sorted image file names in each class folder that exists."""
+    files = {}
+    for class_name in CLASS_NAMES:
+        class_dir = os.path.join(data_dir, class_name)
+        if os.path.isdir(class_dir):
+            files[class_name] = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    return files
+
+def _converted_files(data_dir):
+    """'class/file' names of every PNG already converted into the dataset's shards."""
+    converted = set()
+    if not has_shards(data_dir): return converted
+    with open(os.path.join(shard_root(data_dir), INDEX_FILE)) as f:
+        for entry in (json.loads(line) for line in f if line.strip()):
+            converted.update(entry.get('files', ()))
+    return converted
+
+def _unconverted_files(data_dir):
+    """Per class, the image files in its folder that are not in the shards yet."""
+    converted = _converted_files(data_dir)
+    pending = {}
+    for class_name, file_names in _folder_files(data_dir).items():
+        names = [name for name in file_names if f"{class_name}/{name}" not in converted]
+        if names: pending[class_name] = names
+    return pending
+
+def _read_folder_dataset(data_dir, files=None):
+    """
+    Images, labels and 'class/file' names from the PNG class folders: every image, or only
+    `files` ({class: file names}) if given.
+    """
+    import cv2
+    images, labels, names = [], [], []
+    for class_name, file_names in (_folder_files(data_dir) if files is None else files).items():
+        label = CLASS_NAMES.index(class_name)
+        for file_name in file_names:
+            image = cv2.imread(os.path.join(data_dir, class_name, file_name))
+            if image is None: continue # Not an image
+            if image.shape[:2] != IMG_SIZE:
+                image = cv2.resize(image, IMG_SIZE, interpolation=cv2.INTER_NEAREST)
+            images.append(image[..., ::-1]) # BGR -> RGB
+            labels.append(label)
+            names.append(f"{class_name}/{file_name}")
+    if not images:
+        return np.zeros((0, *IMG_SIZE, 3), dtype=np.uint8), np.zeros(0, dtype=np.uint8), names
+    return np.stack(images), np.array(labels, dtype=np.uint8), names
+
+def unconverted_folders(data_dir):
+    """True if a PNG class folder holds an image whose name no shard in the dataset lists as converted."""
+    return bool(_unconverted_files(data_dir))
+
+def warn_if_unconverted(data_dir):
+    """Shards take precedence over the PNG folders, so say so when loading would leave PNGs out."""
+    if unconverted_folders(data_dir):
+        print(f"Warning: the PNG folders in '{data_dir}' are not in its shards and are left out. "
+              f"Add them with: python stickerstore.py convert {data_dir}")
+
+def convert_folder_dataset(data_dir, shard_size=SHARD_SIZE):
+    """
+    Convert a folder-per-class PNG dataset into shards. Shards already written (e.g. by a
+    collection run before converting) are kept; the PNGs are added alongside. Each shard's index
+    entry lists the files converted into it, so a later run converts only files added since.
+    """
+    if not unconverted_folders(data_dir):
+        print(f"No unconverted PNG folders in '{data_dir}'; not converting twice.")
+        return
+    images, labels, names = _read_folder_dataset(data_dir, _unconverted_files(data_dir))
+    print(f"Converting {len(labels)} images from '{data_dir}' to '{shard_root(data_dir)}'...")
+    writer = ShardWriter(shard_root(data_dir), {'source': 'converted', 'data_dir': data_dir}, shard_size=shard_size)
+    writer.add_batch(images, labels, names)
+    writer.close()
+    print("Conversion complete.")
+
+def load_sticker_arrays(data_dir):
+    """(images uint8 RGB, labels, class names) from shards if the dataset has them, else from the PNG folders."""
+    if has_shards(data_dir):
+        warn_if_unconverted(data_dir)
+        reader = ShardReader(shard_root(data_dir))
+        return reader.images(), reader.labels, reader.class_names
+    images, labels, _ = _read_folder_dataset(data_dir)
+    return images, labels, list(CLASS_NAMES)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sharded sticker dataset tools.")
+    parser.add_argument('command', choices=['convert', 'info'])
+    parser.add_argument('data_dir', help="Folder-per-class dataset, e.g. 'dataset' or 'test_dataset'.")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert_folder_dataset(args.data_dir)
+    elif not has_shards(args.data_dir):
+        print(f"No shards found for '{args.data_dir}'.")
+    else:
+        reader = ShardReader(shard_root(args.data_dir))
+        counts = np.bincount(reader.labels, minlength=len(CLASS_NAMES))
+        print(f"{len(reader)} stickers in {len(reader.entries)} shards, {len({e['session_id'] for e in reader.entries})} sessions.")
+        for name, count in zip(CLASS_NAMES, counts):
+            print(f"{name}: {count}")
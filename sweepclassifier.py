@@ -0,0 +1,177 @@
+# sweepclassifier.py
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from stickerstore import has_shards
+
+DATA_DIR = 'dataset'
+TEST_DATA_DIR = 'test_dataset'
+SWEEP_DIR = os.path.join('models', 'sweep')
+RESULTS_FILE = 'results.jsonl'
+SWEEP_EPOCHS = 15
+PATIENCE = 4 # Early stopping on validation accuracy
+SEED = 42
+LATENCY_BATCH = 9 # One face, as the scanner classifies it
+LATENCY_ITERATIONS = 100
+THREADS_PER_WORKER = 2
+
+SWEEP_GRIDS = {
+    'full': { # 54 configurations
+        'filters': [[8, 16, 16], [16, 32, 32], [32, 64, 64]],
+        'depthwise': [False, True],
+        'input_size': [16, 24, 32],
+        'augment_strength': [0.5, 1.0, 1.5],
+    },
+    'quick': { # 8 configurations, to check the setup
+        'filters': [[8, 16, 16], [32, 64, 64]],
+        'depthwise': [False, True],
+        'input_size': [16, 32],
+        'augment_strength': [1.0],
+    },
+}
+
+def config_name(config):
+    return (f"f{'-'.join(map(str, config['filters']))}{'_dw' if config['depthwise'] else ''}"
+            f"_s{config['input_size']}_a{config['augment_strength']:g}")
+
+def sweep_configs(grid):
+    keys = list(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    return [{'name': config_name(c), **c} for c in configs]
+
+_worker_data = None
+
+def _init_worker(threads):
+    """Give each worker a fixed CPU-thread budget before TensorFlow starts its thread pools."""
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def _load_worker_data():
+    # Loaded once per worker and reused for every configuration it trains
+    global _worker_data
+    if _worker_data is None:
+        from trainclassifier import load_training_data
+        from _evaluate_model import load_test_set
+        _worker_data = load_training_data(DATA_DIR), load_test_set()
+    return _worker_data
+
+def train_config(task):
+    """Train one configuration and measure it. Runs in a pool worker; returns a JSON-able result row."""
+    config, epochs, out_dir = task
+    start = time.perf_counter()
+    try:
+        import tensorflow as tf
+        from tensorflow.keras.callbacks import EarlyStopping
+        from trainclassifier import build_model, make_datasets
+        from _evaluate_model import measure_latency
+        (images, labels, class_names), (test_images, test_classes, _) = _load_worker_data()
+
+        tf.keras.utils.set_random_seed(SEED)
+        train_ds, val_ds = make_datasets(images, labels, len(class_names), augment_strength=config['augment_strength'])
+        model = build_model(len(class_names), config['filters'], depthwise=config['depthwise'], input_size=config['input_size'])
+        early_stop = EarlyStopping(monitor='val_accuracy', patience=PATIENCE, restore_best_weights=True)
+        history = model.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=[early_stop], verbose=0)
+
+        model_path = os.path.join(out_dir, f"{config['name']}.keras")
+        model.save(model_path)
+        predictions = model.predict(test_images, batch_size=256, verbose=0)
+        graph = tf.function(lambda x: model(x, training=False), input_signature=[tf.TensorSpec([None, 32, 32, 3], tf.float32)])
+        latency = measure_latency(lambda x: graph(tf.convert_to_tensor(x)).numpy(), test_images[:512], LATENCY_BATCH, iterations=LATENCY_ITERATIONS)
+        return {**config,
+                'test_accuracy': float(np.mean(np.argmax(predictions, axis=1) == test_classes)),
+                'val_accuracy': float(max(history.history['val_accuracy'])),
+                'params': int(model.count_params()),
+                'size_kb': round(os.path.getsize(model_path) / 1024, 1),
+                'p50_ms': round(float(latency['p50_ms']), 3), 'p95_ms': round(float(latency['p95_ms']), 3),
+                'epochs': len(history.history['loss']),
+                'train_seconds': round(time.perf_counter() - start, 1),
+                'model_path': model_path}
+    except Exception as e: # One failing configuration should not end the sweep
+        return {**config, 'error': str(e), 'train_seconds': round(time.perf_counter() - start, 1)}
+
+def load_results(out_dir=SWEEP_DIR):
+    path = os.path.join(out_dir, RESULTS_FILE)
+    if not os.path.exists(path): return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def run_sweep(configs, workers=None, threads_per_worker=THREADS_PER_WORKER, epochs=SWEEP_EPOCHS, out_dir=SWEEP_DIR):
+    """
+    Train every configuration not already in the results file, `workers` at a time. Each finished
+    result is appended to out_dir/results.jsonl straight away, so an interrupted sweep resumes
+    where it stopped. Returns all results, old and new.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = load_results(out_dir)
+    done = {r['name'] for r in results if 'error' not in r}
+    pending = [c for c in configs if c['name'] not in done]
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    print(f"{len(pending)} configurations to train ({len(configs) - len(pending)} already done), "
+          f"{workers} workers x {threads_per_worker} threads.")
+    if not pending: return results
+
+    ctx = multiprocessing.get_context('spawn') # TensorFlow does not survive a fork
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker,)) as pool, \
+         open(os.path.join(out_dir, RESULTS_FILE), 'a') as f:
+        tasks = ((config, epochs, out_dir) for config in pending)
+        for i, result in enumerate(pool.imap_unordered(train_config, tasks), 1):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            results.append(result)
+            if 'error' in result:
+                print(f"[{i}/{len(pending)}] {result['name']}: failed: {result['error']}")
+            else:
+                print(f"[{i}/{len(pending)}] {result['name']}: test {result['test_accuracy']:.2%}, "
+                      f"{result['params']:,} params, p50 {result['p50_ms']:.2f} ms ({result['train_seconds']:.0f}s)")
+    return results
+
+def smallest_meeting(results, target_accuracy):
+    """The result with the fewest parameters at or above `target_accuracy` on the test set, or None."""
+    passing = [r for r in results if 'error' not in r and r['test_accuracy'] >= target_accuracy]
+    return min(passing, key=lambda r: (r['params'], r['p50_ms'])) if passing else None
+
+def print_summary(results, target_accuracy):
+    rows = sorted((r for r in results if 'error' not in r), key=lambda r: r['params'])
+    header = f"{'configuration':<28} {'test %':>7} {'val %':>7} {'params':>9} {'KB':>7} {'p50 ms':>7} {'p95 ms':>7}"
+    print("\nSweep results (smallest first)")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['name']:<28} {r['test_accuracy'] * 100:>7.2f} {r['val_accuracy'] * 100:>7.2f} {r['params']:>9,} "
+              f"{r['size_kb']:>7.0f} {r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f}")
+    best = smallest_meeting(results, target_accuracy)
+    if best is None:
+        print(f"\nNo configuration reached {target_accuracy:.1%} test accuracy.")
+    else:
+        print(f"\nSmallest model at or above {target_accuracy:.1%}: {best['name']} ({best['test_accuracy']:.2%}, {best['params']:,} params) -> {best['model_path']}")
+        # Latencies above were measured while other workers were training; time the winner on its own
+        print(f"Benchmark it alone with: python _evaluate_model.py --benchmark {best['model_path']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train many classifier variants in parallel and find the smallest accurate one.")
+    parser.add_argument('--grid', choices=list(SWEEP_GRIDS), default='full')
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent trainings (default: CPUs / threads per worker).")
+    parser.add_argument('--threads-per-worker', type=int, default=THREADS_PER_WORKER)
+    parser.add_argument('--epochs', type=int, default=SWEEP_EPOCHS)
+    parser.add_argument('--target-accuracy', type=float, default=0.97)
+    parser.add_argument('--out', default=SWEEP_DIR)
+    parser.add_argument('--summary', action='store_true', help="Only print the results collected so far.")
+    args = parser.parse_args()
+
+    if args.summary:
+        print_summary(load_results(args.out), args.target_accuracy)
+    else:
+        for directory in (DATA_DIR, TEST_DATA_DIR):
+            if not (os.path.isdir(directory) or has_shards(directory)):
+                print(f"Error: '{directory}' not found. The sweep trains on {DATA_DIR} and scores on {TEST_DATA_DIR}.")
+                raise SystemExit(1)
+        results = run_sweep(sweep_configs(SWEEP_GRIDS[args.grid]), args.workers, args.threads_per_worker, args.epochs, args.out)
+        print_summary(results, args.target_accuracy)
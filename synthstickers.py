@@ -0,0 +1,163 @@
+# synthstickers.py
+
+import argparse
+import os
+import time
+import numpy as np
+from stickerstore import CLASS_NAMES, IMG_SIZE, ShardReader, ShardWriter, convert_folder_dataset, has_shards, shard_root, unconverted_folders
+
+# Typical sticker colours under neutral light, RGB, in CLASS_NAMES order
+BASE_COLOURS = np.array([
+    [20, 70, 200],   # blue
+    [20, 160, 70],   # green
+    [250, 110, 20],  # orange
+    [190, 25, 35],   # red
+    [235, 235, 230], # white
+    [240, 220, 40],  # yellow
+], dtype=np.float32) / 255.0
+BODY_COLOUR = 0.08 # Black plastic between stickers
+CHUNK = 8192 # Samples rendered per vectorised pass; bounds memory for any total
+
+# Ranges of each variation; every sample draws its own values
+DEFAULT_PARAMS = {
+    'hue_degrees': 12.0,        # Rotation of the colour about the grey axis
+    'saturation': (0.75, 1.15),
+    'illumination': (0.45, 1.25),
+    'gradient': 0.35,           # Max brightness change across the sticker
+    'white_balance': 0.12,      # Warm/cool and green/magenta channel gains
+    'glare_probability': 0.3,
+    'glare_strength': (0.2, 0.9),
+    'blur_sigma': (0.0, 1.6),   # Pixels
+    'border_width': (0.0, 5.0), # Pixels of body plastic visible at each edge (grid misalignment)
+    'corner_radius': (1.0, 6.0),
+    'texture': 0.025,           # Low-frequency plastic mottling
+    'noise': 0.02,              # Per-pixel sensor noise
+}
+
+def _hue_rotations(angles):
+    """(n, 3, 3) rotations about the (1, 1, 1) grey axis, which shift hue without changing brightness."""
+    axis = np.full(3, 1.0 / np.sqrt(3.0), dtype=np.float32)
+    k = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]], dtype=np.float32)
+    sin, cos = np.sin(angles)[:, None, None], np.cos(angles)[:, None, None]
+    return np.eye(3, dtype=np.float32) + sin * k + (1.0 - cos) * (k @ k) # Rodrigues' formula
+
+def _blur_matrices(sigmas, size):
+    """(n, size, size) row-normalised Gaussian weights, so `matrix @ column` blurs with edges clamped."""
+    offsets = np.arange(size, dtype=np.float32)
+    distance = (offsets[None, :, None] - offsets[None, None, :]) ** 2
+    weights = np.exp(-distance / (2.0 * np.maximum(sigmas, 1e-3)[:, None, None] ** 2))
+    return weights / weights.sum(axis=2, keepdims=True)
+
+def _gaussian_blur(images, sigmas):
+    """Blur each (h, w, c) image with its own sigma: a separable blur as two batched matrix products."""
+    n, h, w, c = images.shape
+    blur_h, blur_w = _blur_matrices(sigmas, h), _blur_matrices(sigmas, w)
+    images = (blur_h @ images.reshape(n, h, w * c)).reshape(n, h, w, c) # Down the columns
+    images = blur_w @ images.transpose(0, 2, 1, 3).reshape(n, w, h * c) # Along the rows
+    return images.reshape(n, w, h, c).transpose(0, 2, 1, 3)
+
+def _smooth_noise(rng, n, size, cells=4):
+    """Low-frequency noise: a coarse random grid bilinearly upsampled to `size`, zero mean and unit spread."""
+    coarse = rng.standard_normal((n, cells, cells), dtype=np.float32)
+    position = np.clip((np.arange(size[0], dtype=np.float32) + 0.5) / size[0] * cells - 0.5, 0, cells - 1)
+    lower = np.minimum(position.astype(int), cells - 2)
+    weights = np.zeros((size[0], cells), dtype=np.float32) # Interpolation matrix, coarse -> fine
+    weights[np.arange(size[0]), lower] = 1.0 - (position - lower)
+    weights[np.arange(size[0]), lower + 1] = position - lower
+    fine = weights @ coarse @ weights.T
+    return fine / fine.std()
+
+def render_stickers(labels, rng, params=None):
+    """
+    Render one RGB sticker per label index (into CLASS_NAMES) as (n, 32, 32, 3) uint8.
+    Every step works on the whole batch; `rng` (np.random.Generator) makes it reproducible.
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    labels = np.asarray(labels)
+    n, (h, w) = len(labels), IMG_SIZE
+    yy, xx = np.meshgrid((np.arange(h, dtype=np.float32) + 0.5) / h, (np.arange(w, dtype=np.float32) + 0.5) / w, indexing='ij')
+    uniform = lambda low, high, shape: rng.uniform(low, high, shape).astype(np.float32)
+
+    # Colour: hue rotation and saturation about each sample's own grey level
+    colours = BASE_COLOURS[labels]
+    colours = np.einsum('nij,nj->ni', _hue_rotations(np.deg2rad(uniform(-1, 1, n) * p['hue_degrees'])), colours)
+    grey = colours.mean(axis=1, keepdims=True)
+    colours = grey + (colours - grey) * uniform(*p['saturation'], (n, 1))
+
+    # Sticker shape: rounded rectangle inset by a random border on each side, body plastic outside it
+    borders = uniform(*p['border_width'], (n, 4)) / np.array([w, w, h, h], dtype=np.float32) # left, right, top, bottom
+    radius = uniform(*p['corner_radius'], (n, 1, 1)) / w
+    left, right = borders[:, 0, None, None], 1.0 - borders[:, 1, None, None]
+    top, bottom = borders[:, 2, None, None], 1.0 - borders[:, 3, None, None]
+    dx = np.maximum(np.maximum(left + radius - xx, xx - (right - radius)), 0.0)
+    dy = np.maximum(np.maximum(top + radius - yy, yy - (bottom - radius)), 0.0)
+    inside = np.clip((radius - np.sqrt(dx ** 2 + dy ** 2)) * w + 0.5, 0.0, 1.0) # Anti-aliased edge
+    inside *= ((xx > left) & (xx < right) & (yy > top) & (yy < bottom))
+    images = BODY_COLOUR + inside[..., None] * (colours[:, None, None, :] - BODY_COLOUR)
+
+    # Plastic texture: smooth random mottling
+    images *= 1.0 + p['texture'] * _smooth_noise(rng, n, IMG_SIZE)[..., None]
+
+    # Lighting: overall level, a linear gradient in a random direction, and white balance gains
+    direction = uniform(0, 2 * np.pi, n)
+    ramp = np.cos(direction)[:, None, None] * (xx - 0.5) + np.sin(direction)[:, None, None] * (yy - 0.5)
+    light = uniform(*p['illumination'], (n, 1, 1)) * (1.0 + p['gradient'] * uniform(-1, 1, (n, 1, 1)) * ramp)
+    warm, tint = uniform(-1, 1, (2, n)) * p['white_balance']
+    gains = np.stack([1.0 + warm - tint / 2, 1.0 + tint, 1.0 - warm - tint / 2], axis=1)
+    images *= light[..., None] * gains[:, None, None, :]
+
+    # Glare: a soft specular highlight pulling part of the sticker towards white
+    has_glare = rng.random(n) < p['glare_probability']
+    centre = uniform(0.1, 0.9, (2, n, 1, 1))
+    spread = uniform(0.08, 0.3, (n, 1, 1))
+    glare = np.exp(-((xx - centre[0]) ** 2 + (yy - centre[1]) ** 2) / (2 * spread ** 2))
+    glare *= (uniform(*p['glare_strength'], n) * has_glare)[:, None, None]
+    images += glare[..., None] * (1.0 - images)
+
+    images = _gaussian_blur(images.astype(np.float32), uniform(*p['blur_sigma'], n))
+    images += rng.standard_normal(images.shape, dtype=np.float32) * p['noise']
+    return (np.clip(images, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+def generate_to_shards(data_dir, counts, seed=0, params=None):
+    """
+    Render `counts` ({class name: samples}) into the dataset's shard store, tagged as a synthetic
+    session so it can be told apart from camera data. Returns the number of stickers written.
+    """
+    if unconverted_folders(data_dir):
+        convert_folder_dataset(data_dir) # Otherwise the new shards would hide the existing PNG folders from training
+    labels = np.concatenate([np.full(count, CLASS_NAMES.index(name), dtype=np.uint8) for name, count in counts.items()])
+    rng = np.random.default_rng(seed)
+    labels = rng.permutation(labels) # Mixed classes in every shard
+
+    writer = ShardWriter(shard_root(data_dir), {'source': 'synthetic', 'seed': seed, 'params': {**DEFAULT_PARAMS, **(params or {})}})
+    for start in range(0, len(labels), CHUNK):
+        chunk = labels[start:start + CHUNK]
+        writer.add_batch(render_stickers(chunk, rng, params), chunk)
+    writer.close()
+    return len(labels)
+
+def balanced_counts(data_dir, target):
+    """Per-class samples needed to bring every class in the dataset up to `target`."""
+    if unconverted_folders(data_dir):
+        convert_folder_dataset(data_dir) # So PNG folders are counted, not just what is already in shards
+    existing = np.zeros(len(CLASS_NAMES), dtype=int)
+    if has_shards(data_dir):
+        existing = np.bincount(ShardReader(shard_root(data_dir)).labels, minlength=len(CLASS_NAMES))
+    return {name: int(max(0, target - have)) for name, have in zip(CLASS_NAMES, existing)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render synthetic sticker images into a dataset's shard store.")
+    parser.add_argument('data_dir', nargs='?', default='dataset')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--per-class', type=int, help="Add this many stickers of every colour.")
+    group.add_argument('--balance', type=int, metavar='TARGET', help="Add only what each colour needs to reach TARGET stickers.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = balanced_counts(args.data_dir, args.balance) if args.balance else {name: args.per_class for name in CLASS_NAMES}
+    start = time.perf_counter()
+    total = generate_to_shards(args.data_dir, counts, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {total:,} stickers into '{shard_root(args.data_dir)}' in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f}/s).")
+    for name, count in counts.items():
+        print(f"{name}: +{count}")
@@ -2,119 +2,192 @@
 
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras.layers import Conv2D, SeparableConv2D, MaxPooling2D, Flatten, Dense, Dropout, Resizing, RandomRotation, RandomZoom, RandomTranslation
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 import os
 import numpy as np
-import random
+from stickerstore import ShardReader, has_shards, shard_root, warn_if_unconverted
 
 DATA_DIR = 'dataset'
 MODELS_DIR = 'models'
 IMG_SIZE = (32, 32)
 BATCH_SIZE = 32
 EPOCHS = 30
-
-if not os.path.exists(MODELS_DIR):
-    os.makedirs(MODELS_DIR)
-
-def random_ninety_degree_rotate(image): # Random rotation for augmentation of existing dataset
-    k = random.choice([0, 1, 2, 3])
-    return np.rot90(image, k=k)
-
-# Data loading and augmentation
-# Apply random transformations (rotation, zoom, etc.)
-datagen = ImageDataGenerator(
-    rescale=1./255,          # Normalize pixel values to 0-1
-    validation_split=0.2,    # Use 20% of data for validation
-    preprocessing_function=random_ninety_degree_rotate,  # random 90-deg rotation 
-    rotation_range=15,       # Then ±15 degree rotation
-    zoom_range=0.15,
-    width_shift_range=0.1,
-    height_shift_range=0.1,
-    brightness_range=[0.8, 1.2],  # Add brightness variation
-    horizontal_flip=False,   # Not useful for this task
-    fill_mode='nearest'
-)
-
-train_generator = datagen.flow_from_directory(
-    DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    subset='training',
-    shuffle=True
-)
-    
-validation_generator = datagen.flow_from_directory(
-    DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    subset='validation',
-    shuffle=False
-)
-
-# CNN model
-model = Sequential([
-    Conv2D(32, (3, 3), activation='relu', input_shape=(IMG_SIZE[0], IMG_SIZE[1], 3)),
-    MaxPooling2D((2, 2)),
-    Conv2D(64, (3, 3), activation='relu'),
-    MaxPooling2D((2, 2)),
-    Conv2D(64, (3, 3), activation='relu'),
-    Flatten(),
-    Dense(128, activation='relu'),
-    Dropout(0.5), # prevent overfitting
-    Dense(train_generator.num_classes, activation='softmax')
-])
-
-model.summary()
-
-model.compile(optimizer='adam',
-              loss='categorical_crossentropy',
-              metrics=['accuracy'])
-
-print("\nStarting training")
-
-checkpoint = ModelCheckpoint(
-    filepath=os.path.join(MODELS_DIR, 'best_model.keras'),
-    monitor='val_accuracy',
-    save_best_only=True,
-    verbose=1
-)
-
-early_stop = EarlyStopping(
-    monitor='val_accuracy',
-    patience=5,
-    restore_best_weights=True,
-    verbose=1
-)
-
-history = model.fit(
-    train_generator,
-    epochs=EPOCHS,
-    validation_data=validation_generator,
-    callbacks=[checkpoint, early_stop]
-)
-
-# Save the trained model
-model_path = os.path.join(MODELS_DIR, 'colour_classifierES.h5')
-model.save(model_path)
-print(f"\n--- Training Complete. Model saved to {model_path} ---")
-
-# Training history
-import matplotlib.pyplot as plt
-acc = history.history['accuracy']
-val_acc = history.history['val_accuracy']
-loss = history.history['loss']
-val_loss = history.history['val_loss']
-num_epochs_ran = len(history.history['accuracy'])
-epochs_range = range(num_epochs_ran)
-plt.figure(figsize=(8, 8))
-plt.subplot(1, 2, 1)
-plt.plot(epochs_range, acc, label='Training Accuracy')
-plt.plot(epochs_range, val_acc, label='Validation Accuracy')
-plt.legend(loc='lower right')
-plt.title('Training and Validation Accuracy')
-plt.show()
-
+VALIDATION_SPLIT = 0.2
+SEED = 42
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+AUTOTUNE = tf.data.AUTOTUNE
+
+def list_image_files(data_dir):
+    """Folder-per-class listing, in the same (alphabetical) class order flow_from_directory used."""
+    class_names = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, class_name)
+        for file_name in sorted(os.listdir(class_dir)):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, file_name))
+                labels.append(label)
+    return np.array(paths), np.array(labels, dtype=np.int32), class_names
+
+def split_indices(labels, validation_split=VALIDATION_SPLIT, seed=SEED):
+    """Fixed, per-class (stratified) train/validation split so validation is the same set every run."""
+    rng = np.random.default_rng(seed)
+    train_idx, val_idx = [], []
+    for label in np.unique(labels):
+        idx = rng.permutation(np.flatnonzero(labels == label))
+        n_val = int(round(len(idx) * validation_split))
+        val_idx.append(idx[:n_val])
+        train_idx.append(idx[n_val:])
+    return np.concatenate(train_idx), np.concatenate(val_idx)
+
+def _decode_image(path, label):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMG_SIZE, method='nearest')
+    return tf.cast(image, tf.uint8), label # Cache as uint8; 4x smaller than float32
+
+def random_ninety_degree_rotate(images): # Random rotation for augmentation of existing dataset, whole batch at once
+    k = tf.random.uniform([tf.shape(images)[0]], minval=0, maxval=4, dtype=tf.int32)
+    rotations = tf.stack([tf.image.rot90(images, k=i) for i in range(4)], axis=1) # (batch, 4, h, w, c)
+    return tf.gather(rotations, k, axis=1, batch_dims=1)
+
+def build_augmenter(strength=1.0):
+    """Vectorised equivalent of the old ImageDataGenerator settings, scaled by `strength`."""
+    layers = Sequential([
+        RandomRotation(15 / 360 * strength, fill_mode='nearest'), # ±15 degree rotation
+        RandomZoom(0.15 * strength, fill_mode='nearest'),
+        RandomTranslation(0.1 * strength, 0.1 * strength, fill_mode='nearest'),
+    ])
+    brightness = 0.2 * strength # Brightness variation 0.8-1.2
+
+    def augment(images, labels):
+        images = random_ninety_degree_rotate(images)
+        images = layers(images, training=True)
+        factors = tf.random.uniform([tf.shape(images)[0], 1, 1, 1], 1.0 - brightness, 1.0 + brightness)
+        return tf.clip_by_value(images * factors, 0.0, 1.0), labels
+    return augment
+
+def make_datasets(images_or_paths, labels, num_classes, batch_size=BATCH_SIZE, augment_strength=1.0, seed=SEED):
+    """
+    Train/validation tf.data pipelines. Images are decoded once and cached; the training
+    split is shuffled and augmented per batch in parallel, validation is never augmented.
+    `images_or_paths` is either an array of file paths or a uint8 (N, h, w, 3) image array.
+    """
+    train_idx, val_idx = split_indices(labels, seed=seed)
+
+    def rescale(images, labels):
+        return tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)
+
+    def base(idx):
+        ds = tf.data.Dataset.from_tensor_slices((images_or_paths[idx], labels[idx]))
+        if images_or_paths.dtype.kind in 'US': # File paths; decode in parallel, only on the first epoch
+            ds = ds.map(_decode_image, num_parallel_calls=AUTOTUNE)
+        return ds.cache()
+
+    train_ds = (base(train_idx)
+                .shuffle(len(train_idx), seed=seed, reshuffle_each_iteration=True)
+                .batch(batch_size)
+                .map(rescale, num_parallel_calls=AUTOTUNE)
+                .map(build_augmenter(augment_strength), num_parallel_calls=AUTOTUNE, deterministic=False)
+                .prefetch(AUTOTUNE))
+    val_ds = (base(val_idx)
+              .batch(batch_size)
+              .map(rescale, num_parallel_calls=AUTOTUNE)
+              .prefetch(AUTOTUNE))
+    return train_ds, val_ds
+
+def build_model(num_classes, filters=(32, 64, 64), dense_units=128, depthwise=False, input_size=IMG_SIZE[0]):
+    """
+    The colour CNN; the defaults are the shipped architecture. `depthwise` makes every conv after
+    the first depthwise-separable. The input is always IMG_SIZE, so any variant is a drop-in for the
+    scanner; a smaller `input_size` downsamples inside the model (with 'same' padding so three
+    convs still fit).
+    """
+    padding = 'valid' if input_size >= IMG_SIZE[0] else 'same'
+    layers = [tf.keras.Input(shape=(IMG_SIZE[0], IMG_SIZE[1], 3))]
+    if input_size != IMG_SIZE[0]:
+        layers.append(Resizing(input_size, input_size, interpolation='area'))
+    for i, width in enumerate(filters):
+        conv = SeparableConv2D if depthwise and i > 0 else Conv2D
+        layers.append(conv(width, (3, 3), activation='relu', padding=padding))
+        if i < len(filters) - 1:
+            layers.append(MaxPooling2D((2, 2)))
+    layers += [
+        Flatten(),
+        Dense(dense_units, activation='relu'),
+        Dropout(0.5), # prevent overfitting
+        Dense(num_classes, activation='softmax')
+    ]
+    model = Sequential(layers)
+    model.compile(optimizer='adam',
+                  loss='categorical_crossentropy',
+                  metrics=['accuracy'])
+    return model
+
+def load_training_data(data_dir=DATA_DIR):
+    """(images or file paths, labels, class names) for make_datasets."""
+    if has_shards(data_dir): # Sharded store from the data collector; no per-file decoding at all
+        warn_if_unconverted(data_dir)
+        reader = ShardReader(shard_root(data_dir))
+        return reader.images(), reader.labels.astype(np.int32), reader.class_names
+    return list_image_files(data_dir)
+
+def main():
+    if not os.path.exists(MODELS_DIR):
+        os.makedirs(MODELS_DIR)
+
+    # Data loading and augmentation
+    images, labels, class_names = load_training_data()
+    print(f"Found {len(images)} images belonging to {len(class_names)} classes: {class_names}")
+    train_ds, val_ds = make_datasets(images, labels, len(class_names))
+
+    # CNN model
+    model = build_model(len(class_names))
+    model.summary()
+
+    print("\nStarting training")
+
+    checkpoint = ModelCheckpoint(
+        filepath=os.path.join(MODELS_DIR, 'best_model.keras'),
+        monitor='val_accuracy',
+        save_best_only=True,
+        verbose=1
+    )
+
+    early_stop = EarlyStopping(
+        monitor='val_accuracy',
+        patience=5,
+        restore_best_weights=True,
+        verbose=1
+    )
+
+    history = model.fit(
+        train_ds,
+        epochs=EPOCHS,
+        validation_data=val_ds,
+        callbacks=[checkpoint, early_stop]
+    )
+
+    # Save the trained model
+    model_path = os.path.join(MODELS_DIR, 'colour_classifierES.h5')
+    model.save(model_path)
+    print(f"\n--- Training Complete. Model saved to {model_path} ---")
+
+    # Training history
+    import matplotlib.pyplot as plt
+    acc = history.history['accuracy']
+    val_acc = history.history['val_accuracy']
+    loss = history.history['loss']
+    val_loss = history.history['val_loss']
+    num_epochs_ran = len(history.history['accuracy'])
+    epochs_range = range(num_epochs_ran)
+    plt.figure(figsize=(8, 8))
+    plt.subplot(1, 2, 1)
+    plt.plot(epochs_range, acc, label='Training Accuracy')
+    plt.plot(epochs_range, val_acc, label='Validation Accuracy')
+    plt.legend(loc='lower right')
+    plt.title('Training and Validation Accuracy')
+    plt.show()
+
+if __name__ == "__main__":
+    main()